@@ -0,0 +1,154 @@
+from datetime import date
+from math import ceil
+from typing import Dict, List
+import numpy as np
+from estimates import OrderEstimator
+from instrumentation import log, metrics
+from models import InputData
+from models.orders import Order
+
+
+class OrderAdmission:
+    """
+    Отбор заказов до планирования как многомерный рюкзак: измерения - типы работ и все работники вместе,
+    окна - рабочие дни от currentDate. Заказ со сроком t занимает объём работ каждого своего типа во всех окнах
+    с t и дальше, и в каждом окне объём принятых заказов со сроком не позже него не должен превышать
+    мощность, которую подходящие работники дают за это число рабочих дней (условие расписания по сроку, EDF).
+
+    Жадный проход идёт по убыванию прибыли на единицу занятой мощности, и каждый заказ получает самый ранний срок
+    не раньше дедлайна и своего критического пути, при котором он укладывается; прибыль заказа считается
+    уже с просрочкой до этого срока, и невыгодный при таком сроке заказ не принимается.
+    Затем проход исправления пробует принять отклонённые заказы, вытеснив один менее прибыльный.
+
+    Мощность завышена (работник с несколькими типами работ учитывается в каждом, зависимости - только
+    критическим путём), поэтому отклонённый заказ действительно не помещается, а принятые не обязательно
+    помещаются все; capacity_factor < 1 делает отбор строже.
+    """
+    def __init__(self, input_data: InputData, orders: List[Order], estimator: OrderEstimator | None = None,
+                 capacity_factor: float = 1.0, swap_candidates: int = 5):
+        self.input_data = input_data
+        self.orders = list(orders)
+        self.estimator = estimator if estimator is not None else OrderEstimator(input_data, self.orders)
+        self.calendar = self.estimator.calendar
+        self.swap_candidates = swap_candidates
+
+        # строки: типы работ, последняя - все работники вместе (в день работник выполняет одну задачу)
+        capacity: Dict[str, float] = {}
+        for worker in input_data.workers:
+            for work_type_id in dict.fromkeys(worker.workTypeIds):
+                capacity[work_type_id] = capacity.get(work_type_id, 0.0) + worker.productivity
+        row = {work_type_id: k for k, work_type_id in enumerate(capacity)}
+        daily = np.array(list(capacity.values()) + [sum(worker.productivity for worker in input_data.workers)])
+
+        self.work = np.zeros((len(self.orders), len(daily)))
+        for i, order in enumerate(self.orders):
+            for task in order.tasks:
+                if task.workTypeId in row:
+                    self.work[i, row[task.workTypeId]] += task.baseDuration
+            self.work[i, -1] = sum(task.baseDuration for task in order.tasks)
+
+        # самый ранний и самый поздний срок заказа в рабочих днях от currentDate
+        start = input_data.currentDate
+        self.earliest = np.zeros(len(self.orders), dtype=np.int64)
+        self.latest = np.zeros(len(self.orders), dtype=np.int64)
+        for i, order in enumerate(self.orders):
+            critical_path = int(self.estimator.critical_path[self.estimator.index_by_order_id[order.id]])
+            deadline = self.calendar.workday_index(order.deadline, side="right") if order.deadline >= start else 0
+            self.earliest[i] = max(deadline, critical_path, 1)
+            self.latest[i] = self._latest_workday(order, deadline)
+        # заказы без штрафа ограничены только концом горизонта
+        horizon = int(max(self.earliest.max(initial=1), self.latest.max(initial=1)))
+        self.latest = np.where(self.latest < 0, horizon, self.latest)
+        self.horizon = horizon
+
+        self.capacity = capacity_factor * daily[:, None] * np.arange(1, horizon + 1)[None, :]
+        self.load = np.zeros_like(self.capacity)
+        self.density_weight = 1.0 / np.maximum(daily, 1e-9)
+
+    def _latest_workday(self, order: Order, deadline: int) -> int:
+        """Последний срок (в рабочих днях), при котором заказ ещё приносит выручку; -1 - без ограничения."""
+        if order.penaltyByDay <= 0:
+            return -1
+        days = max(ceil(order.earning / order.penaltyByDay) - 1, 0)
+        latest = order.deadline.toordinal() + days
+        if latest < self.calendar.start:
+            return 0
+        return max(self.calendar.workday_index(date.fromordinal(latest), side="right"), deadline)
+
+    def value(self, i: int, due: int) -> float:
+        """Прибыль заказа при окончании в рабочий день due (счёт с 1), как в OrderEstimator.estimated_earning."""
+        order = self.orders[i]
+        end = self.calendar.chain_end_ordinals(self.input_data.currentDate, np.array([due]))[0]
+        days_overdue = max(0, int(end) - order.deadline.toordinal())
+        earning = max(0.0, order.earning - order.penaltyByDay * days_overdue)
+        return earning - self.input_data.companyDayCost * self.estimator.duration_days(order)
+
+    def _earliest_due(self, i: int) -> int | None:
+        """Самый ранний срок заказа, при котором он укладывается в оставшуюся мощность всех окон."""
+        first, last = int(self.earliest[i]), int(self.latest[i])
+        if first > last:
+            return None
+        rows = self.work[i] > 0
+        if not rows.any():
+            return first
+        slack = self.capacity[rows, first - 1:] - self.load[rows, first - 1:]
+        # срок t допустим, если во всех окнах с t и дальше хватает запаса
+        suffix_min = np.minimum.accumulate(slack[:, ::-1], axis=1)[:, ::-1]
+        fits = (suffix_min >= self.work[i, rows, None]).all(axis=0)[:last - first + 1]
+        if not fits.any():
+            return None
+        return first + int(np.argmax(fits))
+
+    def _take(self, i: int, due: int, sign: float = 1.0):
+        self.load[:, due - 1:] += sign * self.work[i, :, None]
+
+    def admit(self) -> List[Order]:
+        """Принятые заказы в исходном порядке."""
+        with metrics.phase("admission"):
+            admitted = self._admit()
+        metrics.count("admission.rejected", len(self.orders) - len(admitted))
+        return [self.orders[i] for i in sorted(admitted)]
+
+    def _admit(self) -> Dict[int, int]:
+        # оценка прибыли без очереди, по ней и по занятой мощности - порядок жадного прохода
+        standalone = np.array([self.value(i, int(self.earliest[i])) if self.estimator.is_feasible(order) else -np.inf
+                               for i, order in enumerate(self.orders)])
+        density = standalone / np.maximum(self.work @ self.density_weight, 1e-9)
+        ranked = [i for i in np.argsort(-density, kind="stable") if standalone[i] > 0]
+
+        admitted: Dict[int, int] = {}
+        values: Dict[int, float] = {}
+        rejected: List[int] = []
+        for i in ranked:
+            due = self._earliest_due(i)
+            if due is not None and self.value(i, due) > 0:
+                self._take(i, due)
+                admitted[i] = due
+                values[i] = self.value(i, due)
+            else:
+                rejected.append(i)
+
+        # исправление: отклонённый заказ вытесняет менее прибыльный принятый, если после этого помещается
+        swaps = 0
+        for i in sorted(rejected, key=lambda i: -standalone[i]):
+            victims = sorted((j for j in admitted if values[j] < standalone[i]), key=lambda j: values[j])
+            for j in victims[:self.swap_candidates]:
+                self._take(j, admitted[j], -1.0)
+                due = self._earliest_due(i)
+                gain = self.value(i, due) - values[j] if due is not None else 0.0
+                if gain > 0:
+                    self._take(i, due)
+                    del admitted[j], values[j]
+                    admitted[i], values[i] = due, self.value(i, due)
+                    swaps += 1
+                    break
+                self._take(j, admitted[j])
+        metrics.count("admission.swaps", swaps)
+        log.info(f"Допуск заказов: принято {len(admitted)} из {len(self.orders)}, замен {swaps}", key="admission")
+        return admitted
+
+
+def admit_orders(input_data: InputData, orders: List[Order], estimator: OrderEstimator | None = None,
+                 capacity_factor: float = 1.0) -> List[Order]:
+    """Заказы, которые проходят отбор OrderAdmission, в исходном порядке."""
+    return OrderAdmission(input_data, orders, estimator, capacity_factor).admit()
@@ -1,20 +1,41 @@
 from datetime import date, timedelta
+from math import ceil
 from typing import List
 import concurrent.futures
 import os
 import time
 
+import numpy as np
+
 from checker import only_calculate_earning
 from models import Orders, InputData, WorkPlan
 from models.orders import Order, Task
 from models.work_plan import AssignedTask
-from utils import calculate_order_cost, calculate_order_duration, calculate_placed_order_duration
 from models.input_data import Worker
-from date_utils import closest_workday, minimum_allowed_date_by_dependencies, calculate_task_end_date
+from date_utils import closest_workday, minimum_allowed_date_by_dependencies
+from admission import admit_orders
+from capacity import CapacityProfile
+from estimates import OrderEstimator
+from problem import WorkerIndex
+from instrumentation import log, metrics
 
 class AdvancedOptimizer:
-    def __init__(self, input_data: InputData, orders: Orders):
+    def __init__(self, input_data: InputData, orders: Orders, admission: bool = False,
+                 initial_plan: WorkPlan | None = None):
+        """
+        Args:
+            admission: оставить только заказы, которые вместе помещаются в мощность работников (см. admission.py)
+            initial_plan: зафиксированные задачи; они остаются на своих местах, а оставшиеся задачи
+                их заказов и остальные заказы расставляются вокруг них. Заказ с зафиксированными задачами
+                оценивается и отсекается только по остатку (см. _construct_remainders)
+        """
         self.input_data = input_data
+        self.initial_plan = initial_plan
+        self._construct_remainders(orders)
+        self.estimator = OrderEstimator(input_data, [self.remainders.get(order.id, order) for order in orders.root])
+        self.calendar = self.estimator.calendar
+        self.worker_index = WorkerIndex(input_data.workers)
+        self.admission = admission
         self.orders = self._filter_orders(orders)
         print(f"Оставлено заказов: {len(self.orders.root)}")
 
@@ -24,17 +45,44 @@ class AdvancedOptimizer:
         # подготовим оценку ценности работников
         self._construct_workers_value()
 
-    def optimize(self, orders_window: int, workers_step: float, earning_coefficient: float = 1.0) -> WorkPlan:
-        # Засекаем время начала работы
-        start_time = time.time()
-
+    def optimize(self, orders_window: int, workers_step: float, earning_coefficient: float = 1.0,
+                 time_limit: float | None = None) -> WorkPlan:
+        """
+        Args:
+            orders_window: сколько лучших заказов перебирать на каждом шаге
+            workers_step: шаг перебора коэффициента доступности работников
+            earning_coefficient: вес прибыли (против срочности) при сортировке заказов
+            time_limit: ограничение времени в секундах; по истечении возвращается уже собранный план
+        """
+        with metrics.phase("advanced.optimize") as timer:
+            result = self._optimize(orders_window, workers_step, earning_coefficient, time_limit)
+        print(f"Время работы optimize: {timer.elapsed:.2f} секунд")
+        return result
+
+    def _optimize(self, orders_window: int, workers_step: float, earning_coefficient: float,
+                  time_limit: float | None = None) -> WorkPlan:
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
         work_plan_dict: dict[str, AssignedTask] = {}
         order_by_task_id: dict[str, Order] = {}
         tasks_by_id: dict[str, Task] = {}
         orders = []
         global_best_earning = float('-inf')
 
+        # свободная мощность по типам работ: заказы, которые уже не успеть закончить с выручкой, отсекаем до размещения
+        capacity = CapacityProfile(self.input_data, self.calendar, self.estimator)
+
+        initial_plan = self.initial_plan
+        if initial_plan is not None and len(initial_plan.root) > 0:
+            work_plan_dict = {t.taskId: t for t in initial_plan.root}
+            # новый заказ берём, только если он улучшает прибыль зафиксированного плана
+            global_best_earning = only_calculate_earning(self.orders, initial_plan, self.input_data)
+            for t in initial_plan.root:
+                capacity.assign(self._worker(t.workerId), t.start, t.end)
+
         for order in self.orders.root:
+            # полностью зафиксированные заказы уже стоят в плане
+            if all(task.id in work_plan_dict for task in order.tasks):
+                continue
             orders.append(order)
             for task in order.tasks:
                 order_by_task_id[task.id] = order
@@ -45,6 +93,19 @@ class AdvancedOptimizer:
 
         # разбираем задачи до тех пор, пока не поставим все
         while len(orders) > 0:
+            # план после каждого шага допустим, поэтому по истечении времени просто возвращаем его
+            if deadline is not None and time.perf_counter() > deadline:
+                print(f"Время вышло, не рассмотрено заказов: {len(orders)}")
+                break
+
+            # мощность только убывает, поэтому отсечённый заказ больше не понадобится;
+            # у заказа с зафиксированными задачами проверяется только остаток
+            admitted = [o for o in orders if capacity.admits(self.remainders.get(o.id, o), self.remainder_start.get(o.id))]
+            metrics.count("capacity.rejected", len(orders) - len(admitted))
+            orders = admitted
+            if len(orders) == 0:
+                break
+
             orders_selected = []
             if len(orders) > orders_window:
                 orders_selected = orders[:orders_window].copy()
@@ -59,32 +120,37 @@ class AdvancedOptimizer:
             while len(orders_selected) > 0:
                 order = orders_selected.pop(0)
                 temp_work_plan_for_order = work_plan_dict.copy()
+                metrics.count("plan_copies")
 
                 # ищем лучшее распределение по работникам для этого заказа
-                current_best_earning, current_best_work_plan, best_availability_coefficient = self._select_best_workers(order, temp_work_plan_for_order, workers_step)
+                with metrics.phase("advanced.select_best_workers"):
+                    current_best_earning, current_best_work_plan, best_availability_coefficient = self._select_best_workers(order, temp_work_plan_for_order, workers_step)
 
                 # Если текущий результат лучше лучшего найденного ранее, обновляем лучший результат
                 if current_best_earning > best_earning_for_order:
                     best_earning_for_order = current_best_earning
                     best_order = order
                     best_work_plan = current_best_work_plan.copy()
-                    print(f"Earning: {best_earning_for_order:,.2f}".replace(',', ' '), f"orders left: {len(orders)}, availability coefficient: {best_availability_coefficient:.1f}")
+                    metrics.count("plan_copies")
+                    log.info(f"Earning: {best_earning_for_order:,.2f}".replace(',', ' ') +
+                             f" orders left: {len(orders)}, availability coefficient: {best_availability_coefficient:.1f}",
+                             key="advanced.progress")
 
             if best_order is None:
                 break
             else:
                 orders.remove(best_order)
+                for task in best_order.tasks:
+                    if task.id not in work_plan_dict:
+                        t = best_work_plan[task.id]
+                        capacity.assign(self._worker(t.workerId), t.start, t.end)
                 work_plan_dict = best_work_plan.copy()
+                metrics.count("plan_copies")
                 global_best_earning = best_earning_for_order
 
         sorted_tasks = sorted(work_plan_dict.values(), key=lambda x: x.start)
 
-        # Вычисляем время работы в секундах
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print(f"Время работы optimize: {execution_time:.2f} секунд")
-
-        return WorkPlan(sorted_tasks)
+        return WorkPlan.trusted(sorted_tasks)
 
     def _select_best_workers(self, order: Order, work_plan_dict: dict[str, AssignedTask], workers_step: float) -> (float, dict[str, AssignedTask], float):
         # ищем лучшее распределение по работникам для этого заказа
@@ -99,12 +165,13 @@ class AdvancedOptimizer:
         def process_coefficient(coefficient):
             # Создаем копию текущего плана работ
             temp_work_plan = work_plan_dict.copy()
+            metrics.count("plan_copies")
 
             # Пытаемся разместить заказ с текущим коэффициентом
             self._place_order(order, temp_work_plan, coefficient)
 
             # Проверяем, прибылен ли заказ
-            current_earning = only_calculate_earning(self.orders, WorkPlan(temp_work_plan.values()), self.input_data)
+            current_earning = only_calculate_earning(self.orders, WorkPlan.trusted(temp_work_plan.values()), self.input_data)
 
             return coefficient, current_earning, temp_work_plan
 
@@ -130,7 +197,8 @@ class AdvancedOptimizer:
         return best_earning_for_worker, best_work_plan_for_worker, best_availability_coefficient
 
     def _place_order(self, order: Order, work_plan_dict: dict[str, AssignedTask], availability_coefficient: float):
-        tasks_to_place = order.tasks.copy()
+        # зафиксированные задачи заказа уже стоят в плане
+        tasks_to_place = [task for task in order.tasks if task.id not in work_plan_dict]
 
         while len(tasks_to_place) > 0:
             task = tasks_to_place.pop(0)
@@ -144,38 +212,54 @@ class AdvancedOptimizer:
 
             min_date = closest_workday(min_date, self.input_data.holidays)
 
+            # ближайшие окна всех подходящих работников одним расчётом
+            slots = self._earliest_slots(task, min_date, work_plan_dict)
+
             # получаем оценки работников для этой задачи
-            workers_scores = self._get_workers_scores_for_task(task, work_plan_dict, availability_coefficient, min_date)
+            workers_scores = self._get_workers_scores_for_task(task, slots, availability_coefficient, min_date)
 
             # получаем идентификатор работника с максимальным баллом
             worker_id = max(workers_scores, key=workers_scores.get)
-            worker = next(w for w in self.input_data.workers if w.id == worker_id)
 
-            # получаем дату, когда этот работник может выполнить задачу
-            start_date = self._get_worker_date_availability(worker, task, min_date, work_plan_dict)
-            # считаем дату конца
-            end_date = calculate_task_end_date(start_date, task.baseDuration, worker.productivity, self.input_data.holidays)
+            # дата, когда этот работник может выполнить задачу, и дата конца
+            start_date, end_date = slots[worker_id]
             # добавляем задачу в план
-            work_plan_dict[task.id] = AssignedTask(taskId=task.id, workerId=worker_id, start=start_date, end=end_date)
+            work_plan_dict[task.id] = AssignedTask.trusted(taskId=task.id, workerId=worker_id, start=start_date, end=end_date)
+            metrics.count("placements")
 
-    def _get_workers_scores_for_task(self, task: Task, work_plan_dict: dict[str, AssignedTask], availability_coefficient: float, min_date: date) -> dict[str, float]:
+    def _worker(self, worker_id: str) -> Worker:
+        return self.worker_index.workers[self.worker_index.position[worker_id]]
+
+    def _get_workers_scores_for_task(self, task: Task, slots: dict[str, tuple[date, date]], availability_coefficient: float, min_date: date) -> dict[str, float]:
+        # оцениваем только подходящих и недоминируемых работников, остальные выбраны быть не могут
         scores = {}
-        av_scores = self._worker_availability_scores_for_task(task, work_plan_dict, min_date)
-        for worker in self.input_data.workers:
-            if task.workTypeId in worker.workTypeIds:
-                av_score = av_scores[worker.id]
-                value_score = self.workers_value[worker.id]
-                scores[worker.id] = availability_coefficient * av_score + (1 - availability_coefficient) * (1.0 - value_score)
-            else:
-                scores[worker.id] = float('-inf')
+        av_scores = self._worker_availability_scores_for_task(task, slots, min_date)
+        for worker_id, av_score in av_scores.items():
+            value_score = self.workers_value[worker_id]
+            scores[worker_id] = availability_coefficient * av_score + (1 - availability_coefficient) * (1.0 - value_score)
 
         return scores
 
-    def _worker_availability_scores_for_task(self, task: Task, work_plan_dict: dict[str, AssignedTask], min_date: date) -> dict[str, float]:
-        scores = {}
-        for worker in self.input_data.workers:
-            date = self._get_worker_date_availability(worker, task, min_date, work_plan_dict)
-            scores[worker.id] = date
+    def _worker_availability_scores_for_task(self, task: Task, slots: dict[str, tuple[date, date]], min_date: date) -> dict[str, float]:
+        dates = {}
+        # группы навыков, в которых уже есть работник, свободный с min_date
+        saturated_groups = set()
+        for worker in self.worker_index.by_dominance(task.workTypeId):
+            group = self.worker_index.skill_group[worker.id]
+            # у работника с теми же навыками ценность та же, а раньше min_date он не начнёт:
+            # оценка не выше, чем у уже найденного работника не медленнее его
+            if group in saturated_groups:
+                metrics.count("dominated_workers")
+                continue
+            worker_date = slots[worker.id][0]
+            dates[worker.id] = worker_date
+            if worker_date == min_date:
+                saturated_groups.add(group)
+
+        # исходный порядок работников, чтобы при равных оценках выбор не зависел от порядка проверки
+        scores = {worker.id: dates[worker.id] for worker in self.worker_index.eligible_for(task.workTypeId) if worker.id in dates}
+        if len(scores) == 0:
+            return scores
 
         max_date = max(scores.values())
         min_date = min(scores.values())
@@ -184,33 +268,30 @@ class AdvancedOptimizer:
         # нормализуем значения
         return {k: 1.0 - ((v - min_date).days + 1) / diff for k, v in scores.items()}
 
-    def _get_worker_date_availability(self, worker: Worker, task: Task, min_date: date, work_plan_dict: dict[str, AssignedTask]) -> date:
-        # извлекаем все задачи, которые назначены на этого работника
-        worker_tasks = [t for t in work_plan_dict.values() if t.workerId == worker.id]
-        worker_tasks.sort(key=lambda x: x.start)
-
-        # идём по задачам и ищем ту, после которой можно поставить текущую
-        assumed_task_start = min_date
-        assumed_task_end = calculate_task_end_date(assumed_task_start, task.baseDuration, worker.productivity, self.input_data.holidays)
-
-        # если нет задач или влезает до первой, ставим в min_date
-        if len(worker_tasks) == 0 or worker_tasks[0].start > assumed_task_end:
-            return assumed_task_start
-
-        # если одна задача, смотрим, влезет ли до неё или после
-        if len(worker_tasks) == 1:
-            return closest_workday(max(min_date, worker_tasks[0].end + timedelta(days=1)), self.input_data.holidays)
-
-        # если несколько задач, идём по всем и ищем ту, после которой можно поставить текущую
-        for i in range(len(worker_tasks) - 1):
-            assumed_task_start = closest_workday(max(min_date, worker_tasks[i].end + timedelta(days=1)), self.input_data.holidays)
-            assumed_task_end = calculate_task_end_date(assumed_task_start, task.baseDuration, worker.productivity, self.input_data.holidays)
-
-            if assumed_task_end < worker_tasks[i + 1].start:
-                return assumed_task_start
-
-        # если ничего не подошло, ставим после последней задачи
-        return closest_workday(max(min_date, worker_tasks[-1].end + timedelta(days=1)), self.input_data.holidays)
+    def _earliest_slots(self, task: Task, min_date: date, work_plan_dict: dict[str, AssignedTask]) -> dict[str, tuple[date, date]]:
+        """
+        Самые ранние даты начала и конца задачи у всех подходящих работников.
+        Занятость собирается за один проход по плану, а окна ищутся сразу для всех работников
+        (WorkCalendar.earliest_starts) вместо перебора дней для каждого работника по отдельности.
+        """
+        workers = self.worker_index.eligible_for(task.workTypeId)
+        busy: dict[str, list[AssignedTask]] = {worker.id: [] for worker in workers}
+        for assigned in work_plan_dict.values():
+            if assigned.workerId in busy:
+                busy[assigned.workerId].append(assigned)
+
+        counts, busy_starts, busy_ends = [], [], []
+        for worker in workers:
+            worker_tasks = sorted(busy[worker.id], key=lambda x: x.start)
+            counts.append(len(worker_tasks))
+            busy_starts.extend(t.start.toordinal() for t in worker_tasks)
+            busy_ends.extend(t.end.toordinal() for t in worker_tasks)
+        durations = [ceil(task.baseDuration / worker.productivity) for worker in workers]
+
+        starts, ends = self.calendar.earliest_starts(min_date, np.array(durations, dtype=np.int64), np.array(counts, dtype=np.int64),
+                                                     np.array(busy_starts, dtype=np.int64), np.array(busy_ends, dtype=np.int64))
+        return {worker.id: (date.fromordinal(int(start)), date.fromordinal(int(end)))
+                for worker, start, end in zip(workers, starts, ends)}
 
     def _get_order_score(self, order: Order, earning_coefficient: float) -> float:
         order_earning = self.orders_earning[order.id]
@@ -232,20 +313,53 @@ class AdvancedOptimizer:
         """
         Нормализует значения в словаре в диапазон [0, 1]
         """
+        if len(values) == 0:
+            return {}
         min_value = min(values.values())
         max_value = max(values.values())
+        # все значения одинаковые - нормализовать не к чему
+        if max_value == min_value:
+            return {key: 0.0 for key in values}
         return {key: (value - min_value) / (max_value - min_value) for key, value in values.items()}
 
+    def _construct_remainders(self, orders: Orders):
+        """
+        Остатки заказов с зафиксированными задачами: незафиксированные задачи без зависимостей от зафиксированных.
+        Остаток начинается не раньше дня после окончания зафиксированных задач, от которых он зависит,
+        поэтому оценка прибыли и проверка мощности не считают заново уже сделанную работу.
+        У полностью зафиксированного заказа остаток пустой.
+        """
+        self.remainders: dict[str, Order] = {}
+        self.remainder_start: dict[str, date] = {}
+        if self.initial_plan is None:
+            return
+        frozen = {t.taskId: t for t in self.initial_plan.root}
+        for order in orders.root:
+            if not any(task.id in frozen for task in order.tasks):
+                continue
+            tasks = [task.model_copy(update={"dependsOn": [dep_id for dep_id in task.dependsOn if dep_id not in frozen]})
+                     for task in order.tasks if task.id not in frozen]
+            self.remainders[order.id] = order.model_copy(update={"tasks": tasks})
+            ends = [frozen[dep_id].end for task in order.tasks if task.id not in frozen
+                    for dep_id in task.dependsOn if dep_id in frozen]
+            self.remainder_start[order.id] = max([self.input_data.currentDate] + [end + timedelta(days=1) for end in ends])
+
     def _filter_orders(self, orders: Orders) -> Orders:
-        _orders = []
+        # полностью зафиксированные заказы остаются всегда: в них нечего ни оценивать, ни двигать
+        fixed = {order_id for order_id, remainder in self.remainders.items() if len(remainder.tasks) == 0}
+        _orders = [order for order in orders.root if order.id in fixed or self._estimated_total_order_earning(order) > 0]
+        if self.admission:
+            # допуск считает мощность от currentDate для целых заказов, поэтому заказы с зафиксированными задачами его не проходят
+            admitted = {order.id for order in admit_orders(self.input_data, [o for o in _orders if o.id not in self.remainders],
+                                                           self.estimator)}
+            _orders = [order for order in _orders if order.id in admitted or order.id in self.remainders]
         self.orders_earning = {}
         self.orders_importance = {}
-        for order in orders.root:
-            earning = self._estimated_total_order_earning(order)
-            if earning > 0:
-                _orders.append(order)
-                self.orders_earning[order.id] = earning
-                self.orders_importance[order.id] = (order.deadline - self.input_data.currentDate).days
+        for order in _orders:
+            if order.id in fixed:
+                continue
+            self.orders_earning[order.id] = self._estimated_total_order_earning(order)
+            self.orders_importance[order.id] = (order.deadline - self.input_data.currentDate).days
         # нормализуем orders_earning
         self.orders_earning = self._normalize_values(self.orders_earning)
         self.orders_importance = self._normalize_values(self.orders_importance)
@@ -290,6 +404,5 @@ class AdvancedOptimizer:
         return total_days / total_productivity
 
     def _estimated_total_order_earning(self, order: Order) -> float:
-        duration = calculate_order_duration(order, self.input_data)
-        total_company_cost = self.input_data.companyDayCost * duration
-        return order.earning - total_company_cost
+        # оценщик построен по остаткам, поэтому для заказа с зафиксированными задачами это оценка остатка
+        return self.estimator.estimated_earning(order, self.remainder_start.get(order.id))
@@ -0,0 +1,134 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import json
+import os
+from pathlib import Path
+import sys
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+from pydantic import TypeAdapter, ValidationError
+from checker import check_compiled
+from models import InputData, Orders, WorkPlan
+from problem import CompiledProblem
+from utils import load_model
+
+_problem: CompiledProblem | None = None
+_work_plan_adapter = TypeAdapter(WorkPlan)
+
+
+def iter_plan_sources(source: str | Path) -> Iterator[Tuple[str, str]]:
+    """
+    Перебирает планы для пакетной проверки и возвращает пары (имя плана, JSON плана).
+
+    Поддерживаются:
+        - каталог: все файлы *.json в нём, в алфавитном порядке;
+        - файл .jsonl или "-" (стандартный ввод): по плану на строку, строка - массив задач
+          или объект {"name": ..., "plan": [...]};
+        - отдельный файл .json с одним планом.
+    """
+    if str(source) == "-":
+        yield from _iter_jsonl(sys.stdin, "stdin")
+        return
+
+    path = Path(source)
+    if path.is_dir():
+        for file in sorted(path.glob("*.json")):
+            yield file.name, file.read_text(encoding="utf-8")
+    elif path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _iter_jsonl(f, path.name)
+    else:
+        yield path.name, path.read_text(encoding="utf-8")
+
+
+def _iter_jsonl(stream: TextIO, source_name: str) -> Iterator[Tuple[str, str]]:
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        name = f"{source_name}:{line_number}"
+        if line.startswith("{"):
+            # имя берём из объекта, а сам план передаём дальше строкой, чтобы валидировать его в проверяющем процессе
+            try:
+                record = json.loads(line)
+                yield str(record.get("name", name)), json.dumps(record.get("plan"))
+            except json.JSONDecodeError:
+                yield name, line
+        else:
+            yield name, line
+
+
+def _init_worker(problem: CompiledProblem):
+    global _problem
+    _problem = problem
+
+
+def _check_one(item: Tuple[str, str]) -> Dict[str, Any]:
+    name, plan_json = item
+    try:
+        work_plan = _work_plan_adapter.validate_json(plan_json)
+    except ValidationError as e:
+        return {"plan": name, "success": False, "errors": [f"Некорректный план: {e}"]}
+    try:
+        result = check_compiled(_problem, work_plan)
+    except Exception as e:
+        # ошибка проверки одного плана не должна останавливать всю пачку
+        return {"plan": name, "success": False, "errors": [f"Ошибка проверки: {e!r}"]}
+    return {"plan": name, **result.model_dump()}
+
+
+def _check_chunk(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    return [_check_one(item) for item in items]
+
+
+def batch_check(problem: CompiledProblem, source: str | Path, output: TextIO, processes: int | None = None,
+                chunksize: int = 4) -> int:
+    """
+    Проверяет много планов против одной задачи и пишет по строке JSON Lines на каждый план
+    (имя плана и поля CheckResult) в порядке следования планов.
+
+    Args:
+        problem: скомпилированная задача, передаётся в каждый процесс один раз при его запуске
+        source: каталог, файл .jsonl или "-" (см. iter_plan_sources)
+        output: куда писать результаты
+        processes: число процессов; по умолчанию по числу ядер, 1 - без пула процессов
+        chunksize: сколько планов отдавать процессу за раз; в работе одновременно не больше 2 * processes
+            таких порций, поэтому планы читаются из source по мере проверки, а не целиком заранее
+
+    Returns:
+        int: число планов, не прошедших проверку
+    """
+    processes = processes or os.cpu_count() or 1
+    failed = 0
+
+    def write(record: Dict[str, Any]):
+        nonlocal failed
+        if not record["success"]:
+            failed += 1
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    if processes == 1:
+        _init_worker(problem)
+        for item in iter_plan_sources(source):
+            write(_check_one(item))
+        return failed
+
+    items = iter_plan_sources(source)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(problem,)) as executor:
+        # executor.map забрал бы все планы сразу; окно порций сохраняет порядок и ограничивает память
+        pending = deque()
+        while True:
+            while len(pending) < 2 * processes:
+                chunk = list(islice(items, chunksize))
+                if len(chunk) == 0:
+                    break
+                pending.append(executor.submit(_check_chunk, chunk))
+            if len(pending) == 0:
+                break
+            for record in pending.popleft().result():
+                write(record)
+    return failed
+
+
+def load_problem(input_path: str | Path, orders_path: str | Path) -> CompiledProblem:
+    return CompiledProblem(load_model(orders_path, Orders), load_model(input_path, InputData))
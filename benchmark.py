@@ -0,0 +1,187 @@
+from datetime import datetime
+import json
+import multiprocessing as mp
+import os
+from pathlib import Path
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from checker import check
+from engines import ENGINES, run_engine
+from instance_generator import GeneratorConfig, generate_instance
+from instrumentation import metrics
+from models import InputData, Orders, WorkPlan
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_ENGINES = ["check", "simple", "advanced", "ga"]
+
+
+def _measure(engine: str, input_data: InputData, orders: Orders, work_plan: WorkPlan | None) -> Dict[str, Any]:
+    """
+    Выполняет один замер: время, пиковую память (tracemalloc, только текущий процесс) и прибыль.
+    Для движка check проверяется переданный план, для остальных - построенный движком.
+    """
+    # оптимизаторы меняют входные модели (сортируют работников и задачи), поэтому работаем с копиями
+    input_data = input_data.model_copy(deep=True)
+    orders = orders.model_copy(deep=True)
+
+    metrics.enabled = True
+    metrics.reset()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    if engine == "check":
+        result = check(orders, work_plan, input_data)
+    else:
+        work_plan = run_engine(engine, input_data, orders)
+    wall_time = time.perf_counter() - start_time
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    engine_metrics = metrics.snapshot()
+
+    if engine != "check":
+        result = check(orders, work_plan, input_data)
+
+    return {
+        "status": "ok",
+        "wall_time": wall_time,
+        "peak_memory_mb": peak_memory / 2 ** 20,
+        "profit": result.total_earning,
+        "success": result.success,
+        "orders_completed": result.orders_completed,
+        "total_days": result.total_days,
+        "assigned_tasks": len(work_plan.root),
+        "metrics": engine_metrics,
+    }
+
+
+def _measure_in_child(connection, engine: str, input_data: InputData, orders: Orders, work_plan: WorkPlan | None):
+    try:
+        connection.send(_measure(engine, input_data, orders, work_plan))
+    except Exception as e:
+        connection.send({"status": "error", "error": repr(e)})
+    finally:
+        connection.close()
+
+
+def measure_with_timeout(engine: str, input_data: InputData, orders: Orders,
+                         work_plan: WorkPlan | None = None, timeout: float | None = None) -> Dict[str, Any]:
+    """
+    Запускает замер в отдельном процессе, чтобы память одного движка не влияла на другой
+    и чтобы зависший прогон можно было прервать по таймауту.
+    """
+    parent_connection, child_connection = mp.Pipe(duplex=False)
+    process = mp.Process(target=_measure_in_child, args=(child_connection, engine, input_data, orders, work_plan))
+    process.start()
+    child_connection.close()
+
+    if parent_connection.poll(timeout):
+        try:
+            result = parent_connection.recv()
+        except EOFError:
+            result = {"status": "error", "error": "процесс замера завершился без результата"}
+    else:
+        process.terminate()
+        result = {"status": "timeout", "wall_time": timeout}
+    process.join()
+    return result
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(config: GeneratorConfig, scales: List[int] = DEFAULT_SCALES, engines: List[str] = DEFAULT_ENGINES,
+                  timeout: float | None = None) -> Dict[str, Any]:
+    """
+    Прогоняет движки и проверку на синтетических задачах разного размера.
+
+    Args:
+        config: базовая конфигурация генератора (размер 1x)
+        scales: множители размера задачи
+        engines: список движков: check, simple, advanced, ga
+        timeout: ограничение времени на один замер в секундах
+
+    Returns:
+        dict: отчёт с метаданными и списком замеров
+    """
+    records = []
+    for scale in scales:
+        input_data, orders = generate_instance(config.scaled(scale))
+        tasks_count = sum(len(order.tasks) for order in orders.root)
+        print(f"Масштаб {scale}x: заказов {len(orders.root)}, задач {tasks_count}, работников {len(input_data.workers)}")
+
+        # для проверки нужен план; строим его простым оптимизатором вне замера
+        check_plan = run_engine("simple", input_data.model_copy(deep=True), orders.model_copy(deep=True)) if "check" in engines else None
+
+        for engine in engines:
+            record = measure_with_timeout(engine, input_data, orders, check_plan, timeout)
+            record.update({
+                "engine": engine,
+                "scale": scale,
+                "orders": len(orders.root),
+                "tasks": tasks_count,
+                "workers": len(input_data.workers),
+            })
+            records.append(record)
+            profit = f"{record.get('profit', 0):,.0f}".replace(',', ' ')
+            print(f"  {engine}: {record['status']}, время {record.get('wall_time') or 0:.2f} с, "
+                  f"память {record.get('peak_memory_mb', 0):.1f} МБ, прибыль {profit}")
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": config.model_dump(mode="json"),
+        "results": records,
+    }
+
+
+def compare_reports(old_report: Dict[str, Any], new_report: Dict[str, Any]) -> List[str]:
+    """Сравнивает два отчёта по совпадающим парам (движок, масштаб)."""
+    old_by_key = {(r["engine"], r["scale"]): r for r in old_report["results"]}
+    lines = []
+    for record in new_report["results"]:
+        old = old_by_key.get((record["engine"], record["scale"]))
+        if old is None or old["status"] != "ok" or record["status"] != "ok":
+            continue
+        time_ratio = record["wall_time"] / old["wall_time"] if old["wall_time"] > 0 else float("inf")
+        old_profit = f"{old['profit']:,.0f}".replace(',', ' ')
+        new_profit = f"{record['profit']:,.0f}".replace(',', ' ')
+        lines.append(
+            f"{record['engine']:>10} {record['scale']:>4}x: время x{time_ratio:.2f}, "
+            f"память {old['peak_memory_mb']:.1f} -> {record['peak_memory_mb']:.1f} МБ, "
+            f"прибыль {old_profit} -> {new_profit}"
+        )
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Замеры масштабируемости проверки и оптимизаторов")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--engines", nargs="+", default=DEFAULT_ENGINES, choices=["check"] + list(ENGINES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, help="ограничение на один замер, секунд")
+    parser.add_argument("--output", help="файл отчёта (по умолчанию data/benchmarks/<время>.json)")
+    parser.add_argument("--compare", help="предыдущий отчёт для сравнения")
+    args = parser.parse_args()
+
+    # pygad рисует график в конце, в пакетном режиме он не нужен
+    os.environ.setdefault("MPLBACKEND", "Agg")
+
+    report = run_benchmark(GeneratorConfig(seed=args.seed), args.scales, args.engines, args.timeout)
+
+    output = Path(args.output) if args.output else Path("data") / "benchmarks" / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Отчёт сохранён: {output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\n".join(compare_reports(previous, report)))
@@ -0,0 +1,105 @@
+from datetime import date
+from math import ceil
+from typing import Dict, List
+import numpy as np
+from estimates import OrderEstimator
+from models import InputData, Worker
+from models.orders import Order
+from work_calendar import WorkCalendar
+
+
+class CapacityProfile:
+    """
+    Свободная мощность по типам работ на горизонте: для каждого типа работ массив по рабочим дням
+    (от currentDate) с суммарной продуктивностью подходящих работников, ещё не занятых в этот день.
+    При назначении задачи день работника вычитается из всех типов работ, которые он умеет.
+    Накопленные суммы пересчитываются лениво, поэтому мощность на любом интервале - две выборки.
+
+    Проверка допуска заказа - необходимое условие: если не проходит, заказ нельзя закончить
+    до даты, после которой штраф съедает всю выручку, и размещать его бессмысленно.
+    """
+    def __init__(self, input_data: InputData, calendar: WorkCalendar | None = None,
+                 estimator: OrderEstimator | None = None, horizon_workdays: int = 512):
+        self.input_data = input_data
+        self.calendar = calendar if calendar is not None else WorkCalendar(input_data.holidays, input_data.currentDate)
+        self.estimator = estimator
+        self.work_type_ids: List[str] = [work_type.id for work_type in input_data.workTypes]
+        self.row: Dict[str, int] = {work_type_id: i for i, work_type_id in enumerate(self.work_type_ids)}
+
+        # мощность одного дня по типам работ при полностью свободных работниках
+        self.full_capacity = np.zeros(len(self.work_type_ids))
+        for worker in input_data.workers:
+            for row in self._worker_rows(worker):
+                self.full_capacity[row] += worker.productivity
+
+        self.free = np.repeat(self.full_capacity[:, None], horizon_workdays, axis=1)
+        self._cumulative: np.ndarray | None = None
+
+    def _worker_rows(self, worker: Worker) -> List[int]:
+        return [self.row[work_type_id] for work_type_id in dict.fromkeys(worker.workTypeIds) if work_type_id in self.row]
+
+    def _index(self, d: date, side: str = "left") -> int:
+        """Номер рабочего дня от currentDate: для side="right" - число рабочих дней не позже d."""
+        # задачи до начала календаря (например, зафиксированные при перепланировании) мощность не занимают
+        if d.toordinal() < self.calendar.start:
+            return 0
+        return self.calendar.workday_index(d, side)
+
+    def _ensure(self, workdays: int):
+        if workdays > self.free.shape[1]:
+            extra = max(workdays - self.free.shape[1], self.free.shape[1])
+            self.free = np.concatenate([self.free, np.repeat(self.full_capacity[:, None], extra, axis=1)], axis=1)
+            self._cumulative = None
+
+    def _add(self, worker: Worker, start: date, end: date, sign: float):
+        first, last = self._index(start), self._index(end, side="right")
+        if last <= first:
+            return
+        self._ensure(last)
+        self.free[self._worker_rows(worker), first:last] += sign * worker.productivity
+        self._cumulative = None
+
+    def assign(self, worker: Worker, start: date, end: date):
+        """Занимает работника на рабочие дни с start по end включительно."""
+        self._add(worker, start, end, -1.0)
+
+    def release(self, worker: Worker, start: date, end: date):
+        self._add(worker, start, end, 1.0)
+
+    def free_capacity(self, work_type_id: str, start: date, end: date) -> float:
+        """Свободная мощность типа работ (в базовых днях) на рабочих днях с start по end включительно."""
+        if work_type_id not in self.row:
+            return 0.0
+        first, last = self._index(start), self._index(end, side="right")
+        if last <= first:
+            return 0.0
+        self._ensure(last)
+        if self._cumulative is None:
+            self._cumulative = np.concatenate([np.zeros((len(self.work_type_ids), 1)), np.cumsum(self.free, axis=1)], axis=1)
+        row = self.row[work_type_id]
+        return float(self._cumulative[row, last] - self._cumulative[row, first])
+
+    def latest_useful_date(self, order: Order) -> date | None:
+        """Последняя дата окончания, при которой заказ ещё приносит выручку; None - без ограничения."""
+        if order.penaltyByDay <= 0:
+            return None
+        return date.fromordinal(order.deadline.toordinal() + max(ceil(order.earning / order.penaltyByDay) - 1, 0))
+
+    def admits(self, order: Order, start: date | None = None) -> bool:
+        """
+        Может ли заказ, начатый не раньше start, закончиться до latest_useful_date:
+        критический путь укладывается в срок, и по каждому типу работ свободной мощности хватает на объём работ.
+        """
+        start = start or self.input_data.currentDate
+        latest = self.latest_useful_date(order)
+        if latest is None:
+            return True
+        if latest < start:
+            return False
+        if self.estimator is not None and self.estimator.end_date(order, start) > latest:
+            return False
+
+        work: Dict[str, float] = {}
+        for task in order.tasks:
+            work[task.workTypeId] = work.get(task.workTypeId, 0.0) + task.baseDuration
+        return all(self.free_capacity(work_type_id, start, latest) >= amount for work_type_id, amount in work.items())
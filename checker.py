@@ -2,6 +2,8 @@ from datetime import date
 from typing import List
 from pydantic import BaseModel
 from models import WorkPlan, Orders, InputData
+from instrumentation import metrics
+from problem import CompiledProblem
 from utils import aggregate_work_plan, calculate_order_cost
 from validators import validate_task_duration, validate_task_worker_compatibility, validate_task_overlap, \
     validate_dependencies
@@ -35,6 +37,16 @@ class CheckResult(BaseModel):
 
 
 def check(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> CheckResult:
+    return check_compiled(CompiledProblem(orders, input_data), work_plan)
+
+
+def check_compiled(problem: CompiledProblem, work_plan: WorkPlan) -> CheckResult:
+    """
+    Проверка плана по заранее скомпилированной задаче: индексы заказов и работников
+    строятся один раз и переиспользуются для любого числа планов.
+    """
+    orders = problem.orders
+    input_data = problem.input_data
     result = CheckResult(
         success=False,
         total_earning=0,
@@ -47,20 +59,29 @@ def check(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> CheckRe
         warnings=[]
     )
 
-    plan, total_days = aggregate_work_plan(orders, work_plan, input_data)
-    for task_id, task in plan.items():
-        # критические проверки
-        validate_task_worker_compatibility(task, result.errors)
-        validate_task_overlap(task, plan, result.errors)
-        validate_dependencies(task, plan, result.errors)
+    with metrics.phase("check.aggregate"):
+        plan, total_days = aggregate_work_plan(orders, work_plan, input_data, problem)
+
+    # группируем задачи по работникам, чтобы искать пересечения только среди задач одного работника
+    tasks_by_worker = {}
+    for task in plan.values():
+        tasks_by_worker.setdefault(task.assigned_task.workerId, []).append(task)
+
+    with metrics.phase("check.validate"):
+        for task_id, task in plan.items():
+            # критические проверки
+            validate_task_worker_compatibility(task, result.errors)
+            validate_task_overlap(task, plan, result.errors, tasks_by_worker)
+            validate_dependencies(task, plan, result.errors)
+
+            # проверка длительности
+            validate_task_duration(task, input_data, result.warnings, problem.holidays)
 
-        # проверка длительности
-        validate_task_duration(task, input_data, result.warnings)
+    # Преобразуем словарь TaskDetails в словарь AssignedTask
+    assigned_tasks = {task_id: task.assigned_task for task_id, task in plan.items()}
 
     # считаем доход
     for order in orders.root:
-        # Преобразуем словарь TaskDetails в словарь AssignedTask
-        assigned_tasks = {task_id: task.assigned_task for task_id, task in plan.items()}
         earning, penalty, delay_days, is_completed = calculate_order_cost(order, assigned_tasks)
         if is_completed:
             result.orders_completed += 1
@@ -78,6 +99,7 @@ def check(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> CheckRe
 
 
 def only_calculate_earning(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> float:
+    metrics.count("fitness_evaluations")
     result = CheckResult(
         success=False,
         total_earning=0,
@@ -0,0 +1,184 @@
+import csv
+from datetime import date
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from models import InputData, Orders, WorkPlan
+from models.work_plan import AssignedTask
+from problem import CompiledProblem
+
+PLAN_FIELDS = ["task_code", "worker_code", "order_code", "start", "end", "task_id", "worker_id", "order_id"]
+ORDER_FIELDS = ["order_code", "order_id", "completed", "completion_date", "delay_days",
+                "earning", "penalty", "profit"]
+
+
+class PlanColumns:
+    """
+    План работ по столбцам: коды задач, работников и заказов и даты как порядковые номера (date.toordinal).
+    Код - позиция идентификатора в таблице кодов: сначала задачи заказов и работники задачи в исходном порядке,
+    затем идентификаторы из плана, которых в задаче нет. Задача без заказа (или запись без задачи)
+    имеет код заказа -1, запись без задачи - код задачи -1.
+    """
+    def __init__(self, task_ids: List[str], worker_ids: List[str], order_ids: List[str],
+                 task_code: np.ndarray, worker_code: np.ndarray, order_code: np.ndarray,
+                 start: np.ndarray, end: np.ndarray):
+        self.task_ids = task_ids
+        self.worker_ids = worker_ids
+        self.order_ids = order_ids
+        self.task_code = np.asarray(task_code, dtype=np.int64)
+        self.worker_code = np.asarray(worker_code, dtype=np.int64)
+        self.order_code = np.asarray(order_code, dtype=np.int64)
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+
+    @classmethod
+    def from_plan(cls, work_plan: WorkPlan, problem: CompiledProblem) -> "PlanColumns":
+        order_ids = [order.id for order in problem.orders.root]
+        order_code_by_id = {order_id: i for i, order_id in enumerate(order_ids)}
+        task_ids = [task.id for order in problem.orders.root for task in order.tasks]
+        worker_ids = [worker.id for worker in problem.input_data.workers]
+        task_code_by_id: Dict[str, int] = {task_id: i for i, task_id in enumerate(task_ids)}
+        worker_code_by_id: Dict[str, int] = {worker_id: i for i, worker_id in enumerate(worker_ids)}
+
+        rows = work_plan.root
+        task_code = np.empty(len(rows), dtype=np.int64)
+        worker_code = np.empty(len(rows), dtype=np.int64)
+        order_code = np.empty(len(rows), dtype=np.int64)
+        for i, assigned in enumerate(rows):
+            if assigned.taskId is None:
+                task_code[i] = -1
+            else:
+                task_code[i] = task_code_by_id.setdefault(assigned.taskId, len(task_code_by_id))
+            worker_code[i] = worker_code_by_id.setdefault(assigned.workerId, len(worker_code_by_id))
+            order = problem.order_by_task_id.get(assigned.taskId) if assigned.taskId is not None else None
+            order_code[i] = order_code_by_id[order.id] if order is not None else -1
+
+        return cls(list(task_code_by_id), list(worker_code_by_id), order_ids, task_code, worker_code, order_code,
+                   np.fromiter((t.start.toordinal() for t in rows), dtype=np.int64, count=len(rows)),
+                   np.fromiter((t.end.toordinal() for t in rows), dtype=np.int64, count=len(rows)))
+
+    def to_work_plan(self) -> WorkPlan:
+        """План из столбцов без валидации моделей: данные уже прошли её при экспорте."""
+        rows = [AssignedTask.trusted(taskId=self.task_ids[t] if t >= 0 else None, workerId=self.worker_ids[w],
+                                     start=date.fromordinal(s), end=date.fromordinal(e))
+                for t, w, s, e in zip(self.task_code.tolist(), self.worker_code.tolist(),
+                                      self.start.tolist(), self.end.tolist())]
+        return WorkPlan.trusted(rows)
+
+
+class OrderBreakdown:
+    """
+    Итоги по каждому заказу так же, как их считает check: заказ засчитывается, если все его задачи в плане
+    у известных работников и штраф меньше выручки; прибыль заказа - выручка минус штраф.
+    Дни работы фирмы - от самого раннего начала до самого позднего окончания задач заказов.
+    """
+    def __init__(self, columns: PlanColumns, problem: CompiledProblem):
+        orders = problem.orders.root
+        n = len(orders)
+        known_workers = len(problem.input_data.workers)
+
+        # как в aggregate_work_plan: учитываются задачи заказов у известных работников, при повторе - последняя запись
+        valid = np.flatnonzero((columns.order_code >= 0) & (columns.worker_code < known_workers))
+        _, last = np.unique(columns.task_code[valid][::-1], return_index=True)
+        rows = valid[::-1][last]
+        order_code = columns.order_code[rows]
+
+        placed = np.bincount(order_code, minlength=n)
+        task_count = np.array([len(order.tasks) for order in orders], dtype=np.int64)
+        completion = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(completion, order_code, columns.end[rows])
+
+        self.order_ids = [order.id for order in orders]
+        self.completed = (placed == task_count) & (task_count > 0)
+        self.completion = np.where(self.completed, completion, 0)
+        deadline = np.array([order.deadline.toordinal() for order in orders], dtype=np.int64)
+        self.delay_days = np.where(self.completed, np.maximum(self.completion - deadline, 0), 0)
+        self.earning = np.array([order.earning for order in orders], dtype=np.float64)
+        self.penalty = np.array([order.penaltyByDay for order in orders], dtype=np.float64) * self.delay_days
+        counted = self.completed & (self.penalty < self.earning)
+        self.profit = np.where(counted, self.earning - self.penalty, 0.0)
+        self.orders_completed = int(counted.sum())
+
+        self.total_days = int(columns.end[rows].max() - columns.start[rows].min() + 1) if len(rows) else 0
+        self.total_cost = self.total_days * problem.input_data.companyDayCost
+        self.total_earning = float(self.profit.sum()) - self.total_cost
+
+
+def export_plan(work_plan: WorkPlan, orders: Orders, input_data: InputData, path: str | Path,
+                problem: CompiledProblem | None = None):
+    """
+    Сохраняет план и итоги по заказам по столбцам.
+    .npz - все массивы, таблицы кодов и итоги в одном файле;
+    .csv - план в path и итоги по заказам в файле с суффиксом .orders.csv рядом.
+    """
+    path = Path(path)
+    problem = problem if problem is not None else CompiledProblem(orders, input_data)
+    columns = PlanColumns.from_plan(work_plan, problem)
+    breakdown = OrderBreakdown(columns, problem)
+
+    if path.suffix == ".npz":
+        np.savez_compressed(
+            path,
+            task_ids=np.array(columns.task_ids, dtype=str), worker_ids=np.array(columns.worker_ids, dtype=str),
+            order_ids=np.array(columns.order_ids, dtype=str),
+            task_code=columns.task_code, worker_code=columns.worker_code, order_code=columns.order_code,
+            start=columns.start, end=columns.end,
+            order_completed=breakdown.completed, order_completion=breakdown.completion,
+            order_delay_days=breakdown.delay_days, order_earning=breakdown.earning,
+            order_penalty=breakdown.penalty, order_profit=breakdown.profit,
+            total_days=breakdown.total_days, total_cost=breakdown.total_cost, total_earning=breakdown.total_earning,
+        )
+    elif path.suffix == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(PLAN_FIELDS)
+            for t, w, o, s, e in zip(columns.task_code.tolist(), columns.worker_code.tolist(), columns.order_code.tolist(),
+                                     columns.start.tolist(), columns.end.tolist()):
+                writer.writerow([t, w, o, date.fromordinal(s).isoformat(), date.fromordinal(e).isoformat(),
+                                 columns.task_ids[t] if t >= 0 else "", columns.worker_ids[w],
+                                 columns.order_ids[o] if o >= 0 else ""])
+        with open(path.with_suffix(".orders.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(ORDER_FIELDS)
+            for i, order_id in enumerate(breakdown.order_ids):
+                completed = bool(breakdown.completed[i])
+                writer.writerow([i, order_id, int(completed),
+                                 date.fromordinal(int(breakdown.completion[i])).isoformat() if completed else "",
+                                 int(breakdown.delay_days[i]), breakdown.earning[i], breakdown.penalty[i], breakdown.profit[i]])
+    else:
+        raise ValueError(f"Неизвестный формат {path.suffix}: ожидается .npz или .csv")
+
+
+def load_columns(path: str | Path) -> PlanColumns:
+    """Загружает план, сохранённый export_plan, сразу в столбцы, без разбора JSON и валидации моделей."""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path, allow_pickle=False) as data:
+            return PlanColumns(data["task_ids"].tolist(), data["worker_ids"].tolist(), data["order_ids"].tolist(),
+                               data["task_code"], data["worker_code"], data["order_code"], data["start"], data["end"])
+    if path.suffix == ".csv":
+        task_ids: Dict[int, str] = {}
+        worker_ids: Dict[int, str] = {}
+        order_ids: Dict[int, str] = {}
+        codes: List[List[int]] = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                t, w, o = int(row["task_code"]), int(row["worker_code"]), int(row["order_code"])
+                if t >= 0:
+                    task_ids[t] = row["task_id"]
+                worker_ids[w] = row["worker_id"]
+                if o >= 0:
+                    order_ids[o] = row["order_id"]
+                codes.append([t, w, o, date.fromisoformat(row["start"]).toordinal(), date.fromisoformat(row["end"]).toordinal()])
+        # в CSV есть только коды, встречающиеся в плане; таблицы кодов восстанавливаются с пропусками
+        table = np.array(codes, dtype=np.int64).reshape(-1, 5)
+        return PlanColumns(_code_table(task_ids), _code_table(worker_ids), _code_table(order_ids),
+                           table[:, 0], table[:, 1], table[:, 2], table[:, 3], table[:, 4])
+    raise ValueError(f"Неизвестный формат {path.suffix}: ожидается .npz или .csv")
+
+
+def _code_table(ids: Dict[int, str]) -> List[str]:
+    table = [""] * (max(ids) + 1 if ids else 0)
+    for code, identifier in ids.items():
+        table[code] = identifier
+    return table
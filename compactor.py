@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+import heapq
+from typing import Dict, List
+from instrumentation import metrics
+from models import InputData, Orders, WorkPlan
+from models.work_plan import AssignedTask
+from problem import CompiledOrders
+from work_calendar import WorkCalendar
+
+
+def compact_plan(orders: Orders, work_plan: WorkPlan, input_data: InputData,
+                 calendar: WorkCalendar | None = None) -> WorkPlan:
+    """
+    Сдвигает все задачи плана влево, на самый ранний рабочий день, который допускают зависимости
+    и предыдущая задача того же работника. Работники и порядок задач у каждого работника не меняются,
+    длительность задачи в рабочих днях сохраняется, поэтому план остаётся допустимым, а горизонт
+    (и расходы фирмы) может только сократиться.
+
+    Задачи обходятся в топологическом порядке графа "зависимости + очередь работника" с приоритетом
+    по дате начала, всего O(T log T). На месте остаются записи без задачи (taskId = None),
+    задачи вне заказов и задачи, начатые до currentDate. Задача никогда не сдвигается позже, чем была.
+    """
+    if len(work_plan.root) == 0:
+        return work_plan
+    compiled = CompiledOrders(orders)
+    calendar = calendar if calendar is not None else WorkCalendar(input_data.holidays, input_data.currentDate)
+    current_date = input_data.currentDate
+
+    entries: List[AssignedTask] = list(work_plan.root)
+    index_by_task_id: Dict[str, int] = {t.taskId: i for i, t in enumerate(entries) if t.taskId is not None}
+
+    # рёбра: зависимость -> задача и предыдущая задача работника -> следующая
+    successors: List[List[int]] = [[] for _ in entries]
+    in_degree = [0] * len(entries)
+    by_worker: Dict[str, List[int]] = {}
+    for i in sorted(range(len(entries)), key=lambda i: (entries[i].start, entries[i].end)):
+        by_worker.setdefault(entries[i].workerId, []).append(i)
+    worker_predecessor: Dict[int, int] = {}
+    for sequence in by_worker.values():
+        for previous, following in zip(sequence, sequence[1:]):
+            worker_predecessor[following] = previous
+            successors[previous].append(following)
+            in_degree[following] += 1
+    dependencies: Dict[int, List[int]] = {}
+    for i, entry in enumerate(entries):
+        task = compiled.task_by_id.get(entry.taskId) if entry.taskId is not None else None
+        if task is None:
+            continue
+        dependencies[i] = [index_by_task_id[dep_id] for dep_id in task.dependsOn if dep_id in index_by_task_id]
+        for dep in dependencies[i]:
+            successors[dep].append(i)
+            in_degree[i] += 1
+
+    with metrics.phase("compact"):
+        result = _compact(entries, successors, in_degree, dependencies, worker_predecessor, current_date, calendar)
+    metrics.count("compaction.moved", sum(new is not old for new, old in zip(result, entries)))
+    return WorkPlan.trusted(sorted(result, key=lambda x: x.start))
+
+
+def _compact(entries: List[AssignedTask], successors: List[List[int]], in_degree: List[int],
+             dependencies: Dict[int, List[int]], worker_predecessor: Dict[int, int],
+             current_date: date, calendar: WorkCalendar) -> List[AssignedTask]:
+    heap = [(entries[i].start, i) for i in range(len(entries)) if in_degree[i] == 0]
+    heapq.heapify(heap)
+    result: List[AssignedTask | None] = [None] * len(entries)
+    processed = 0
+    while processed < len(entries):
+        if not heap:
+            # цикл между зависимостями и очередью работника (план и так недопустим): остальное оставляем как есть
+            for i in range(len(entries)):
+                if result[i] is None:
+                    result[i] = entries[i]
+            break
+        _, i = heapq.heappop(heap)
+        processed += 1
+        result[i] = _shift_left(entries[i], i in dependencies, dependencies.get(i, []), worker_predecessor.get(i),
+                                result, current_date, calendar)
+        for following in successors[i]:
+            in_degree[following] -= 1
+            if in_degree[following] == 0:
+                heapq.heappush(heap, (entries[following].start, following))
+    return result
+
+
+def _shift_left(entry: AssignedTask, movable: bool, dependencies: List[int], worker_predecessor: int | None,
+                placed: List[AssignedTask | None], current_date: date, calendar: WorkCalendar) -> AssignedTask:
+    if not movable or entry.start < current_date:
+        return entry
+
+    min_date = current_date
+    for dep in dependencies:
+        min_date = max(min_date, placed[dep].end + timedelta(days=1))
+    if worker_predecessor is not None:
+        min_date = max(min_date, placed[worker_predecessor].end + timedelta(days=1))
+    new_start = calendar.closest_workday(min_date)
+    if new_start >= entry.start:
+        return entry
+
+    return AssignedTask.trusted(taskId=entry.taskId, workerId=entry.workerId, start=new_start,
+                                end=calendar.task_end_date(new_start, calendar.task_length(entry.start, entry.end)))
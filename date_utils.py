@@ -3,6 +3,7 @@ from models.orders import Task
 from models.work_plan import AssignedTask
 from models.input_data import InputData, Worker
 from math import ceil
+from instrumentation import metrics
 
 def is_weekend(d: date) -> bool:
     """Проверяет, является ли дата выходным (суббота или воскресенье)."""
@@ -19,13 +20,14 @@ def closest_workday(date: date, holidays: list[date]) -> date:
     Returns:
         date: ближайший рабочий день
     """
-    if not is_weekend(date) and date not in holidays:
-        return date
-    else:
-        return closest_workday(date + timedelta(days=1), holidays)
+    metrics.count("calendar_lookups")
+    while is_weekend(date) or date in holidays:
+        date += timedelta(days=1)
+    return date
 
 def calculate_working_days(start: date, end: date, holidays: list[date]) -> int:
     """Вычисляет количество рабочих дней между двумя датами (включительно)."""
+    metrics.count("calendar_lookups")
     delta = end - start
     working_days = 0
     for i in range(delta.days + 1):
@@ -50,6 +52,7 @@ def calculate_task_end_date(start_date: date, base_duration: int, worker_product
     Returns:
         date: дата окончания задачи
     """
+    metrics.count("calendar_lookups")
     actual_duration = ceil(base_duration / worker_productivity)
 
     end_date = start_date
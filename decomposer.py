@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from typing import Any, Dict, List, Tuple
+from engines import run_engine
+from models import InputData, Orders, WorkPlan
+from models.orders import Order
+from models.work_plan import AssignedTask
+from utils import calculate_order_cost
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+
+    def find(self, node: str) -> str:
+        self.parent.setdefault(node, node)
+        root = node
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # сжатие путей
+        while self.parent[node] != root:
+            self.parent[node], node = root, self.parent[node]
+        return root
+
+    def union(self, a: str, b: str):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def split_problem(input_data: InputData, orders: Orders) -> List[Tuple[InputData, Orders]]:
+    """
+    Делит задачу на независимые подзадачи по двудольному графу заказ - тип работ - работник.
+    Заказы из разных компонент связности не конкурируют за работников, общий у них только
+    горизонт, за который платится companyDayCost.
+
+    Returns:
+        список пар (исходные данные подзадачи, заказы подзадачи), крупные компоненты первыми
+    """
+    uf = _UnionFind()
+    for work_type in input_data.workTypes:
+        uf.find("wt:" + work_type.id)
+    for worker in input_data.workers:
+        for work_type_id in worker.workTypeIds:
+            uf.union("w:" + worker.id, "wt:" + work_type_id)
+    for order in orders.root:
+        for task in order.tasks:
+            uf.union("o:" + order.id, "wt:" + task.workTypeId)
+
+    orders_by_root: Dict[str, List[Order]] = {}
+    for order in orders.root:
+        orders_by_root.setdefault(uf.find("o:" + order.id), []).append(order)
+
+    components = []
+    for root, component_orders in orders_by_root.items():
+        workers = [w for w in input_data.workers if w.workTypeIds and uf.find("w:" + w.id) == root]
+        work_types = [wt for wt in input_data.workTypes if uf.find("wt:" + wt.id) == root]
+        sub_input = input_data.model_copy(update={"workers": workers, "workTypes": work_types})
+        components.append((sub_input, Orders(component_orders)))
+
+    components.sort(key=lambda c: sum(len(order.tasks) for order in c[1].root), reverse=True)
+    return components
+
+
+def _optimize_component(args: Tuple[str, InputData, Orders, Dict[str, Any]]) -> WorkPlan:
+    engine, input_data, orders, params = args
+    return run_engine(engine, input_data, orders, **params)
+
+
+def trim_horizon(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> WorkPlan:
+    """
+    Перебалансирует общий горизонт после слияния подпланов: отбрасывает заказы с конца плана,
+    если дни работы фирмы, которые освобождаются без них, стоят дороже, чем они приносят.
+    """
+    assigned_tasks = {t.taskId: t for t in work_plan.root}
+    if len(assigned_tasks) == 0:
+        return work_plan
+
+    # (дата окончания, вклад в прибыль, заказ) для каждого заказа, попавшего в план
+    placed = []
+    for order in orders.root:
+        ends = [assigned_tasks[task.id].end for task in order.tasks if task.id in assigned_tasks]
+        if len(ends) == 0:
+            continue
+        earning, penalty, _, is_completed = calculate_order_cost(order, assigned_tasks)
+        placed.append((max(ends), earning - penalty if is_completed else 0.0, order))
+    placed.sort(key=lambda x: x[0], reverse=True)
+
+    horizon_end = placed[0][0]
+    best_gain, best_count = 0.0, 0
+    lost = 0.0
+    for i in range(len(placed) - 1):
+        lost += placed[i][1]
+        saved = (horizon_end - placed[i + 1][0]).days * input_data.companyDayCost
+        if saved - lost > best_gain:
+            best_gain, best_count = saved - lost, i + 1
+
+    if best_count == 0:
+        return work_plan
+
+    dropped = {task.id for _, _, order in placed[:best_count] for task in order.tasks}
+    print(f"Горизонт сокращён: снято заказов с конца плана: {best_count}, выигрыш: {best_gain:,.0f}".replace(',', ' '))
+    return WorkPlan.trusted([t for t in work_plan.root if t.taskId not in dropped])
+
+
+def optimize_decomposed(input_data: InputData, orders: Orders, engine: str = "advanced",
+                        processes: int | None = None, **params: Any) -> WorkPlan:
+    """
+    Оптимизирует независимые компоненты задачи (см. split_problem) параллельно в отдельных процессах,
+    сливает подпланы и сокращает общий горизонт (см. trim_horizon).
+
+    Каждый подоптимизатор считает companyDayCost только за свой горизонт, хотя дни у компонент общие,
+    поэтому подпланы получаются осторожными: заказ, выгодный в общем горизонте, может быть отброшен.
+
+    Args:
+        input_data: исходные данные
+        orders: заказы
+        engine: движок из engines.ENGINES для каждой компоненты
+        processes: число процессов; по умолчанию по числу ядер, 1 - без пула процессов
+        params: параметры движка
+    """
+    components = split_problem(input_data, orders)
+    print(f"Компонент: {len(components)}, заказов по компонентам: "
+          f"{', '.join(str(len(c[1].root)) for c in components)}")
+
+    tasks = [(engine, sub_input, sub_orders, params) for sub_input, sub_orders in components]
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1 or len(tasks) == 1:
+        sub_plans = [_optimize_component(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            sub_plans = list(executor.map(_optimize_component, tasks))
+
+    merged: List[AssignedTask] = [t for sub_plan in sub_plans for t in sub_plan.root]
+    merged.sort(key=lambda x: x.start)
+    return trim_horizon(orders, WorkPlan.trusted(merged), input_data)
@@ -0,0 +1,92 @@
+from typing import Any, Callable, Dict
+from models import InputData, Orders, WorkPlan
+
+# Оптимизаторы импортируются внутри функций: pygad и прочие тяжёлые зависимости
+# нужны только тому движку, который действительно запускается.
+
+
+def optimize_simple(input_data: InputData, orders: Orders) -> WorkPlan:
+    from simple_optimizer import SimpleOptimizer
+    return SimpleOptimizer(input_data, orders).optimize()
+
+
+def optimize_advanced(input_data: InputData, orders: Orders, orders_window: int = 100, workers_step: float = 0.2,
+                      earning_coefficient: float = 1.0, time_limit: float | None = None,
+                      admission: bool = False) -> WorkPlan:
+    from advanced_optimizer import AdvancedOptimizer
+    return AdvancedOptimizer(input_data, orders, admission).optimize(orders_window, workers_step, earning_coefficient, time_limit)
+
+
+def optimize_genetic(input_data: InputData, orders: Orders, plot_fitness: bool = False,
+                     initial_plan: WorkPlan | None = None, time_limit: float | None = None,
+                     population: int = 20, generations: int = 15, parents_mating: int = 6,
+                     mutation_probability: float = 0.2, processes: int = 10, admission: bool = False,
+                     decoder: str = "serial") -> WorkPlan:
+    from ga_optimizer import GaOptimizer
+    optimizer = GaOptimizer(input_data, orders, admission, decoder)
+    initial_priorities = optimizer.priorities_from_plan(initial_plan) if initial_plan is not None else None
+    return optimizer.optimize(plot_fitness=plot_fitness, initial_priorities=initial_priorities, time_limit=time_limit,
+                              population=population, generations=generations, parents_mating=parents_mating,
+                              mutation_probability=mutation_probability, processes=processes)
+
+
+def optimize_annealing(input_data: InputData, orders: Orders, initial_plan: WorkPlan | None = None,
+                       time_limit: float | None = None, screen_fraction: float = 0.5,
+                       admission: bool = False, decoder: str = "serial") -> WorkPlan:
+    from ga_optimizer import GaOptimizer
+    optimizer = GaOptimizer(input_data, orders, admission, decoder)
+    initial_priorities = optimizer.priorities_from_plan(initial_plan) if initial_plan is not None else None
+    return optimizer.optimize_with_simulated_annealing(initial_priorities, time_limit, screen_fraction)
+
+
+def optimize_lns(input_data: InputData, orders: Orders, initial_plan: WorkPlan | None = None, iterations: int = 300,
+                 time_limit: float | None = None, processes: int = 1) -> WorkPlan:
+    from lns_optimizer import LnsOptimizer
+    return LnsOptimizer(input_data, orders).optimize(initial_plan, iterations, time_limit, processes)
+
+
+def optimize_island(input_data: InputData, orders: Orders, initial_plan: WorkPlan | None = None, islands: int = 4,
+                    epochs: int = 20, time_limit: float | None = None, processes: int | None = None,
+                    screen_fraction: float = 0.5, admission: bool = False, decoder: str = "serial") -> WorkPlan:
+    from island_ga_optimizer import IslandGaOptimizer
+    optimizer = IslandGaOptimizer(input_data, orders, islands=islands, screen_fraction=screen_fraction,
+                                  admission=admission, decoder=decoder)
+    return optimizer.optimize(initial_plan, epochs, time_limit, processes)
+
+
+# движки, которые умеют продолжать поиск от готового плана (параметр initial_plan)
+WARM_START_ENGINES = {"ga", "sa", "lns", "island"}
+
+# движки, которые принимают ограничение времени (параметр time_limit)
+TIME_LIMITED_ENGINES = {"advanced", "ga", "sa", "lns", "island"}
+
+# движки с отбором заказов по мощности работников до планирования (параметр admission)
+ADMISSION_ENGINES = {"advanced", "ga", "sa", "island"}
+
+# движки на приоритетах заказов GaOptimizer, которым можно выбрать декодер (параметр decoder)
+DECODER_ENGINES = {"ga", "sa", "island"}
+
+ENGINES: Dict[str, Callable[..., WorkPlan]] = {
+    "simple": optimize_simple,
+    "advanced": optimize_advanced,
+    "ga": optimize_genetic,
+    "sa": optimize_annealing,
+    "lns": optimize_lns,
+    "island": optimize_island,
+}
+
+
+def run_engine(engine: str, input_data: InputData, orders: Orders, **params: Any) -> WorkPlan:
+    """
+    Запускает оптимизатор по имени. Оптимизаторы могут менять переданные модели
+    (например, сортировать работников), поэтому при необходимости передавайте копии.
+
+    Args:
+        engine: имя движка из ENGINES
+        input_data: исходные данные
+        orders: заказы
+        params: параметры конкретного движка
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Неизвестный движок: {engine}, доступны: {', '.join(ENGINES)}")
+    return ENGINES[engine](input_data, orders, **params)
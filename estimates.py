@@ -0,0 +1,150 @@
+from datetime import date
+from math import ceil
+from typing import Dict, List, Tuple
+import numpy as np
+from models import InputData, Orders
+from models.orders import Order
+from work_calendar import WorkCalendar
+
+
+class OrderEstimator:
+    """
+    Оценки заказов до планирования, посчитанные сразу для всех заказов на матрицах,
+    дополненных до максимального числа задач в заказе:
+        - критический путь в рабочих днях, каждая задача у самого продуктивного из подходящих работников;
+        - критический путь в календарных днях от заданной даты (выходные и праздники учтены);
+        - ожидаемая задержка из-за загрузки типов работ (см. _load_delay).
+    Заказ, для задачи которого нет ни одного работника, невыполним, и его оценка прибыли равна минус бесконечности.
+    Результаты запоминаются по дате начала, поэтому повторные оценки ничего не стоят.
+    """
+    def __init__(self, input_data: InputData, orders: Orders | List[Order], calendar: WorkCalendar | None = None):
+        self.input_data = input_data
+        self.calendar = calendar if calendar is not None else WorkCalendar(input_data.holidays, input_data.currentDate)
+        self.orders: List[Order] = list(orders.root if isinstance(orders, Orders) else orders)
+        self.index_by_order_id: Dict[str, int] = {order.id: i for i, order in enumerate(self.orders)}
+
+        best_productivity: Dict[str, float] = {}
+        total_productivity: Dict[str, float] = {}
+        for worker in input_data.workers:
+            for work_type_id in worker.workTypeIds:
+                best_productivity[work_type_id] = max(best_productivity.get(work_type_id, 0.0), worker.productivity)
+                total_productivity[work_type_id] = total_productivity.get(work_type_id, 0.0) + worker.productivity
+
+        self.feasible = np.array([all(task.workTypeId in best_productivity for task in order.tasks)
+                                  for order in self.orders], dtype=bool)
+        self.critical_path = self._critical_path(best_productivity)
+        self.load_delay = self._load_delay(total_productivity)
+        self._ends: Dict[Tuple[date, bool], np.ndarray] = {}
+
+    def _critical_path(self, best_productivity: Dict[str, float]) -> np.ndarray:
+        n = len(self.orders)
+        m = max((len(order.tasks) for order in self.orders), default=0)
+        d = max((len(task.dependsOn) for order in self.orders for task in order.tasks), default=0)
+        if n == 0 or m == 0:
+            return np.zeros(n, dtype=np.int64)
+
+        durations = np.zeros((n, m), dtype=np.int64)
+        levels = np.full((n, m), -1, dtype=np.int64)
+        # зависимости как индексы задач в строке; пустые места ссылаются на дополнительный нулевой столбец m
+        deps = np.full((n, m, max(d, 1)), m, dtype=np.int64)
+        for i, order in enumerate(self.orders):
+            position = {task.id: j for j, task in enumerate(order.tasks)}
+            for j, task in enumerate(order.tasks):
+                productivity = best_productivity.get(task.workTypeId)
+                # задача занимает хотя бы один день, даже при нулевой базовой длительности
+                durations[i, j] = max(1, ceil(task.baseDuration / productivity)) if productivity else 1
+                for k, dep_id in enumerate(task.dependsOn):
+                    if dep_id in position:
+                        deps[i, j, k] = position[dep_id]
+            for task_id, level in self._task_levels(order).items():
+                levels[i, position[task_id]] = level
+
+        finish = np.zeros((n, m + 1), dtype=np.int64)
+        rows = np.arange(n)[:, None, None]
+        for level in range(int(levels.max()) + 1):
+            mask = levels == level
+            ready = finish[rows, deps].max(axis=2) + durations
+            finish[:, :m] = np.where(mask, ready, finish[:, :m])
+        return finish[:, :m].max(axis=1)
+
+    @staticmethod
+    def _task_levels(order: Order) -> Dict[str, int]:
+        """Уровень задачи - длина самой длинной цепочки зависимостей до неё; задачи с циклом не получают уровня."""
+        task_ids = {task.id for task in order.tasks}
+        levels: Dict[str, int] = {}
+        remaining = list(order.tasks)
+        level = 0
+        while remaining:
+            # зависимости на задачи вне заказа не учитываются
+            ready = [task for task in remaining if all(dep in levels or dep not in task_ids for dep in task.dependsOn)]
+            if len(ready) == 0:
+                break
+            for task in ready:
+                levels[task.id] = level
+            remaining = [task for task in remaining if task.id not in levels]
+            level += 1
+        return levels
+
+    def _load_delay(self, total_productivity: Dict[str, float]) -> np.ndarray:
+        """
+        Задержка из-за очереди по типам работ: заказы выполняются по убыванию выручки на день критического пути,
+        и каждый ждёт, пока подходящие работники выполнят работы этого типа из заказов перед ним.
+        Заказы, которые по оценке невыгодны даже без очереди, её не занимают.
+        """
+        n = len(self.orders)
+        work_type_ids = sorted(total_productivity)
+        if n == 0 or len(work_type_ids) == 0:
+            return np.zeros(n, dtype=np.int64)
+        column = {work_type_id: k for k, work_type_id in enumerate(work_type_ids)}
+
+        # объём работ заказа по типам работ
+        work = np.zeros((n, len(work_type_ids)))
+        for i, order in enumerate(self.orders):
+            for task in order.tasks:
+                if task.workTypeId in column:
+                    work[i, column[task.workTypeId]] += task.baseDuration
+        capacity = np.array([total_productivity[work_type_id] for work_type_id in work_type_ids])
+
+        earning = np.array([order.earning for order in self.orders])
+        in_queue = self.feasible & (earning > self.input_data.companyDayCost * self.critical_path)
+        rank = np.argsort(-earning / np.maximum(self.critical_path, 1), kind="stable")
+
+        queued = work[rank] * in_queue[rank, None]
+        before = np.cumsum(queued, axis=0) - queued
+        delay = np.zeros(n)
+        delay[rank] = np.where(work[rank] > 0, before / capacity, 0.0).max(axis=1)
+        return np.ceil(delay).astype(np.int64)
+
+    def end_ordinals(self, start: date | None = None, with_load: bool = False) -> np.ndarray:
+        """Ожидаемые даты окончания всех заказов (порядковые номера дат) при старте не раньше start."""
+        start = start or self.input_data.currentDate
+        key = (start, with_load)
+        if key not in self._ends:
+            workdays = self.critical_path + self.load_delay if with_load else self.critical_path
+            self._ends[key] = self.calendar.chain_end_ordinals(start, workdays)
+        return self._ends[key]
+
+    def is_feasible(self, order: Order) -> bool:
+        return bool(self.feasible[self.index_by_order_id[order.id]])
+
+    def duration_days(self, order: Order, start: date | None = None) -> int:
+        """Критический путь заказа в календарных днях, включая день начала."""
+        start = start or self.input_data.currentDate
+        end = int(self.end_ordinals(start)[self.index_by_order_id[order.id]])
+        return end - start.toordinal() + 1
+
+    def end_date(self, order: Order, start: date | None = None, with_load: bool = False) -> date:
+        return date.fromordinal(int(self.end_ordinals(start, with_load)[self.index_by_order_id[order.id]]))
+
+    def estimated_earning(self, order: Order, start: date | None = None, with_load: bool = False) -> float:
+        """
+        Оценка прибыли заказа: выручка за вычетом штрафа при ожидаемом окончании
+        и расходов фирмы за календарные дни критического пути.
+        С with_load окончание сдвигается на задержку из-за очереди по типам работ. Это заметно строже:
+        на перегруженных задачах отсекается и часть заказов, которые в план всё же попадают.
+        """
+        if not self.is_feasible(order):
+            return float('-inf')
+        days_overdue = max(0, (self.end_date(order, start, with_load) - order.deadline).days)
+        earning = max(0.0, order.earning - order.penaltyByDay * days_overdue)
+        return earning - self.input_data.companyDayCost * self.duration_days(order, start)
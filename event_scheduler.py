@@ -0,0 +1,185 @@
+from datetime import date, timedelta
+import heapq
+from math import ceil
+from typing import Dict, List, Sequence, Set, Tuple
+from compactor import compact_plan
+from instrumentation import metrics
+from models import InputData, Orders, WorkPlan
+from models.orders import Order
+from models.work_plan import AssignedTask
+from problem import WorkerIndex
+from work_calendar import WorkCalendar
+
+# виды событий; при равной дате сначала освобождаются работники, потом задачи становятся готовыми
+WORKER_FREE = 0
+TASK_READY = 1
+
+
+class ParallelScheduleBuilder:
+    """
+    Параллельная схема построения расписания (parallel SGS): часы модели идут по очереди событий
+    "работник освободился" и "задача готова" (все зависимости закончены). На каждую дату события
+    готовые задачи раздаются свободным подходящим работникам по убыванию приоритета заказа,
+    свободный работник получает самую приоритетную из готовых задач, которые он умеет.
+    Задача начинается в дату события, поэтому ни один работник не простаивает, пока для него есть работа.
+
+    Готовые задачи и свободные работники хранятся в кучах по типам работ, поэтому построение стоит
+    O((T + W) log T) вместо перебора расписаний всех работников для каждой задачи в последовательной схеме.
+
+    Как и GaOptimizer._create_plan, заказы, которые не завершены или не окупают расходы фирмы за свою
+    длительность, снимаются с плана. План строится заново без них (не больше rounds раз), чтобы их работники
+    достались другим заказам, а оставшиеся после последнего раза пропуски закрываются сдвигом влево (compactor).
+    """
+    def __init__(self, input_data: InputData, orders: List[Order], calendar: WorkCalendar | None = None,
+                 worker_index: WorkerIndex | None = None, rounds: int = 3):
+        """
+        Args:
+            rounds: сколько раз строить план заново без снятых заказов, чтобы их работники достались другим
+        """
+        self.input_data = input_data
+        self.rounds = rounds
+        self.orders = list(orders)
+        self.calendar = calendar if calendar is not None else WorkCalendar(input_data.holidays, input_data.currentDate)
+        self.worker_index = worker_index if worker_index is not None else WorkerIndex(input_data.workers)
+        self.workers = self.worker_index.workers
+
+        # задачи всех заказов подряд; зависимости - номера задач, на задачи вне заказов ссылок не бывает
+        self.tasks = [task for order in self.orders for task in order.tasks]
+        self.order_of_task = [i for i, order in enumerate(self.orders) for _ in order.tasks]
+        index = {task.id: k for k, task in enumerate(self.tasks)}
+        self.dependency_count = [len(task.dependsOn) for task in self.tasks]
+        self.dependants: List[List[int]] = [[] for _ in self.tasks]
+        for k, task in enumerate(self.tasks):
+            for dep_id in task.dependsOn:
+                if dep_id in index:
+                    self.dependants[index[dep_id]].append(k)
+
+        # работники по типам работ задач; из равных берётся более продуктивный, затем менее универсальный
+        self.work_types = sorted({task.workTypeId for task in self.tasks})
+        self.worker_order = {worker.id: (-worker.productivity, len(worker.workTypeIds), i)
+                             for i, worker in enumerate(self.workers)}
+        self.work_types_of_worker: List[List[str]] = [
+            [work_type_id for work_type_id in dict.fromkeys(worker.workTypeIds) if work_type_id in self.work_types]
+            for worker in self.workers
+        ]
+        self.orders_model = Orders.model_construct(root=self.orders)
+
+    def build(self, priorities: Sequence[int]) -> WorkPlan:
+        """План по приоритетам заказов (в порядке self.orders, больший приоритет - раньше), как у GaOptimizer."""
+        with metrics.phase("parallel_sgs.build"):
+            excluded: Set[int] = set()
+            for _ in range(self.rounds):
+                placed = self._dispatch(priorities, excluded)
+                dropped = self._unprofitable(placed)
+                for i in dropped:
+                    for task in self.orders[i].tasks:
+                        placed.pop(task.id, None)
+                excluded |= dropped
+                if len(dropped) == 0:
+                    break
+            plan = WorkPlan.trusted(sorted(placed.values(), key=lambda x: x.start))
+        return compact_plan(self.orders_model, plan, self.input_data, self.calendar)
+
+    def _dispatch(self, priorities: Sequence[int], excluded: Set[int]) -> Dict[str, AssignedTask]:
+        first_day = self.calendar.closest_workday(self.input_data.currentDate)
+        ready: Dict[str, List[Tuple[int, int]]] = {work_type_id: [] for work_type_id in self.work_types}
+        idle: Dict[str, List[Tuple[Tuple[float, int, int], int]]] = {work_type_id: [] for work_type_id in self.work_types}
+        is_idle = [False] * len(self.workers)
+        waiting = list(self.dependency_count)
+        # задача готова не раньше дня после окончания самой поздней из её зависимостей, а не последней розданной
+        ready_at = [0] * len(self.tasks)
+
+        events: List[Tuple[int, int, int]] = [(first_day.toordinal(), WORKER_FREE, w) for w in range(len(self.workers))]
+        events += [(first_day.toordinal(), TASK_READY, k) for k in range(len(self.tasks))
+                   if waiting[k] == 0 and self.order_of_task[k] not in excluded]
+        heapq.heapify(events)
+
+        placed: Dict[str, AssignedTask] = {}
+        while events:
+            now = events[0][0]
+            # все события этой даты
+            touched = set()
+            while events and events[0][0] == now:
+                _, kind, item = heapq.heappop(events)
+                if kind == WORKER_FREE:
+                    is_idle[item] = True
+                    for work_type_id in self.work_types_of_worker[item]:
+                        heapq.heappush(idle[work_type_id], (self.worker_order[self.workers[item].id], item))
+                        touched.add(work_type_id)
+                else:
+                    task = self.tasks[item]
+                    heapq.heappush(ready[task.workTypeId], (-priorities[self.order_of_task[item]], item))
+                    touched.add(task.workTypeId)
+
+            # раздача: самая приоритетная готовая задача среди типов работ, для которых есть свободный работник
+            candidates = [(ready[t][0], t) for t in touched if ready[t] and self._first_idle(idle[t], is_idle) is not None]
+            heapq.heapify(candidates)
+            start = date.fromordinal(now)
+            while candidates:
+                head, work_type_id = heapq.heappop(candidates)
+                if not ready[work_type_id] or ready[work_type_id][0] != head:
+                    continue
+                worker_position = self._first_idle(idle[work_type_id], is_idle)
+                if worker_position is None:
+                    continue
+                heapq.heappop(ready[work_type_id])
+                heapq.heappop(idle[work_type_id])
+                is_idle[worker_position] = False
+
+                k = head[1]
+                task, worker = self.tasks[k], self.workers[worker_position]
+                end = self.calendar.task_end_date(start, ceil(task.baseDuration / worker.productivity))
+                placed[task.id] = AssignedTask.trusted(taskId=task.id, workerId=worker.id, start=start, end=end)
+                metrics.count("placements")
+
+                next_day = self.calendar.closest_workday(end + timedelta(days=1)).toordinal()
+                heapq.heappush(events, (next_day, WORKER_FREE, worker_position))
+                for dependant in self.dependants[k]:
+                    waiting[dependant] -= 1
+                    ready_at[dependant] = max(ready_at[dependant], next_day)
+                    if waiting[dependant] == 0:
+                        heapq.heappush(events, (ready_at[dependant], TASK_READY, dependant))
+
+                if ready[work_type_id] and self._first_idle(idle[work_type_id], is_idle) is not None:
+                    heapq.heappush(candidates, (ready[work_type_id][0], work_type_id))
+        return placed
+
+    @staticmethod
+    def _first_idle(heap: List[Tuple[Tuple[float, int, int], int]], is_idle: List[bool]) -> int | None:
+        """Лучший свободный работник из кучи; записи занятых работников удаляются лениво."""
+        while heap and not is_idle[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0][1] if heap else None
+
+    def _unprofitable(self, placed: Dict[str, AssignedTask]) -> Set[int]:
+        """
+        Номера заказов, начатых в плане, но не завершённых (штраф съел выручку или поставлены не все задачи),
+        и заказов в конце плана, которые не окупают дни, на которые продлевают работу фирмы.
+        Длительность самого заказа здесь не штрафуется, как в последовательной схеме: в параллельной схеме
+        заказы идут одновременно и растягиваются, а расходы фирмы зависят только от общего горизонта.
+        """
+        result = set()
+        ends: List[Tuple[date, float, int]] = []
+        for i, order in enumerate(self.orders):
+            assigned = [placed[task.id] for task in order.tasks if task.id in placed]
+            if len(assigned) == 0:
+                continue
+            if len(assigned) == len(order.tasks):
+                end = max(t.end for t in assigned)
+                penalty = order.penaltyByDay * max(0, (end - order.deadline).days)
+                if penalty < order.earning:
+                    ends.append((end, order.earning - penalty, i))
+                    continue
+            result.add(i)
+
+        # хвост плана: самый поздний заказ снимается, если его прибыль не покрывает продление горизонта
+        ends.sort()
+        while ends:
+            end, value, i = ends[-1]
+            previous_end = ends[-2][0] if len(ends) > 1 else self.input_data.currentDate
+            if value > self.input_data.companyDayCost * (end - previous_end).days:
+                break
+            result.add(i)
+            ends.pop()
+        metrics.count("parallel_sgs.dropped_orders", len(result))
+        return result
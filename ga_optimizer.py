@@ -7,19 +7,42 @@ from models import Orders, InputData, WorkPlan
 from models.orders import Order, Task
 from models.work_plan import AssignedTask
 from date_utils import calculate_working_days, is_weekend, calculate_task_end_date
-from utils import calculate_order_cost, calculate_order_duration, calculate_placed_order_duration
+from utils import calculate_order_cost, calculate_placed_order_duration
 from models.input_data import Worker
 import pygad
 from checker import only_calculate_earning
+from instrumentation import log, metrics
+from admission import admit_orders
+from estimates import OrderEstimator
+from event_scheduler import ParallelScheduleBuilder
+from problem import WorkerIndex
+from surrogate import SurrogateScore, SurrogateScreen
 import multiprocessing as mp
 from functools import partial
 
+# способы построить план по приоритетам заказов
+DECODERS = ("serial", "parallel")
+
 class GaOptimizer:
-    def __init__(self, input_data: InputData, orders: Orders):
+    def __init__(self, input_data: InputData, orders: Orders, admission: bool = False, decoder: str = "serial"):
+        """
+        Args:
+            admission: оставить только заказы, которые вместе помещаются в мощность работников (см. admission.py);
+                хромосома становится короче
+            decoder: как строить план по приоритетам: "serial" - поиск окна у каждого работника для каждой задачи,
+                "parallel" - раздача готовых задач свободным работникам по очереди событий (см. event_scheduler.py)
+        """
+        if decoder not in DECODERS:
+            raise ValueError(f"Неизвестный декодер: {decoder}, доступны: {', '.join(DECODERS)}")
+        self.decoder_name = decoder
         self.input_data = input_data
+        self.estimator = OrderEstimator(input_data, orders)
         self.additional_orders: List[Order] = []
         # создаём копию списка заказов и фильтруем её
-        self.orders = Orders([o for o in orders.root if self._estimated_total_order_earning(o) > 0])
+        candidates = [o for o in orders.root if self._estimated_total_order_earning(o) > 0]
+        if admission:
+            candidates = admit_orders(input_data, candidates, self.estimator)
+        self.orders = Orders(candidates)
         print(f"Оставлено заказов: {len(self.orders.root)}")
 
         # Сортируем задачи внутри каждого заказа по количеству зависимостей
@@ -28,6 +51,12 @@ class GaOptimizer:
             
         # Сортируем работников по убыванию продуктивности
         self.input_data.workers.sort(key=lambda worker: worker.productivity, reverse=True)
+        self.worker_index = WorkerIndex(self.input_data.workers)
+        # суррогатный отбор пар заказов для отжига, создаётся при запуске отжига
+        self._screen: SurrogateScreen | None = None
+        # параллельная схема строится по текущему списку заказов и пересоздаётся, если он заменён
+        self._parallel_builder: ParallelScheduleBuilder | None = None
+        self._parallel_orders: List[Order] | None = None
 
     def alt_optimize(self) -> WorkPlan:
         priorities = [round(self._estimated_total_order_earning(o)) for o in self.orders.root]
@@ -57,38 +86,65 @@ class GaOptimizer:
         plan = self.optimize()
         return plan
 
-    def optimize(self) -> WorkPlan:
-        start_time = time.time()
-        
+    def optimize(self, plot_fitness: bool = True, initial_priorities: List[int] | None = None,
+                 time_limit: float | None = None, population: int = 20, generations: int = 15,
+                 parents_mating: int = 6, mutation_probability: float = 0.2, processes: int = 10) -> WorkPlan:
+        """
+        Args:
+            plot_fitness: показать график приспособленности по завершении
+            initial_priorities: приоритеты для тёплого старта, добавляются в начальную популяцию
+            time_limit: ограничение времени в секундах, по истечении эволюция останавливается после текущего поколения
+            population: размер популяции
+            generations: число поколений
+            parents_mating: сколько особей становятся родителями
+            mutation_probability: вероятность мутации гена
+            processes: число процессов для расчёта приспособленности
+        """
+        self._deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        with metrics.phase("ga.optimize") as timer:
+            result = self._optimize(plot_fitness, initial_priorities, population, generations,
+                                    parents_mating, mutation_probability, processes)
+        print(f"\nВремя выполнения: {timer.elapsed:.2f} секунд")
+        return result
+
+    def _optimize(self, plot_fitness: bool, initial_priorities: List[int] | None, sol_per_pop: int,
+                  num_generations: int, num_parents_mating: int, mutation_probability: float, processes: int) -> WorkPlan:
+        initial_population = None
+        if initial_priorities is not None:
+            # тёплый старт: одна особь из переданных приоритетов, остальные случайные
+            initial_population = [list(initial_priorities)] + [
+                [random.randint(1, len(self.orders.root)) for _ in self.orders.root] for _ in range(sol_per_pop - 1)
+            ]
+
         ga_instance = pygad.GA(
-            num_generations=15,
-            num_parents_mating=6,
+            num_generations=num_generations,
+            num_parents_mating=min(num_parents_mating, sol_per_pop),
             fitness_func=self._fitness_function,
-            sol_per_pop=20,
+            sol_per_pop=sol_per_pop,
+            initial_population=initial_population,
             num_genes=len(self.orders.root),
             crossover_type="scattered",
             init_range_low=1,
             init_range_high=len(self.orders.root),
             gene_type=int,
             mutation_type="random",
-            mutation_probability=0.2,
+            mutation_probability=mutation_probability,
             on_generation=self._on_generation,
-            parallel_processing=["process", 10]
+            parallel_processing=["process", processes] if processes > 1 else None
         )
         ga_instance.run()
         solution, solution_fitness, solution_idx = ga_instance.best_solution()
-        ga_instance.plot_fitness()
-        result = self._create_plan(solution)
-        
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print(f"\nВремя выполнения: {execution_time:.2f} секунд")
-        
-        return result
+        if plot_fitness:
+            ga_instance.plot_fitness()
+        return self._create_plan(solution)
 
     def _on_generation(self, ga_instance):
-        print(f"Generation = {ga_instance.generations_completed}")
-        print(f"Fitness    = {ga_instance.best_solution(pop_fitness=ga_instance.last_generation_fitness)[1]}")
+        log.info(lambda: f"Generation = {ga_instance.generations_completed}\n"
+                         f"Fitness    = {ga_instance.best_solution(pop_fitness=ga_instance.last_generation_fitness)[1]}",
+                 key="ga.generation")
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            print("Время вышло, останавливаем эволюцию")
+            return "stop"
         #print(f"Solution   = {ga_instance.best_solution(pop_fitness=ga_instance.last_generation_fitness)[0][:10]}")
 
     def _fitness_function(self, ga, solution: List[int], index: int) -> float:
@@ -98,6 +154,19 @@ class GaOptimizer:
         return result
 
     def _create_plan(self, priorities: List[int]) -> WorkPlan:
+        with metrics.phase("ga.create_plan"):
+            if self.decoder_name == "parallel":
+                return self._create_plan_parallel(priorities)
+            return self._create_plan_serial(priorities)
+
+    def _create_plan_parallel(self, priorities: List[int]) -> WorkPlan:
+        if self._parallel_orders is not self.orders.root:
+            self._parallel_builder = ParallelScheduleBuilder(self.input_data, self.orders.root,
+                                                             self.estimator.calendar, self.worker_index)
+            self._parallel_orders = self.orders.root
+        return self._parallel_builder.build(priorities)
+
+    def _create_plan_serial(self, priorities: List[int]) -> WorkPlan:
         work_plan_dict = {}
         priority_by_task_id = {}
         task_by_id = {}
@@ -134,7 +203,8 @@ class GaOptimizer:
                 end_date = calculate_task_end_date(min_date, next_task.baseDuration, worker.productivity, self.input_data.holidays)
 
                 # назначаем задачу
-                work_plan_dict[next_task.id] = AssignedTask(taskId=next_task.id, workerId=worker.id, start=min_date, end=end_date)
+                work_plan_dict[next_task.id] = AssignedTask.trusted(taskId=next_task.id, workerId=worker.id, start=min_date, end=end_date)
+                metrics.count("placements")
 
                 # проверим, завершён ли текущий заказ
                 order = next(o for o in self.orders.root if next_task in o.tasks)
@@ -162,7 +232,7 @@ class GaOptimizer:
 
         # сортируем задачи по дате начала
         sorted_tasks = sorted(work_plan_dict.values(), key=lambda x: x.start)
-        return WorkPlan(sorted_tasks)
+        return WorkPlan.trusted(sorted_tasks)
     
     def _run_simulated_annealing(self, initial_temperature: float, cooling_rate: float) -> tuple[WorkPlan, float]:
         priorities = [round(self._estimated_total_order_earning(o)) for o in self.orders.root]
@@ -206,14 +276,18 @@ class GaOptimizer:
         num_processes = 10
         pool = mp.Pool(processes=num_processes)
 
-        # Генерируем пары заказов для каждого процесса
+        # Генерируем пары заказов для каждого процесса; с суррогатным отбором пар больше, и проверяются лучшие
         order_pairs = []
-        for _ in range(num_processes):
+        candidates = num_processes if self._screen is None else math.ceil(num_processes / self._screen.keep_fraction)
+        for _ in range(candidates):
             order1_idx = random.randint(0, len(self.orders.root) - 1)
             order2_idx = random.randint(0, len(self.orders.root) - 1)
             while order2_idx == order1_idx:
                 order2_idx = random.randint(0, len(self.orders.root) - 1)
             order_pairs.append((order1_idx, order2_idx))
+        if self._screen is not None:
+            order_pairs = self._screen.select(order_pairs, lambda pair: self._swapped_permutation(priorities, pair),
+                                              keep=num_processes)
 
         # Запускаем параллельные процессы
         results = pool.starmap(self._try_swap_orders, 
@@ -228,10 +302,37 @@ class GaOptimizer:
         best_result = max(results, key=lambda x: x[2])
         return best_result[1], best_result[2]
 
-    def optimize_with_simulated_annealing(self) -> WorkPlan:
-        start_time = time.time()
-        
-        priorities = [round(self._estimated_total_order_earning(o)) for o in self.orders.root]
+    def optimize_with_simulated_annealing(self, initial_priorities: List[int] | None = None,
+                                          time_limit: float | None = None, screen_fraction: float = 0.5) -> WorkPlan:
+        """
+        Args:
+            initial_priorities: приоритеты для тёплого старта вместо оценки прибыли заказов
+            time_limit: ограничение времени в секундах, проверяется между итерациями
+            screen_fraction: какая доля случайных пар заказов после суррогатной оценки строится полностью;
+                1 - без суррогатного отбора
+        """
+        self._screen = SurrogateScreen(SurrogateScore(self.input_data, self.orders.root, self.estimator),
+                                       screen_fraction) if screen_fraction < 1 else None
+        with metrics.phase("sa.optimize") as timer:
+            plan = self._optimize_with_simulated_annealing(initial_priorities, time_limit)
+        print(f"\nВремя выполнения: {timer.elapsed:.2f} секунд")
+        if self._screen is not None:
+            print(self._screen.summary())
+        return plan
+
+    @staticmethod
+    def _swapped_permutation(priorities: List[int], pair: tuple[int, int]) -> List[int]:
+        """Порядок заказов, в котором их разместит _create_plan после обмена приоритетами пары."""
+        swapped = list(priorities)
+        swapped[pair[0]], swapped[pair[1]] = swapped[pair[1]], swapped[pair[0]]
+        return sorted(range(len(swapped)), key=lambda i: -swapped[i])
+
+    def _optimize_with_simulated_annealing(self, initial_priorities: List[int] | None, time_limit: float | None) -> WorkPlan:
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        if initial_priorities is not None:
+            priorities = list(initial_priorities)
+        else:
+            priorities = [round(self._estimated_total_order_earning(o)) for o in self.orders.root]
         plan = self._create_plan(priorities)
         
         # задаём начальные параметры для имитации отжига
@@ -245,8 +346,13 @@ class GaOptimizer:
 
         # выполняем имитацию отжига
         for iteration in range(max_iterations):
+            if deadline is not None and time.perf_counter() > deadline:
+                print("Время вышло, останавливаем отжиг")
+                break
+
             # параллельно проверяем несколько пар заказов
-            new_plan, new_earning = self._parallel_iteration(temperature, priorities, plan)
+            with metrics.phase("sa.iteration"):
+                new_plan, new_earning = self._parallel_iteration(temperature, priorities, plan)
             
             # вычисляем вероятность перехода к новому плану
             current_earning = only_calculate_earning(self.orders, plan, self.input_data)
@@ -257,14 +363,16 @@ class GaOptimizer:
                 scaled_diff = 1000 if new_earning > 0 else 0
 
             probability = math.exp(-abs(scaled_diff) / (temperature * 0.1))
-            print(f"Итерация {iteration}, температура: {temperature:.2f}, вероятность: {probability:.2f}, разница: {scaled_diff:.2f}")
+            log.info(f"Итерация {iteration}, температура: {temperature:.2f}, вероятность: {probability:.2f}, разница: {scaled_diff:.2f}",
+                     key="sa.iteration")
 
             # переходим к новому плану, если он лучше
             if scaled_diff > 0 or random.random() < probability:
                 plan = new_plan
-                print(f"    Приняли изменение. Новая прибыль: {new_earning:.2f}")
+                metrics.count("sa.accepted")
+                log.info(f"    Приняли изменение. Новая прибыль: {new_earning:.2f}", key="sa.accepted")
             else:
-                print(f"    Отклонили изменение")
+                metrics.count("sa.rejected")
 
             # добавляем текущий результат в список последних результатов
             last_results.append(new_earning)
@@ -279,10 +387,6 @@ class GaOptimizer:
             # охлаждаем температуру
             temperature *= cooling_rate
 
-        end_time = time.time()
-        execution_time = end_time - start_time
-        print(f"\nВремя выполнения: {execution_time:.2f} секунд")
-        
         return plan
 
     def _fine_tune_simulated_annealing(self, plan: WorkPlan, priorities: List[int], 
@@ -323,17 +427,18 @@ class GaOptimizer:
 
             # вычисляем вероятность перехода к новому плану
             probability = math.exp(-abs(scaled_diff) / (temperature * 0.1))
-            print(f"Температура: {temperature:.2f}, вероятность: {probability:.2f}, разница: {scaled_diff:.2f}")
+            log.info(f"Температура: {temperature:.2f}, вероятность: {probability:.2f}, разница: {scaled_diff:.2f}",
+                     key="sa.fine_tune")
 
             # переходим к новому плану, если он лучше
             if scaled_diff > 0 or random.random() < probability:
                 plan = new_plan
-                print(f"    Приняли изменение. Новая прибыль: {new_earning:.2f}")
+                metrics.count("sa.accepted")
             else:
                 # если не приняли новый план, возвращаем старые приоритеты
                 priorities[order1_idx] = old_priority1
                 priorities[order2_idx] = old_priority2
-                print(f"    Отклонили изменение")
+                metrics.count("sa.rejected")
 
             # охлаждаем температуру
             temperature *= cooling_rate
@@ -353,10 +458,27 @@ class GaOptimizer:
         if min_date < assigned_task.start:
             worker = next(w for w in self.input_data.workers if w.id == assigned_task.workerId)
             new_end_date = calculate_task_end_date(min_date, task.baseDuration, worker.productivity, self.input_data.holidays)
-            work_plan_dict[task.id] = AssignedTask(taskId=task.id, workerId=assigned_task.workerId, start=min_date, end=new_end_date)
+            work_plan_dict[task.id] = AssignedTask.trusted(taskId=task.id, workerId=assigned_task.workerId, start=min_date, end=new_end_date)
+            metrics.count("placements")
             return True
         return False
 
+    def priorities_from_plan(self, plan: WorkPlan) -> List[int]:
+        """
+        Восстанавливает приоритеты заказов по готовому плану для тёплого старта:
+        чем раньше начинается заказ в плане, тем выше приоритет; заказы вне плана получают приоритет 1.
+        """
+        order_start = {}
+        assigned = {t.taskId: t for t in plan.root}
+        for order in self.orders.root:
+            starts = [assigned[task.id].start for task in order.tasks if task.id in assigned]
+            if len(starts) == len(order.tasks):
+                order_start[order.id] = min(starts)
+
+        ranked = sorted(order_start, key=lambda order_id: order_start[order_id])
+        priority_by_order = {order_id: len(self.orders.root) - i for i, order_id in enumerate(ranked)}
+        return [priority_by_order.get(order.id, 1) for order in self.orders.root]
+
     def _minimum_allowed_date_by_dependencies(self, task: Task, work_plan_dict: dict[str, AssignedTask]) -> date:
         min_date = self.input_data.currentDate
         for dep_id in task.dependsOn:
@@ -364,8 +486,10 @@ class GaOptimizer:
         return min_date
     
     def _estimated_total_order_earning(self, order: Order, end_date: date | None = None) -> float:
-        duration = calculate_order_duration(order, self.input_data)
-        days_overdue = 0 if end_date is None else max(0, (end_date - order.deadline).days)
+        if end_date is None:
+            return self.estimator.estimated_earning(order)
+        duration = self.estimator.duration_days(order)
+        days_overdue = max(0, (end_date - order.deadline).days)
         penalty = order.penaltyByDay * days_overdue
         total_earning = max(0, order.earning - penalty)
         total_company_cost = self.input_data.companyDayCost * duration
@@ -374,40 +498,45 @@ class GaOptimizer:
     def _select_worker(self, task: Task, min_date: date, work_plan_dict: dict[str, AssignedTask]) -> (Worker, date):
         selected_worker = None
         selected_date = date.max
+        # раньше ближайшего рабочего дня не начнёт никто
+        earliest_possible = self._closest_workday(min_date)
 
         # перебираем только тех работников, у которых есть нужный тип работ
-        for worker in self.input_data.workers:
-            if task.workTypeId in worker.workTypeIds:
-                tasks = [t for t in work_plan_dict.values() if t.workerId == worker.id]
-                sorted_tasks = sorted(tasks, key=lambda x: x.start)
-
-                # перебираем задачи с индексом для сравнения текущей и следующей
-                for i in range(len(sorted_tasks) - 1):
-                    current_task = sorted_tasks[i]
-                    start_date = self._closest_workday(max(min_date, current_task.end + timedelta(days=1)))
-                    assumed_end_date = calculate_task_end_date(start_date, task.baseDuration, worker.productivity, self.input_data.holidays)
-                    next_task = sorted_tasks[i + 1]
-
-                    if assumed_end_date < next_task.start and start_date < selected_date:
-                        selected_worker = worker
-                        selected_date = start_date
-                        break
-                    
-                # ничего не выбрано, берём дату конца последнего таска  
-                if len(tasks) < 1:
-                    assumed_start_date = self._closest_workday(min_date)
-                    if assumed_start_date < selected_date:
-                        selected_worker = worker
-                        selected_date = assumed_start_date
-                else:
-                    closest_date_available = self._closest_workday(max(sorted_tasks[-1].end + timedelta(days=1), min_date))
-                    if closest_date_available < selected_date:  
-                        selected_worker = worker
-                        selected_date = closest_date_available
+        for worker in self.worker_index.eligible_for(task.workTypeId):
+            tasks = [t for t in work_plan_dict.values() if t.workerId == worker.id]
+            sorted_tasks = sorted(tasks, key=lambda x: x.start)
+
+            # перебираем задачи с индексом для сравнения текущей и следующей
+            for i in range(len(sorted_tasks) - 1):
+                current_task = sorted_tasks[i]
+                start_date = self._closest_workday(max(min_date, current_task.end + timedelta(days=1)))
+                assumed_end_date = calculate_task_end_date(start_date, task.baseDuration, worker.productivity, self.input_data.holidays)
+                next_task = sorted_tasks[i + 1]
+
+                if assumed_end_date < next_task.start and start_date < selected_date:
+                    selected_worker = worker
+                    selected_date = start_date
+                    break
+
+            # ничего не выбрано, берём дату конца последнего таска
+            if len(tasks) < 1:
+                if earliest_possible < selected_date:
+                    selected_worker = worker
+                    selected_date = earliest_possible
+            else:
+                closest_date_available = self._closest_workday(max(sorted_tasks[-1].end + timedelta(days=1), min_date))
+                if closest_date_available < selected_date:
+                    selected_worker = worker
+                    selected_date = closest_date_available
+
+            # работник уже выбран на самую раннюю возможную дату: остальные не раньше, то есть доминируемы
+            if selected_date == earliest_possible:
+                break
 
         return selected_worker, selected_date
 
     def _closest_workday(self, date: date) -> date:
+        metrics.count("calendar_lookups")
         if not is_weekend(date) and date not in self.input_data.holidays:
             return date
         else:
@@ -1,14 +1,17 @@
 from datetime import datetime, date, timedelta
-import plotly.figure_factory as ff
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, TYPE_CHECKING
 from models import WorkPlan, Orders, InputData, TaskDetails
 from utils import aggregate_work_plan
-from dash import Dash, html, dcc
-import webbrowser
-from threading import Timer
 import random
 import colorsys
 
+# numpy, plotly и dash импортируются внутри функций: их загрузка заметно дольше самой проверки,
+# а в пакетных запусках визуализация обычно не нужна
+if TYPE_CHECKING:
+    import numpy as np
+    import plotly.graph_objects as go
+
 def generate_random_color(h_min=0, h_max=1, s_min=0.6, s_max=0.95, v_min=0.6, v_max=0.95):
     """
     Генерирует случайный цвет в формате HEX с контролем яркости и насыщенности.
@@ -28,9 +31,254 @@ def generate_random_color(h_min=0, h_max=1, s_min=0.6, s_max=0.95, v_min=0.6, v_
     rgb = tuple(round(i * 255) for i in colorsys.hsv_to_rgb(h, s, v))
     return f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
 
+# начиная с этого числа задач диаграмма строится через WebGL с прореживанием
+LARGE_PLAN_THRESHOLD = 2000
+
+_MS_PER_DAY = 86_400_000
+
+
+class GanttColumns:
+    """
+    Колоночное представление плана для быстрой отрисовки: по одному элементу массивов на задачу.
+    Даты хранятся в миллисекундах от эпохи, как их понимает ось дат plotly.
+    """
+    def __init__(self, orders: Orders, work_plan: WorkPlan, input_data: InputData):
+        import numpy as np
+
+        task_by_id = {}
+        order_index_by_task_id = {}
+        for i, order in enumerate(orders.root):
+            for task in order.tasks:
+                task_by_id[task.id] = task
+                order_index_by_task_id[task.id] = i
+        worker_index_by_id = {worker.id: i for i, worker in enumerate(input_data.workers)}
+
+        self.orders = orders.root
+        self.workers = input_data.workers
+        self.tasks = []
+        starts, ends, worker_indexes, order_indexes = [], [], [], []
+        for assigned_task in work_plan.root:
+            task = task_by_id.get(assigned_task.taskId)
+            worker_index = worker_index_by_id.get(assigned_task.workerId)
+            if task is None or worker_index is None:
+                continue
+            self.tasks.append(task)
+            starts.append(assigned_task.start.toordinal())
+            # конец задачи включительно, поэтому полоса тянется до начала следующего дня
+            ends.append(assigned_task.end.toordinal() + 1)
+            worker_indexes.append(worker_index)
+            order_indexes.append(order_index_by_task_id[task.id])
+
+        epoch = date(1970, 1, 1).toordinal()
+        self.start = (np.array(starts, dtype=np.int64) - epoch) * _MS_PER_DAY
+        self.end = (np.array(ends, dtype=np.int64) - epoch) * _MS_PER_DAY
+        self.worker = np.array(worker_indexes, dtype=np.int64)
+        self.order = np.array(order_indexes, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def describe(self, index: int) -> str:
+        """Текст подсказки для одной задачи; строится только по запросу, при наведении."""
+        task = self.tasks[index]
+        worker = self.workers[self.worker[index]]
+        order = self.orders[self.order[index]]
+        return (f"Заказ: {order.id}\n"
+                f"Задача: {task.id}\n"
+                f"Тип работы: {task.workTypeId}\n"
+                f"Работник: {worker.name}\n"
+                f"Базовая длительность: {task.baseDuration} дн.\n"
+                f"Продуктивность работника: {worker.productivity}")
+
+
+def _to_ms(value) -> float:
+    import numpy as np
+    return np.datetime64(str(value).replace(" ", "T"), "ms").astype(np.int64).item()
+
+
+def _downsample(columns: GanttColumns, group: "np.ndarray", x_range: tuple[float, float] | None,
+                max_bars: int) -> tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Отбирает видимые полосы и, если их больше max_bars, склеивает соседние полосы одной строки
+    и одной группы в интервалы равной ширины. Для склеенной полосы индекс задачи отрицательный
+    и равен минус числу задач в ней.
+
+    Returns:
+        (начало, конец, строка, группа, индекс задачи, число задач) для каждой итоговой полосы
+    """
+    import numpy as np
+
+    indexes = np.arange(len(columns))
+    if x_range is not None:
+        visible = (columns.end > x_range[0]) & (columns.start < x_range[1])
+        indexes = indexes[visible]
+
+    start = columns.start[indexes]
+    end = columns.end[indexes]
+    row = columns.worker[indexes]
+    group = group[indexes]
+    if len(indexes) <= max_bars:
+        return start, end, row, group, indexes, np.ones(len(indexes), dtype=np.int64)
+
+    def segments(bin_width: float, by_group: bool) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        bin_index = ((start - start.min()) // bin_width).astype(np.int64)
+        keys = np.stack([group if by_group else np.zeros_like(group), row, bin_index])
+        order = np.lexsort(keys[::-1])
+        boundaries = np.flatnonzero(np.any(np.diff(keys[:, order], axis=1) != 0, axis=0)) + 1
+        return order, np.concatenate([[0], boundaries]), keys
+
+    # начальная ширина интервала такова, чтобы на каждую строку пришлось примерно max_bars / строк полос;
+    # если полос всё ещё слишком много (много групп в одной строке), интервал расширяется вдвое
+    rows_count = max(len(np.unique(row)), 1)
+    span = max((x_range[1] - x_range[0]) if x_range is not None else (end.max() - start.min()), _MS_PER_DAY)
+    initial_bin_width = max(span / max(max_bars // rows_count, 1), _MS_PER_DAY)
+    bin_width = initial_bin_width
+    by_group = True
+    order, segment_starts, keys = segments(bin_width, by_group)
+    while len(segment_starts) > max_bars and (bin_width <= span or by_group):
+        if bin_width > span:
+            # группы не помещаются даже по одной полосе на строку - склеиваем и их
+            by_group = False
+            bin_width = initial_bin_width
+        else:
+            bin_width *= 2
+        order, segment_starts, keys = segments(bin_width, by_group)
+
+    counts = np.diff(np.concatenate([segment_starts, [len(order)]]))
+    merged_start = np.minimum.reduceat(start[order], segment_starts)
+    merged_end = np.maximum.reduceat(end[order], segment_starts)
+    merged_index = np.where(counts == 1, indexes[order][segment_starts], -counts)
+    first = order[segment_starts]
+    return merged_start, merged_end, row[first], group[first], merged_index, counts
+
+
+def build_fast_gantt_figure(columns: GanttColumns, group_by: str = "worker", max_bars: int = 5000,
+                            x_range: tuple[float, float] | None = None, max_traces: int = 500) -> "go.Figure":
+    """
+    Строит диаграмму Ганта из колоночных массивов: по одному WebGL-трейсу (Scattergl)
+    на работника или заказ, каждая задача - отрезок толстой линии.
+
+    Args:
+        columns: колоночное представление плана
+        group_by: "worker" или "order" - по чему разбивать на трейсы (и цвета)
+        max_bars: сколько полос отрисовывать не склеивая
+        x_range: видимый диапазон дат в миллисекундах; None - весь план
+        max_traces: если групп больше, они объединяются в max_traces трейсов по остатку от деления
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    group = columns.worker if group_by == "worker" else columns.order
+    names = [w.name for w in columns.workers] if group_by == "worker" else [o.id for o in columns.orders]
+    if len(names) > max_traces:
+        group = group % max_traces
+        names = [f"Группа {i + 1}" for i in range(max_traces)]
+
+    start, end, row, bar_group, bar_index, counts = _downsample(columns, group, x_range, max_bars)
+
+    rows_count = len(columns.workers)
+    height = max(rows_count * 30, 600)
+    line_width = max(2, min(20, height / max(rows_count, 1) * 0.6))
+
+    fig = go.Figure()
+    sort = np.argsort(bar_group, kind="stable")
+    boundaries = np.flatnonzero(np.diff(bar_group[sort])) + 1
+    for part in np.split(sort, boundaries):
+        if len(part) == 0:
+            continue
+        group_index = bar_group[part[0]]
+        # отрезки разделяются NaN, поэтому на полосу приходится три точки
+        x = np.full(len(part) * 3, np.nan)
+        x[0::3] = start[part]
+        x[1::3] = end[part]
+        y = np.full(len(part) * 3, np.nan)
+        y[0::3] = row[part]
+        y[1::3] = row[part]
+        custom = np.zeros((len(part) * 3, 2), dtype=np.int64)
+        custom[0::3, 0] = bar_index[part]
+        custom[1::3, 0] = bar_index[part]
+        custom[0::3, 1] = counts[part]
+        custom[1::3, 1] = counts[part]
+        fig.add_trace(go.Scattergl(
+            x=x, y=y, mode="lines",
+            line=dict(width=line_width, color=generate_random_color(h_min=(group_index * 0.618) % 1, h_max=(group_index * 0.618) % 1)),
+            name=names[group_index],
+            customdata=custom,
+            hovertemplate="%{x|%Y-%m-%d}<br>задач: %{customdata[1]}<extra>%{fullData.name}</extra>",
+            connectgaps=False,
+        ))
+
+    fig.update_layout(
+        title="План работ",
+        xaxis=dict(title="Дата", type="date", range=list(x_range) if x_range is not None else None),
+        yaxis=dict(title="Работники", tickvals=list(range(rows_count)),
+                   ticktext=[w.name for w in columns.workers], autorange="reversed"),
+        height=height,
+        showlegend=len(names) <= 200,
+        hovermode="closest",
+        uirevision="gantt",
+    )
+    return fig
+
+
+def create_large_gantt_chart(orders: Orders, work_plan: WorkPlan, input_data: InputData, port: int = 8050,
+                             group_by: str = "worker", max_bars: int = 5000) -> None:
+    """
+    Диаграмма Ганта для больших планов: при изменении масштаба полосы пересчитываются
+    для видимого диапазона, а подробности задачи строятся только при наведении.
+    """
+    from dash import Dash, html, dcc, Input, Output
+
+    columns = GanttColumns(orders, work_plan, input_data)
+    if len(columns) == 0:
+        return
+
+    app = Dash(__name__)
+    app.layout = html.Div([
+        html.Div(style={'width': '100%', 'height': '90vh'}, children=[
+            dcc.Graph(id="gantt", figure=build_fast_gantt_figure(columns, group_by, max_bars), style={'height': '100%'})
+        ]),
+        html.Pre(id="details", style={'minHeight': '8vh'}),
+    ])
+
+    @app.callback(Output("gantt", "figure"), Input("gantt", "relayoutData"), prevent_initial_call=True)
+    def _on_zoom(relayout_data):
+        x_range = None
+        if relayout_data and "xaxis.range[0]" in relayout_data:
+            x_range = (_to_ms(relayout_data["xaxis.range[0]"]), _to_ms(relayout_data["xaxis.range[1]"]))
+        return build_fast_gantt_figure(columns, group_by, max_bars, x_range)
+
+    @app.callback(Output("details", "children"), Input("gantt", "hoverData"), prevent_initial_call=True)
+    def _on_hover(hover_data):
+        if not hover_data:
+            return ""
+        index, count = hover_data["points"][0]["customdata"]
+        return columns.describe(index) if index >= 0 else f"Склеено задач: {count}, приблизьте для подробностей"
+
+    _run_app(app, port)
+
+
+def _run_app(app, port: int) -> None:
+    import webbrowser
+    from threading import Timer
+
+    # Функция для открытия браузера
+    def open_browser():
+        webbrowser.open_new(f'http://localhost:{port}/')
+
+    # Открываем браузер через 1 секунду после запуска сервера
+    Timer(1, open_browser).start()
+
+    # Запускаем сервер
+    print(f"\nЗапускаем сервер на http://localhost:{port}")
+    print("Для завершения работы нажмите Ctrl+C")
+    app.run(debug=False, port=port)
+
+
 def create_gantt_chart(orders: Orders, work_plan: WorkPlan, input_data: InputData, port: int = 8050) -> None:
     """
     Создает интерактивную диаграмму Ганта на основе плана работ и показывает её в браузере.
+    Планы больше LARGE_PLAN_THRESHOLD задач отрисовываются через create_large_gantt_chart.
     
     Args:
         orders: Orders - список заказов
@@ -38,6 +286,67 @@ def create_gantt_chart(orders: Orders, work_plan: WorkPlan, input_data: InputDat
         input_data: InputData - входные данные
         port: int - порт для локального сервера (по умолчанию 8050)
     """
+    if len(work_plan.root) > LARGE_PLAN_THRESHOLD:
+        create_large_gantt_chart(orders, work_plan, input_data, port)
+        return
+
+    fig = build_gantt_figure(orders, work_plan, input_data)
+    if fig is None:
+        return
+
+    from dash import Dash, html, dcc
+
+    # Создаем Dash приложение
+    app = Dash(__name__)
+
+    # Определяем layout приложения
+    app.layout = html.Div([
+        html.Div(style={'width': '100%', 'height': '100vh'}, children=[
+            dcc.Graph(figure=fig, style={'height': '100%'})
+        ])
+    ])
+
+    _run_app(app, port)
+
+
+def export_gantt_chart(orders: Orders, work_plan: WorkPlan, input_data: InputData, file_name: str | Path,
+                       max_bars: int = 20000) -> None:
+    """
+    Сохраняет диаграмму Ганта в файл без запуска сервера: .html - самодостаточная страница
+    со встроенным plotly.js, .json - описание фигуры plotly.
+
+    Args:
+        orders: Orders - список заказов
+        work_plan: WorkPlan - план работ
+        input_data: InputData - входные данные
+        file_name: путь к файлу, формат определяется расширением
+        max_bars: предел числа полос для больших планов (остальные склеиваются)
+    """
+    file_name = Path(file_name)
+    if file_name.suffix.lower() not in (".html", ".json"):
+        raise ValueError(f"Неизвестный формат диаграммы: {file_name.suffix}, ожидается .html или .json")
+
+    if len(work_plan.root) > LARGE_PLAN_THRESHOLD:
+        fig = build_fast_gantt_figure(GanttColumns(orders, work_plan, input_data), max_bars=max_bars)
+    else:
+        fig = build_gantt_figure(orders, work_plan, input_data)
+    if fig is None:
+        return
+
+    if file_name.suffix.lower() == ".html":
+        fig.write_html(str(file_name), include_plotlyjs=True, full_html=True)
+    else:
+        fig.write_json(str(file_name))
+    print(f"Диаграмма сохранена: {file_name}")
+
+
+def build_gantt_figure(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> "go.Figure | None":
+    """
+    Строит фигуру диаграммы Ганта через plotly.figure_factory, по строке на работника.
+    Возвращает None, если в плане нет задач для отображения.
+    """
+    import plotly.figure_factory as ff
+
     # Агрегируем данные плана работ
     plan_details, _ = aggregate_work_plan(orders, work_plan, input_data)
     
@@ -86,43 +395,24 @@ def create_gantt_chart(orders: Orders, work_plan: WorkPlan, input_data: InputDat
             'Color': color
         })
 
+    if not gantt_data:
+        return None
+
     # Создаем фигуру диаграммы Ганта
-    if gantt_data:
-        fig = ff.create_gantt(gantt_data,
-                            colors=dict((task['Resource'], task['Color']) for task in gantt_data),
-                            index_col='Resource',
-                            show_colorbar=True,
-                            group_tasks=True,
-                            showgrid_x=True,
-                            showgrid_y=True)
-        
-        # Настраиваем внешний вид
-        fig.update_layout(
-            title='План работ',
-            xaxis_title='Дата',
-            yaxis_title='Работники',
-            height=max(len(set(task['Task'] for task in gantt_data)) * 100, 600),
-            showlegend=True
-        )
-        
-        # Создаем Dash приложение
-        app = Dash(__name__)
-        
-        # Определяем layout приложения
-        app.layout = html.Div([
-            html.Div(style={'width': '100%', 'height': '100vh'}, children=[
-                dcc.Graph(figure=fig, style={'height': '100%'})
-            ])
-        ])
-        
-        # Функция для открытия браузера
-        def open_browser():
-            webbrowser.open_new(f'http://localhost:{port}/')
-        
-        # Открываем браузер через 1 секунду после запуска сервера
-        Timer(1, open_browser).start()
-        
-        # Запускаем сервер
-        print(f"\nЗапускаем сервер на http://localhost:{port}")
-        print("Для завершения работы нажмите Ctrl+C")
-        app.run(debug=False, port=port) 
\ No newline at end of file
+    fig = ff.create_gantt(gantt_data,
+                        colors=dict((task['Resource'], task['Color']) for task in gantt_data),
+                        index_col='Resource',
+                        show_colorbar=True,
+                        group_tasks=True,
+                        showgrid_x=True,
+                        showgrid_y=True)
+
+    # Настраиваем внешний вид
+    fig.update_layout(
+        title='План работ',
+        xaxis_title='Дата',
+        yaxis_title='Работники',
+        height=max(len(set(task['Task'] for task in gantt_data)) * 100, 600),
+        showlegend=True
+    )
+    return fig
@@ -0,0 +1,145 @@
+from datetime import date, timedelta
+import json
+from pathlib import Path
+import random
+from typing import List, Tuple
+from pydantic import BaseModel
+from date_utils import is_weekend
+from models import InputData, Orders, WorkType, Worker
+from models.orders import Order, Task
+
+
+class GeneratorConfig(BaseModel):
+    """
+    Параметры синтетической задачи. Значения по умолчанию примерно повторяют
+    пропорции data/orders2.json и data/input_data2.json, но в десять раз меньше по числу заказов.
+    """
+    seed: int = 0
+    orders: int = 30
+    tasks_per_order: Tuple[int, int] = (1, 10)
+    dag_density: float = 0.3  # вероятность зависимости задачи от каждой из предыдущих задач заказа
+    work_types: int = 10
+    workers: int = 20
+    skill_overlap: float = 0.15  # вероятность владения каждым дополнительным типом работ своего отдела
+    departments: int = 1  # число независимых отделов (типы работ и работники не пересекаются)
+    holiday_density: float = 0.03  # доля будних дней горизонта, объявленных праздниками
+    base_duration: Tuple[int, int] = (1, 10)
+    productivity: Tuple[float, float] = (0.5, 1.5)
+    earning: Tuple[float, float] = (200_000, 6_500_000)
+    penalty_share: Tuple[float, float] = (0.01, 0.3)  # штраф в день как доля от дохода
+    deadline_days: Tuple[int, int] = (2, 210)
+    company_day_cost: float = 100_000
+    current_date: date = date(2025, 1, 1)
+    horizon_days: int = 730
+
+    def scaled(self, factor: int) -> "GeneratorConfig":
+        """Возвращает конфигурацию, в которой заказов и работников в factor раз больше."""
+        return self.model_copy(update={
+            "orders": self.orders * factor,
+            "workers": max(self.workers * factor, self.work_types),
+        })
+
+
+def generate_instance(config: GeneratorConfig) -> Tuple[InputData, Orders]:
+    """
+    Генерирует воспроизводимую (по seed) задачу заданного размера.
+
+    Args:
+        config: параметры генерации
+
+    Returns:
+        tuple[InputData, Orders]: исходные данные и список заказов
+    """
+    rnd = random.Random(config.seed)
+
+    work_types = [WorkType(id=f"WT{i}", name=f"Тип работ {i}") for i in range(config.work_types)]
+
+    # распределяем типы работ по отделам по кругу
+    departments_count = max(1, min(config.departments, config.work_types))
+    department_types: List[List[str]] = [[] for _ in range(departments_count)]
+    for i, work_type in enumerate(work_types):
+        department_types[i % departments_count].append(work_type.id)
+
+    # первые работники покрывают все типы работ, чтобы у каждой задачи был исполнитель
+    workers = []
+    for i in range(config.workers):
+        department = department_types[i % departments_count]
+        primary = department[(i // departments_count) % len(department)]
+        skills = [primary] + [wt for wt in department if wt != primary and rnd.random() < config.skill_overlap]
+        workers.append(Worker(
+            id=f"W{i}",
+            name=f"Работник {i}",
+            workTypeIds=skills,
+            productivity=round(rnd.uniform(*config.productivity), 2),
+        ))
+
+    holidays = []
+    for i in range(config.horizon_days):
+        d = config.current_date + timedelta(days=i)
+        if not is_weekend(d) and rnd.random() < config.holiday_density:
+            holidays.append(d)
+
+    orders = []
+    task_counter = 0
+    for i in range(config.orders):
+        department = department_types[rnd.randrange(departments_count)]
+        tasks: List[Task] = []
+        for _ in range(rnd.randint(*config.tasks_per_order)):
+            # зависимости только от предыдущих задач заказа, поэтому граф гарантированно ацикличен
+            depends_on = [t.id for t in tasks if rnd.random() < config.dag_density]
+            tasks.append(Task(
+                id=f"T{task_counter}",
+                workTypeId=rnd.choice(department),
+                dependsOn=depends_on,
+                baseDuration=rnd.randint(*config.base_duration),
+            ))
+            task_counter += 1
+
+        earning = round(rnd.uniform(*config.earning))
+        orders.append(Order(
+            id=f"O{i}",
+            tasks=tasks,
+            deadline=config.current_date + timedelta(days=rnd.randint(*config.deadline_days)),
+            earning=earning,
+            penaltyByDay=round(earning * rnd.uniform(*config.penalty_share)),
+        ))
+
+    input_data = InputData(
+        workTypes=work_types,
+        companyDayCost=config.company_day_cost,
+        workers=workers,
+        holidays=holidays,
+        currentDate=config.current_date,
+    )
+    return input_data, Orders(orders)
+
+
+def save_instance(input_data: InputData, orders: Orders, directory: str | Path) -> None:
+    """Сохраняет задачу в каталог в том же формате, что и файлы в папке data."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / "input_data.json", "w", encoding="utf-8") as f:
+        f.write(input_data.model_dump_json(indent=2))
+    with open(directory / "orders.json", "w", encoding="utf-8") as f:
+        f.write(orders.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Генератор синтетических задач планирования")
+    parser.add_argument("output", help="каталог для input_data.json и orders.json")
+    parser.add_argument("--scale", type=int, default=1, help="множитель числа заказов и работников")
+    parser.add_argument("--config", help="JSON с параметрами GeneratorConfig")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    _config = GeneratorConfig()
+    if args.config:
+        _config = GeneratorConfig.model_validate(json.loads(Path(args.config).read_text(encoding="utf-8")))
+    if args.seed is not None:
+        _config = _config.model_copy(update={"seed": args.seed})
+
+    _input_data, _orders = generate_instance(_config.scaled(args.scale))
+    save_instance(_input_data, _orders, args.output)
+    print(f"Сгенерировано заказов: {len(_orders.root)}, работников: {len(_input_data.workers)}")
@@ -0,0 +1,151 @@
+from contextlib import contextmanager
+from datetime import datetime
+import cProfile
+import json
+from pathlib import Path
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator
+
+
+class PhaseTimer:
+    """Результат замера одной фазы, доступен внутри и после блока with."""
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+
+class Metrics:
+    """
+    Счётчики и таймеры фаз для оптимизаторов и проверки.
+
+    Основные счётчики: placements (назначения задач), calendar_lookups (обращения к календарю),
+    plan_copies (копии плана), fitness_evaluations (подсчёты прибыли), cache_hits (попадания в кэши).
+    Работает в пределах одного процесса: счётчики дочерних процессов пулов сюда не попадают.
+    По умолчанию выключены (count и таймеры фаз ничего не накапливают, PhaseTimer.elapsed считается всегда):
+    их включают main.py с --metrics и замеры benchmark.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, Dict[str, float]] = {}
+        self.gauges: Dict[str, float] = {}
+
+    def count(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[name] = value
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseTimer]:
+        """Замеряет время блока и накапливает его в таймере с именем name."""
+        timer = PhaseTimer(name)
+        try:
+            yield timer
+        finally:
+            timer.elapsed = time.perf_counter() - timer.start
+            if self.enabled:
+                with self._lock:
+                    stats = self.timers.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0})
+                    stats["calls"] += 1
+                    stats["total"] += timer.elapsed
+                    stats["max"] = max(stats["max"], timer.elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {name: dict(stats) for name, stats in self.timers.items()},
+                "gauges": dict(self.gauges),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+            self.gauges.clear()
+
+    def emit(self, file_name: str | Path, **context):
+        """Дописывает текущее состояние метрик одной строкой в файл JSON Lines."""
+        record = {"timestamp": datetime.now().isoformat(timespec="milliseconds"), **context, **self.snapshot()}
+        with open(file_name, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class RateLimitedLogger:
+    """
+    Вывод прогресса не чаще одного сообщения в interval секунд для каждого ключа.
+    Пропущенные сообщения подсчитываются и указываются в следующем выведенном.
+    """
+    def __init__(self, interval: float = 1.0, sink: Callable[[str], None] = print):
+        self.interval = interval
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._last_time: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def set_sink(self, sink: Callable[[str], None]):
+        self.sink = sink
+
+    def info(self, message: str | Callable[[], str], key: str = "default", force: bool = False):
+        """
+        Args:
+            message: строка или функция, возвращающая строку (вызывается только если сообщение будет выведено)
+            key: категория сообщений, для каждой ограничение частоты своё
+            force: вывести независимо от ограничения
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_time.get(key, float("-inf")) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return
+            self._last_time[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+
+        text = message() if callable(message) else message
+        if suppressed > 0:
+            text += f" (пропущено сообщений: {suppressed})"
+        self.sink(text)
+
+
+metrics = Metrics()
+log = RateLimitedLogger()
+
+
+@contextmanager
+def profiled(cprofile_file: str | Path | None = None, trace_memory: bool = False, top: int = 20) -> Iterator[None]:
+    """
+    Необязательный сбор профиля cProfile и статистики памяти tracemalloc для блока кода.
+
+    Args:
+        cprofile_file: куда сохранить профиль (pstats); None - не профилировать
+        trace_memory: включить tracemalloc; пиковая память попадает в gauge peak_memory_mb
+        top: сколько самых затратных функций вывести по завершении
+    """
+    profiler = cProfile.Profile() if cprofile_file else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(str(cprofile_file))
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+        if trace_memory:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            metrics.gauge("peak_memory_mb", peak_memory / 2 ** 20)
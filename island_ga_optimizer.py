@@ -0,0 +1,246 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import random
+import time
+from typing import Dict, List, Tuple
+from checker import only_calculate_earning
+from ga_optimizer import GaOptimizer
+from instrumentation import log, metrics
+from models import InputData, Orders, WorkPlan
+from surrogate import SurrogateScore, SurrogateScreen
+
+# особь - перестановка индексов заказов (в порядке убывания приоритета) и её прибыль
+Individual = Tuple[Tuple[int, ...], float]
+
+_optimizer: "IslandGaOptimizer | None" = None
+
+
+class IslandGaOptimizer:
+    """
+    Генетический алгоритм с кодированием перестановкой: особь - порядок заказов, который декодирует
+    GaOptimizer._create_plan (первый заказ получает наибольший приоритет). Скрещивание упорядоченное (OX),
+    мутации - обмен двух заказов или перенос заказа на другое место, поэтому потомок всегда перестановка
+    и равных приоритетов не бывает.
+
+    Популяция разбита на острова, которые эволюционируют независимо в отдельных процессах.
+    Каждые migration_interval поколений лучшие особи острова переходят на следующий по кругу остров
+    вместо худших. Поиск останавливается, если лучшая прибыль не растёт patience эпох подряд.
+
+    С screen_fraction < 1 потомков рождается в 1 / screen_fraction раз больше, чем нужно,
+    и полный декодер получает только лучших из них по суррогатной оценке (см. surrogate.py).
+    С admission перестановки строятся только из заказов, прошедших отбор по мощности (см. admission.py).
+    decoder выбирает схему построения плана GaOptimizer: "serial" или "parallel" (см. event_scheduler.py).
+    """
+    def __init__(self, input_data: InputData, orders: Orders, islands: int = 4, population: int = 12,
+                 migration_interval: int = 5, migrants: int = 1, crossover_probability: float = 0.9,
+                 mutation_probability: float = 0.3, tournament: int = 3, patience: int = 4,
+                 screen_fraction: float = 0.5, admission: bool = False, decoder: str = "serial",
+                 seed: int | None = None):
+        self.decoder = GaOptimizer(input_data, orders, admission, decoder)
+        self.input_data = self.decoder.input_data
+        self.orders = self.decoder.orders
+        self.islands = islands
+        self.population = population
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.crossover_probability = crossover_probability
+        self.mutation_probability = mutation_probability
+        self.tournament = tournament
+        self.patience = patience
+        self.random = random.Random(seed)
+        self.screen = SurrogateScreen(SurrogateScore(self.input_data, self.orders.root, self.decoder.estimator),
+                                      screen_fraction) if screen_fraction < 1 else None
+        # приспособленность уже декодированных перестановок в этом процессе
+        self._fitness_cache: Dict[Tuple[int, ...], float] = {}
+
+    def optimize(self, initial_plan: WorkPlan | None = None, epochs: int = 20, time_limit: float | None = None,
+                 processes: int | None = None) -> WorkPlan:
+        """
+        Args:
+            initial_plan: план для тёплого старта, его порядок заказов добавляется на первый остров
+            epochs: наибольшее число эпох (migration_interval поколений на каждом острове и миграция)
+            time_limit: ограничение времени в секундах, проверяется между поколениями
+            processes: число процессов (по умолчанию по числу островов, но не больше числа ядер)
+        """
+        with metrics.phase("island.optimize") as timer:
+            result = self._optimize(initial_plan, epochs, time_limit, processes)
+        print(f"\nВремя выполнения: {timer.elapsed:.2f} секунд")
+        return result
+
+    def _optimize(self, initial_plan: WorkPlan | None, epochs: int, time_limit: float | None,
+                  processes: int | None) -> WorkPlan:
+        # время по часам, а не perf_counter: срок проверяют и процессы пула
+        deadline = time.time() + time_limit if time_limit is not None else None
+        if len(self.orders.root) == 0:
+            return WorkPlan.trusted([])
+
+        islands = [[(permutation, self.fitness(permutation)) for permutation in seeds]
+                   for seeds in self._initial_permutations(initial_plan)]
+        best = max((individual for island in islands for individual in island), key=lambda x: x[1])
+        print(f"Начальная прибыль: {best[1]:,.0f}".replace(',', ' '))
+
+        processes = processes if processes is not None else min(self.islands, os.cpu_count() or 1)
+        executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self,)) \
+            if processes > 1 else None
+        stale_epochs = 0
+        try:
+            for epoch in range(epochs):
+                if deadline is not None and time.time() > deadline:
+                    print(f"Время вышло на эпохе {epoch}")
+                    break
+
+                tasks = [(island, self.migration_interval, self.random.randrange(2 ** 32), deadline) for island in islands]
+                if executor is not None:
+                    results = list(executor.map(_evolve, tasks))
+                    if self.screen is not None:
+                        for _, stats in results:
+                            self.screen.merge(stats)
+                else:
+                    results = [self.evolve(*task) for task in tasks]
+                islands = self._migrate([island for island, _ in results])
+
+                epoch_best = max((individual for island in islands for individual in island), key=lambda x: x[1])
+                if epoch_best[1] > best[1]:
+                    best = epoch_best
+                    stale_epochs = 0
+                    log.info(f"Эпоха {epoch}, прибыль: {best[1]:,.0f}".replace(',', ' '), key="island.progress")
+                else:
+                    stale_epochs += 1
+                    if stale_epochs >= self.patience:
+                        print(f"Прибыль не растёт {self.patience} эпох, останавливаемся на эпохе {epoch}")
+                        break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if self.screen is not None:
+            print(self.screen.summary())
+        return self.decoder._create_plan(self.priorities(best[0]))
+
+    def _initial_permutations(self, initial_plan: WorkPlan | None) -> List[List[Tuple[int, ...]]]:
+        """
+        Первый остров начинается с порядка по оценке прибыли (и с порядка из initial_plan),
+        на остальных - его копии с несколькими случайными обменами и случайные перестановки.
+        """
+        n = len(self.orders.root)
+        estimated = [self.decoder._estimated_total_order_earning(order) for order in self.orders.root]
+        heuristic = tuple(sorted(range(n), key=lambda i: -estimated[i]))
+        seeds = [heuristic]
+        if initial_plan is not None:
+            priorities = self.decoder.priorities_from_plan(initial_plan)
+            seeds.append(tuple(sorted(range(n), key=lambda i: -priorities[i])))
+
+        islands = []
+        for island_index in range(self.islands):
+            permutations = list(seeds) if island_index == 0 else []
+            while len(permutations) < self.population:
+                if self.random.random() < 0.5:
+                    permutations.append(self._perturb(self.random.choice(seeds), max(1, n // 10)))
+                else:
+                    permutations.append(tuple(self.random.sample(range(n), n)))
+            islands.append(permutations)
+        return islands
+
+    def _perturb(self, permutation: Tuple[int, ...], swaps: int) -> Tuple[int, ...]:
+        result = list(permutation)
+        for _ in range(swaps):
+            i, j = self.random.randrange(len(result)), self.random.randrange(len(result))
+            result[i], result[j] = result[j], result[i]
+        return tuple(result)
+
+    def _migrate(self, islands: List[List[Individual]]) -> List[List[Individual]]:
+        """Лучшие особи каждого острова заменяют худшие на следующем по кругу острове."""
+        if len(islands) < 2:
+            return islands
+        emigrants = [sorted(island, key=lambda x: -x[1])[:self.migrants] for island in islands]
+        result = []
+        for i, island in enumerate(islands):
+            arriving = [individual for individual in emigrants[i - 1]
+                        if individual[0] not in {permutation for permutation, _ in island}]
+            survivors = sorted(island, key=lambda x: -x[1])[:len(island) - len(arriving)]
+            result.append(survivors + arriving)
+            metrics.count("island.migrants", len(arriving))
+        return result
+
+    # --- эволюция одного острова, выполняется в процессе пула ---
+
+    def evolve(self, island: List[Individual], generations: int, seed: int,
+               deadline: float | None = None) -> Tuple[List[Individual], Tuple[int, int, float]]:
+        """Возвращает новое поколение острова и счётчики суррогатного отбора за этот вызов."""
+        rng = random.Random(seed)
+        before = self.screen.stats if self.screen is not None else (0, 0, 0.0)
+        for _ in range(generations):
+            if deadline is not None and time.time() > deadline:
+                break
+            # элитизм: лучшая особь переходит в следующее поколение без изменений
+            next_island = [max(island, key=lambda x: x[1])]
+            needed = len(island) - 1
+            if self.screen is not None:
+                children = [self._child(island, rng) for _ in range(math.ceil(needed / self.screen.keep_fraction))]
+                children = self.screen.select(children, lambda child: child, keep=needed)
+            else:
+                children = [self._child(island, rng) for _ in range(needed)]
+            island = next_island + [(child, self.fitness(child)) for child in children]
+        after = self.screen.stats if self.screen is not None else (0, 0, 0.0)
+        return island, (after[0] - before[0], after[1] - before[1], after[2] - before[2])
+
+    def _child(self, island: List[Individual], rng: random.Random) -> Tuple[int, ...]:
+        first, second = self._select(island, rng), self._select(island, rng)
+        child = self._order_crossover(first, second, rng) if rng.random() < self.crossover_probability else first
+        if rng.random() < self.mutation_probability:
+            child = self._mutate(child, rng)
+        return child
+
+    def _select(self, island: List[Individual], rng: random.Random) -> Tuple[int, ...]:
+        """Турнирный отбор."""
+        return max(rng.sample(island, min(self.tournament, len(island))), key=lambda x: x[1])[0]
+
+    @staticmethod
+    def _order_crossover(first: Tuple[int, ...], second: Tuple[int, ...], rng: random.Random) -> Tuple[int, ...]:
+        """OX: отрезок первого родителя остаётся на месте, остальные заказы - в порядке второго родителя."""
+        n = len(first)
+        if n < 2:
+            return first
+        i, j = sorted(rng.sample(range(n + 1), 2))
+        segment = set(first[i:j])
+        rest = [gene for gene in second if gene not in segment]
+        return tuple(rest[:i]) + first[i:j] + tuple(rest[i:])
+
+    @staticmethod
+    def _mutate(permutation: Tuple[int, ...], rng: random.Random) -> Tuple[int, ...]:
+        result = list(permutation)
+        if len(result) < 2:
+            return permutation
+        i, j = rng.sample(range(len(result)), 2)
+        if rng.random() < 0.5:
+            result[i], result[j] = result[j], result[i]
+        else:
+            result.insert(j, result.pop(i))
+        return tuple(result)
+
+    def priorities(self, permutation: Tuple[int, ...]) -> List[int]:
+        """Приоритеты заказов для GaOptimizer._create_plan: первый в перестановке получает наибольший."""
+        n = len(permutation)
+        priorities = [0] * n
+        for rank, order_index in enumerate(permutation):
+            priorities[order_index] = n - rank
+        return priorities
+
+    def fitness(self, permutation: Tuple[int, ...]) -> float:
+        if permutation in self._fitness_cache:
+            metrics.count("cache_hits")
+            return self._fitness_cache[permutation]
+        plan = self.decoder._create_plan(self.priorities(permutation))
+        fitness = only_calculate_earning(self.orders, plan, self.input_data) if len(plan.root) > 0 else 0.0
+        self._fitness_cache[permutation] = fitness
+        return fitness
+
+
+def _init_worker(optimizer: IslandGaOptimizer):
+    global _optimizer
+    _optimizer = optimizer
+
+
+def _evolve(args: Tuple[List[Individual], int, int, float | None]) -> Tuple[List[Individual], Tuple[int, int, float]]:
+    return _optimizer.evolve(*args)
@@ -0,0 +1,343 @@
+from bisect import insort
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from math import ceil
+import random
+import time
+from typing import Dict, List, Set, Tuple
+from checker import only_calculate_earning
+from date_utils import closest_workday, is_weekend
+from instrumentation import log, metrics
+from models import InputData, Orders, WorkPlan
+from models.input_data import Worker
+from models.orders import Order, Task
+from models.work_plan import AssignedTask
+from problem import CompiledProblem
+
+# занятость работников: идентификатор работника -> отсортированные интервалы (начало, конец) включительно
+Timelines = Dict[str, Tuple[Tuple[date, date], ...]]
+
+_optimizer: "LnsOptimizer | None" = None
+
+
+class LnsOptimizer:
+    """
+    Поиск в больших окрестностях (LNS): из текущего плана снимаются заказы в окне времени
+    или на нескольких работниках, и эта небольшая подзадача решается заново методом ветвей и границ.
+    Перебираются все подмножества и порядки вставки снятых заказов (плюс несколько заказов вне плана),
+    каждая задача ставится к работнику с самым ранним окончанием. План принимается, если прибыль выросла.
+    """
+    def __init__(self, input_data: InputData, orders: Orders, max_orders: int = 4, max_new_orders: int = 2,
+                 window_days: int = 21, max_nodes: int = 5000, seed: int | None = None):
+        self.input_data = input_data
+        self.orders = orders
+        self.problem = CompiledProblem(orders, input_data)
+        self.max_orders = max_orders
+        self.max_new_orders = max_new_orders
+        self.window_days = window_days
+        self.max_nodes = max_nodes
+        self.random = random.Random(seed)
+
+        self.eligible_workers: Dict[str, List[Worker]] = self.problem.worker_index.eligible
+        self.order_tasks: Dict[str, List[Task]] = {order.id: self._topological_order(order) for order in orders.root}
+        self._end_dates: Dict[Tuple[date, int], date] = {}
+
+    def optimize(self, initial_plan: WorkPlan | None = None, iterations: int = 300,
+                 time_limit: float | None = None, processes: int = 1) -> WorkPlan:
+        """
+        Args:
+            initial_plan: план, который улучшаем; по умолчанию план SimpleOptimizer
+            iterations: число итераций разрушения и восстановления
+            time_limit: ограничение времени в секундах, проверяется между итерациями
+            processes: сколько непересекающихся окрестностей решать параллельно за итерацию
+        """
+        with metrics.phase("lns.optimize") as timer:
+            result = self._optimize(initial_plan, iterations, time_limit, processes)
+        print(f"Время работы optimize: {timer.elapsed:.2f} секунд")
+        return result
+
+    def _optimize(self, initial_plan: WorkPlan | None, iterations: int, time_limit: float | None,
+                  processes: int) -> WorkPlan:
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        if initial_plan is None:
+            from simple_optimizer import SimpleOptimizer
+            initial_plan = SimpleOptimizer(self.input_data, self.orders).optimize()
+
+        plan = {t.taskId: t for t in initial_plan.root if t.taskId in self.problem.task_by_id}
+        earning = only_calculate_earning(self.orders, WorkPlan.trusted(plan.values()), self.input_data) if plan else 0.0
+        print(f"Начальная прибыль: {earning:,.0f}".replace(',', ' '))
+
+        executor = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self,)) \
+            if processes > 1 else None
+        try:
+            for iteration in range(iterations):
+                if deadline is not None and time.perf_counter() > deadline:
+                    print(f"Время вышло на итерации {iteration}")
+                    break
+
+                neighborhoods = self._disjoint_neighborhoods(plan, processes)
+                if len(neighborhoods) == 0:
+                    continue
+
+                tasks = [(list(plan.values()), removed, candidates) for removed, candidates in neighborhoods]
+                if executor is not None and len(tasks) > 1:
+                    repairs = list(executor.map(_repair, tasks))
+                else:
+                    repairs = [self.repair(*task) for task in tasks]
+
+                new_plan, new_earning = self._apply(plan, neighborhoods, repairs)
+                if new_plan is not None and new_earning > earning:
+                    plan, earning = new_plan, new_earning
+                    metrics.count("lns.improvements")
+                    log.info(f"Итерация {iteration}, прибыль: {earning:,.0f}".replace(',', ' '), key="lns.progress")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return WorkPlan.trusted(sorted(plan.values(), key=lambda x: x.start))
+
+    def _apply(self, plan: Dict[str, AssignedTask], neighborhoods: List[Tuple[List[str], List[str]]],
+               repairs: List[Tuple[float, List[AssignedTask]]]) -> Tuple[Dict[str, AssignedTask] | None, float]:
+        """
+        Окрестности не делят работников, поэтому улучшения можно применить вместе;
+        общий горизонт всё же может их испортить, и тогда берём только лучшее.
+        """
+        improved = [(gain, removed, assignments) for (removed, _), (gain, assignments) in zip(neighborhoods, repairs)
+                    if gain > 0]
+        if len(improved) == 0:
+            return None, float('-inf')
+
+        def build(items) -> Tuple[Dict[str, AssignedTask], float]:
+            new_plan = dict(plan)
+            for _, removed, assignments in items:
+                for order_id in removed:
+                    for task in self.problem.compiled_orders.order_by_id[order_id].tasks:
+                        new_plan.pop(task.id, None)
+                for assigned_task in assignments:
+                    new_plan[assigned_task.taskId] = assigned_task
+            if len(new_plan) == 0:
+                return new_plan, 0.0
+            return new_plan, only_calculate_earning(self.orders, WorkPlan.trusted(new_plan.values()), self.input_data)
+
+        combined = build(improved)
+        if len(improved) > 1:
+            single = build([max(improved, key=lambda x: x[0])])
+            if single[1] > combined[1]:
+                return single
+        return combined
+
+    # --- окрестности ---
+
+    def _disjoint_neighborhoods(self, plan: Dict[str, AssignedTask], count: int) -> List[Tuple[List[str], List[str]]]:
+        neighborhoods = []
+        used_workers: Set[str] = set()
+        for _ in range(count * 3):
+            if len(neighborhoods) >= count:
+                break
+            removed, candidates = self._neighborhood(plan)
+            workers = self._workers_for(removed + candidates)
+            if len(removed) + len(candidates) == 0 or workers & used_workers:
+                continue
+            used_workers |= workers
+            neighborhoods.append((removed, candidates))
+        return neighborhoods
+
+    def _neighborhood(self, plan: Dict[str, AssignedTask]) -> Tuple[List[str], List[str]]:
+        """Возвращает (заказы, снимаемые из плана, заказы вне плана, которые можно попробовать вставить)."""
+        order_by_task_id = self.problem.order_by_task_id
+        planned_orders = {order_by_task_id[task_id].id for task_id in plan}
+        removed: List[str] = []
+
+        if len(plan) > 0:
+            pivot = self.random.choice(list(plan.values()))
+            if self.random.random() < 0.5:
+                # окно времени вокруг случайной задачи
+                window_end = pivot.start + timedelta(days=self.window_days)
+                in_window = [t for t in plan.values() if pivot.start <= t.start <= window_end]
+            else:
+                # последовательности задач случайного работника и ещё одного с общим типом работ
+                workers = {pivot.workerId}
+                task = self.problem.task_by_id[pivot.taskId]
+                others = [w.id for w in self.eligible_workers[task.workTypeId] if w.id != pivot.workerId]
+                if others:
+                    workers.add(self.random.choice(others))
+                in_window = [t for t in plan.values() if t.workerId in workers]
+            in_window.sort(key=lambda t: abs((t.start - pivot.start).days))
+            for assigned_task in in_window:
+                order_id = order_by_task_id[assigned_task.taskId].id
+                if order_id not in removed:
+                    removed.append(order_id)
+                    if len(removed) >= self.max_orders:
+                        break
+
+        unplanned = [order.id for order in self.orders.root
+                     if order.id not in planned_orders and self._can_be_placed(order)]
+        candidates = self.random.sample(unplanned, min(self.max_new_orders, len(unplanned)))
+        return removed, candidates
+
+    def _can_be_placed(self, order: Order) -> bool:
+        return all(self.eligible_workers.get(task.workTypeId) for task in order.tasks)
+
+    def _workers_for(self, order_ids: List[str]) -> Set[str]:
+        order_by_id = self.problem.compiled_orders.order_by_id
+        return {worker.id for order_id in order_ids for task in order_by_id[order_id].tasks
+                for worker in self.eligible_workers.get(task.workTypeId, [])}
+
+    # --- восстановление методом ветвей и границ ---
+
+    def repair(self, plan: List[AssignedTask], removed: List[str], candidates: List[str]) -> Tuple[float, List[AssignedTask]]:
+        """
+        Снимает заказы removed и заново выбирает, какие из removed + candidates и в каком порядке вставить.
+
+        Returns:
+            (прирост прибыли относительно исходного плана, назначения вставленных заказов)
+        """
+        with metrics.phase("lns.repair"):
+            return self._repair(plan, removed, candidates)
+
+    def _repair(self, plan: List[AssignedTask], removed: List[str], candidates: List[str]) -> Tuple[float, List[AssignedTask]]:
+        order_by_id = self.problem.compiled_orders.order_by_id
+        plan_dict = {t.taskId: t for t in plan}
+        removed_task_ids = {task.id for order_id in removed for task in order_by_id[order_id].tasks}
+
+        timelines_lists: Dict[str, List[Tuple[date, date]]] = {}
+        kept_end: date | None = None
+        for assigned_task in plan:
+            if assigned_task.taskId in removed_task_ids:
+                continue
+            timelines_lists.setdefault(assigned_task.workerId, []).append((assigned_task.start, assigned_task.end))
+            if kept_end is None or assigned_task.end > kept_end:
+                kept_end = assigned_task.end
+        timelines: Timelines = {worker_id: tuple(sorted(intervals)) for worker_id, intervals in timelines_lists.items()}
+
+        # прибыль исходного плана в пределах окрестности
+        plan_end = max((t.end for t in plan), default=None)
+        original_value = sum(self._order_value(order_by_id[order_id], plan_dict) for order_id in removed) \
+            - self._horizon_cost(plan_end)
+
+        # сначала пробуем заказы подороже: раньше находится хорошее решение, и сильнее отсечение
+        orders = sorted((order_by_id[order_id] for order_id in removed + candidates), key=lambda o: o.earning, reverse=True)
+        best_value = -self._horizon_cost(kept_end)
+        best_assignments: List[AssignedTask] = []
+        nodes = 0
+
+        def search(remaining: Tuple[int, ...], timelines: Timelines, end: date | None, value: float,
+                   assignments: List[AssignedTask]):
+            nonlocal best_value, best_assignments, nodes
+            nodes += 1
+            current = value - self._horizon_cost(end)
+            if current > best_value:
+                best_value, best_assignments = current, assignments
+            # горизонт может только вырасти, поэтому прибыль не превысит сумму выручек оставшихся заказов
+            bound = current + sum(orders[i].earning for i in remaining)
+            if bound <= best_value or nodes >= self.max_nodes:
+                return
+            for i in remaining:
+                placed = self._insert_order(orders[i], timelines)
+                if placed is None:
+                    continue
+                new_timelines, order_assignments = placed
+                order_value = self._order_value(orders[i], {t.taskId: t for t in order_assignments})
+                if order_value <= 0:
+                    continue
+                order_end = max(t.end for t in order_assignments)
+                search(tuple(j for j in remaining if j != i), new_timelines,
+                       order_end if end is None else max(end, order_end), value + order_value,
+                       assignments + order_assignments)
+
+        search(tuple(range(len(orders))), timelines, kept_end, 0.0, [])
+        metrics.count("lns.nodes", nodes)
+        return best_value - original_value, best_assignments
+
+    def _insert_order(self, order: Order, timelines: Timelines) -> Tuple[Timelines, List[AssignedTask]] | None:
+        """Ставит задачи заказа по порядку зависимостей к работнику с самым ранним окончанием."""
+        new_timelines = dict(timelines)
+        placed: Dict[str, AssignedTask] = {}
+        for task in self.order_tasks[order.id]:
+            min_date = self.input_data.currentDate
+            for dep_id in task.dependsOn:
+                if dep_id not in placed:
+                    return None
+                min_date = max(min_date, placed[dep_id].end + timedelta(days=1))
+            min_date = closest_workday(min_date, self.problem.holidays)
+
+            best = None
+            for worker in self.eligible_workers.get(task.workTypeId, []):
+                start, end = self._earliest_slot(new_timelines.get(worker.id, ()), min_date, task.baseDuration,
+                                                 worker.productivity)
+                if best is None or (end, start) < (best[2], best[1]):
+                    best = (worker.id, start, end)
+            if best is None:
+                return None
+
+            worker_id, start, end = best
+            intervals = list(new_timelines.get(worker_id, ()))
+            insort(intervals, (start, end))
+            new_timelines[worker_id] = tuple(intervals)
+            placed[task.id] = AssignedTask.trusted(taskId=task.id, workerId=worker_id, start=start, end=end)
+        return new_timelines, list(placed.values())
+
+    def _earliest_slot(self, intervals: Tuple[Tuple[date, date], ...], min_date: date, base_duration: int,
+                       productivity: float) -> Tuple[date, date]:
+        start = min_date
+        end = self._end_date(start, base_duration, productivity)
+        for interval_start, interval_end in intervals:
+            if interval_end < start:
+                continue
+            if end < interval_start:
+                break
+            start = closest_workday(interval_end + timedelta(days=1), self.problem.holidays)
+            end = self._end_date(start, base_duration, productivity)
+        return start, end
+
+    def _end_date(self, start: date, base_duration: int, productivity: float) -> date:
+        # то же, что calculate_task_end_date, но с запоминанием: в переборе одни и те же даты считаются много раз
+        duration = ceil(base_duration / productivity)
+        key = (start, duration)
+        end = self._end_dates.get(key)
+        if end is None:
+            end = start
+            working_days_count = 1
+            while working_days_count < duration:
+                end += timedelta(days=1)
+                if not is_weekend(end) and end not in self.problem.holidays:
+                    working_days_count += 1
+            self._end_dates[key] = end
+        return end
+
+    def _order_value(self, order: Order, plan: Dict[str, AssignedTask]) -> float:
+        if any(task.id not in plan for task in order.tasks):
+            return 0.0
+        delay = (max(plan[task.id].end for task in order.tasks) - order.deadline).days
+        penalty = order.penaltyByDay * max(delay, 0)
+        return order.earning - penalty if penalty < order.earning else 0.0
+
+    def _horizon_cost(self, end: date | None) -> float:
+        if end is None:
+            return 0.0
+        return ((end - self.input_data.currentDate).days + 1) * self.input_data.companyDayCost
+
+    @staticmethod
+    def _topological_order(order: Order) -> List[Task]:
+        result: List[Task] = []
+        placed: Set[str] = set()
+        remaining = list(order.tasks)
+        while remaining:
+            ready = [task for task in remaining if all(dep in placed for dep in task.dependsOn)]
+            if len(ready) == 0:
+                # циклическая или внешняя зависимость: такой заказ вставить не получится
+                return result + remaining
+            for task in ready:
+                result.append(task)
+                placed.add(task.id)
+            remaining = [task for task in remaining if task.id not in placed]
+        return result
+
+
+def _init_worker(optimizer: LnsOptimizer):
+    global _optimizer
+    _optimizer = optimizer
+
+
+def _repair(args: Tuple[List[AssignedTask], List[str], List[str]]) -> Tuple[float, List[AssignedTask]]:
+    return _optimizer.repair(*args)
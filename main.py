@@ -1,51 +1,424 @@
-from pydantic import TypeAdapter
+import argparse
+import sys
 
-from advanced_optimizer import AdvancedOptimizer
-from checker import check, only_calculate_earning
-from ga_optimizer import GaOptimizer
-from gantt_chart import create_gantt_chart
-from models import InputData, Orders, WorkPlan
-from simple_optimizer import SimpleOptimizer
-from utils import load_json, save_to_file
+# Модули оптимизаторов, проверки и визуализации импортируются внутри команд:
+# простая проверка не должна платить за загрузку pygad, numpy, plotly и dash.
 
-def optimize_simple(_input_data: InputData, _orders: Orders) -> WorkPlan:
-    simple_optimizer = SimpleOptimizer(_input_data, _orders)
-    return simple_optimizer.optimize()
+DEFAULT_INPUT = "data/input_data2.json"
+DEFAULT_ORDERS = "data/orders2.json"
+DEFAULT_PLAN = "data/work_plan.json"
 
-def optimize_genetic(_input_data: InputData, _orders: Orders) -> WorkPlan:
-    ga_optimizer = GaOptimizer(input_data, orders)
-    return ga_optimizer.optimize()
 
-def optimize_advanced(_input_data: InputData, _orders: Orders) -> WorkPlan:
-    advanced_optimizer = AdvancedOptimizer(_input_data, _orders)
-    return advanced_optimizer.optimize(100, 0.2)
+def _load_problem(args):
+    from models import InputData, Orders
+    from utils import load_model
+    return load_model(args.input, InputData), load_model(args.orders, Orders)
 
-if __name__ == "__main__":
-    print("Начинаем проверку")
 
-    input_data = TypeAdapter(InputData).validate_python(load_json("input_data2.json"))
-    orders = TypeAdapter(Orders).validate_python(load_json("orders2.json"))
-    work_plan = None
+def _print_result(result, as_json: bool):
+    if as_json:
+        print(result.model_dump_json())
+    else:
+        print(result)
+
+
+def cmd_check(args) -> int:
+    from checker import check
+    from models import WorkPlan
+    from utils import load_model
+
+    input_data, orders = _load_problem(args)
+    work_plan = load_model(args.plan, WorkPlan)
+    result = check(orders, work_plan, input_data)
+    _print_result(result, args.json)
+    return 0 if result.success else 1
+
+
+def _engine_params(args, orders) -> dict:
+    from engines import ADMISSION_ENGINES, DECODER_ENGINES, TIME_LIMITED_ENGINES
+
+    params = {}
+    if args.engine in ("advanced", "ga") and not args.no_tuned:
+        from tuner import load_tuned_params
+        params = load_tuned_params(args.engine, orders)
+        if params:
+            print(f"Настроенные параметры: {params}")
+    if args.engine == "advanced":
+        # явно заданные параметры важнее настроенных
+        explicit = {"orders_window": args.window, "workers_step": args.step, "earning_coefficient": args.earning_coefficient}
+        params.update({name: value for name, value in explicit.items() if value is not None})
+    elif args.engine == "ga":
+        params["plot_fitness"] = args.plot
+    elif args.engine == "lns":
+        from models import WorkPlan
+        from utils import load_model
+        params = {"iterations": args.iterations, "processes": args.lns_processes}
+        if args.initial_plan:
+            params["initial_plan"] = load_model(args.initial_plan, WorkPlan)
+    elif args.engine == "island":
+        from models import WorkPlan
+        from utils import load_model
+        params = {"islands": args.islands, "epochs": args.epochs, "processes": args.island_processes}
+        if args.initial_plan:
+            params["initial_plan"] = load_model(args.initial_plan, WorkPlan)
+    if args.screen_fraction is not None and args.engine in ("sa", "island"):
+        params["screen_fraction"] = args.screen_fraction
+    if args.time_limit is not None and args.engine in TIME_LIMITED_ENGINES:
+        params["time_limit"] = args.time_limit
+    if args.admission and args.engine in ADMISSION_ENGINES:
+        params["admission"] = True
+    if args.decoder is not None and args.engine in DECODER_ENGINES:
+        params["decoder"] = args.decoder
+    return params
+
 
+def cmd_optimize(args) -> int:
+    from checker import check
+    from engines import run_engine
+    from utils import save_model
+
+    input_data, orders = _load_problem(args)
     print(f"Всего заказов: {len(orders.root)}")
 
-    mode = 1
+    if args.decompose:
+        from decomposer import optimize_decomposed
+        work_plan = optimize_decomposed(input_data, orders, args.engine, args.processes, **_engine_params(args, orders))
+    else:
+        work_plan = run_engine(args.engine, input_data, orders, **_engine_params(args, orders))
+
+    # оптимизаторы могут менять входные модели, поэтому сжимаем и проверяем по заново загруженным данным
+    input_data, orders = _load_problem(args)
+    if args.compact:
+        from compactor import compact_plan
+        work_plan = compact_plan(orders, work_plan, input_data)
+
+    save_model(work_plan, args.output)
+    print(f"План сохранён: {args.output}")
+
+    result = check(orders, work_plan, input_data)
+    _print_result(result, args.json)
+    return 0 if result.success else 1
+
+
+def cmd_replan(args) -> int:
+    from datetime import date
+    from checker import check
+    from models import WorkPlan
+    from replanner import replan
+    from utils import load_model, save_model
+
+    input_data, orders = _load_problem(args)
+    if args.current_date:
+        input_data.currentDate = date.fromisoformat(args.current_date)
+    previous_plan = load_model(args.plan, WorkPlan)
+
+    work_plan = replan(input_data, orders, previous_plan, args.freeze_days,
+                       locked_task_ids=args.lock_tasks.split(",") if args.lock_tasks else (),
+                       locked_order_ids=args.lock_orders.split(",") if args.lock_orders else (),
+                       orders_window=args.window, workers_step=args.step,
+                       earning_coefficient=args.earning_coefficient, time_limit=args.time_limit)
 
-    if mode == 1:
-        work_plan = TypeAdapter(WorkPlan).validate_python(load_json("work_plan.json"))
-    elif mode == 2:
-        work_plan = optimize_simple(input_data, orders)
-        save_to_file(work_plan, "work_plan.json")
-    elif mode == 3:
-        work_plan = optimize_genetic(input_data, orders)
-        save_to_file(work_plan, "work_plan.json")
-    elif mode == 4:
-        work_plan = optimize_advanced(input_data, orders)
-        save_to_file(work_plan, "work_plan.json")
+    save_model(work_plan, args.output)
+    print(f"План сохранён: {args.output}")
 
+    input_data, orders = _load_problem(args)
+    if args.current_date:
+        input_data.currentDate = date.fromisoformat(args.current_date)
     result = check(orders, work_plan, input_data)
-    print(result)
+    _print_result(result, args.json)
+    return 0 if result.success else 1
+
+
+def cmd_compact(args) -> int:
+    from checker import check
+    from compactor import compact_plan
+    from models import WorkPlan
+    from utils import load_model, save_model
+
+    input_data, orders = _load_problem(args)
+    work_plan = load_model(args.plan, WorkPlan)
+    before = check(orders, work_plan, input_data)
+    work_plan = compact_plan(orders, work_plan, input_data)
+    result = check(orders, work_plan, input_data)
+    if not args.json:
+        profit_before = f"{before.total_earning:,.2f}".replace(',', ' ')
+        profit_after = f"{result.total_earning:,.2f}".replace(',', ' ')
+        print(f"Прибыль до сжатия: {profit_before}, после: {profit_after}")
+
+    save_model(work_plan, args.output)
+    print(f"План сохранён: {args.output}")
+    _print_result(result, args.json)
+    return 0 if result.success else 1
+
+
+def cmd_repair(args) -> int:
+    from checker import check
+    from models import WorkPlan
+    from repair import repair_plan
+    from utils import load_model, save_model
+
+    input_data, orders = _load_problem(args)
+    work_plan = load_model(args.plan, WorkPlan)
+    before = check(orders, work_plan, input_data)
+    work_plan, repair_result = repair_plan(orders, work_plan, input_data)
+    result = check(orders, work_plan, input_data)
+    if not args.json:
+        print(f"Ошибок до исправления: {len(before.errors)}, после: {len(result.errors)}")
+        print(repair_result)
+
+    save_model(work_plan, args.output)
+    print(f"План сохранён: {args.output}")
+    _print_result(result, args.json)
+    return 0 if result.success else 1
+
+
+def cmd_export(args) -> int:
+    from columnar import export_plan
+    from models import WorkPlan
+    from utils import load_model
+
+    input_data, orders = _load_problem(args)
+    export_plan(load_model(args.plan, WorkPlan), orders, input_data, args.output)
+    print(f"План сохранён: {args.output}")
+    return 0
+
+
+def cmd_tune(args) -> int:
+    from tuner import save_tuned_params, size_class, tune
+
+    input_data, orders = _load_problem(args)
+    print(f"Всего заказов: {len(orders.root)}, класс размера: {size_class(orders)}")
+    params, profit = tune(args.engine, input_data, orders, args.configs, args.eta, args.time_limit, args.processes)
+    save_tuned_params(args.engine, orders, params, profit, args.output)
+    print(f"Лучшие параметры {params} сохранены: {args.output}")
+    return 0
+
+
+def cmd_portfolio(args) -> int:
+    from portfolio import run_portfolio
+    from utils import save_model
 
-    create_gantt_chart(orders, work_plan, input_data)
+    input_data, orders = _load_problem(args)
+    print(f"Всего заказов: {len(orders.root)}, бюджет времени: {args.budget} с")
 
+    work_plan, result, summary = run_portfolio(input_data, orders, args.budget, verbose=args.verbose)
+    for entry in summary:
+        profit = f"{entry['profit']:,.0f}".replace(',', ' ') if "profit" in entry else "-"
+        print(f"  {entry['engine']:<60} {entry['status']:<8} прибыль: {profit}")
 
+    if work_plan is None:
+        print("Ни один движок не построил допустимый план за отведённое время")
+        return 1
+
+    save_model(work_plan, args.output)
+    print(f"План сохранён: {args.output}")
+    _print_result(result, args.json)
+    return 0
+
+
+def cmd_sweep(args) -> int:
+    from pydantic import TypeAdapter
+    from scenario_sweep import Scenario, ScenarioResult, format_table, run_sweep
+
+    input_data, orders = _load_problem(args)
+    with open(args.scenarios, encoding="utf-8") as f:
+        scenarios = TypeAdapter(list[Scenario]).validate_json(f.read())
+    params = {}
+    if args.time_limit is not None:
+        from engines import TIME_LIMITED_ENGINES
+        if args.engine in TIME_LIMITED_ENGINES:
+            params["time_limit"] = args.time_limit
+    print(f"Сценариев: {len(scenarios)}, движок: {args.engine}")
+
+    results = run_sweep(input_data, orders, scenarios, args.engine, params, args.processes)
+    if args.json:
+        print(TypeAdapter(list[ScenarioResult]).dump_json(results).decode())
+    else:
+        print(format_table(results))
+    return 0 if all(result.success for result in results) else 1
+
+
+def cmd_batch_check(args) -> int:
+    from batch_checker import batch_check, load_problem
+
+    problem = load_problem(args.input, args.orders)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            failed = batch_check(problem, args.plans, output, args.processes)
+    else:
+        failed = batch_check(problem, args.plans, sys.stdout, args.processes)
+    return 0 if failed == 0 else 1
+
+
+def cmd_serve(args) -> int:
+    from service import serve
+    serve(args.host, args.port)
+    return 0
+
+
+def cmd_render(args) -> int:
+    from models import WorkPlan
+    from utils import load_model
+    from gantt_chart import create_gantt_chart, export_gantt_chart
+
+    input_data, orders = _load_problem(args)
+    work_plan = load_model(args.plan, WorkPlan)
+    if args.export:
+        export_gantt_chart(orders, work_plan, input_data, args.export)
+    else:
+        create_gantt_chart(orders, work_plan, input_data, args.port)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Проверка и оптимизация планов работ")
+    parser.add_argument("--metrics", help="дописать метрики запуска в файл JSON Lines")
+    parser.add_argument("--profile", help="сохранить профиль cProfile в файл")
+    parser.add_argument("--trace-memory", action="store_true", help="замерить пиковую память через tracemalloc")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_problem_arguments(subparser):
+        subparser.add_argument("--input", default=DEFAULT_INPUT, help="файл с исходными данными")
+        subparser.add_argument("--orders", default=DEFAULT_ORDERS, help="файл с заказами")
+
+    check_parser = subparsers.add_parser("check", help="проверить план работ")
+    add_problem_arguments(check_parser)
+    check_parser.add_argument("--plan", default=DEFAULT_PLAN, help="файл с планом работ")
+    check_parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    check_parser.set_defaults(handler=cmd_check)
+
+    batch_parser = subparsers.add_parser("batch-check", help="проверить много планов против одной задачи")
+    add_problem_arguments(batch_parser)
+    batch_parser.add_argument("plans", help="каталог с *.json, файл .jsonl или - для стандартного ввода")
+    batch_parser.add_argument("--output", help="файл JSON Lines для результатов (по умолчанию стандартный вывод)")
+    batch_parser.add_argument("--processes", type=int, help="число процессов (по умолчанию по числу ядер)")
+    batch_parser.set_defaults(handler=cmd_batch_check)
+
+    optimize_parser = subparsers.add_parser("optimize", help="построить план работ")
+    add_problem_arguments(optimize_parser)
+    optimize_parser.add_argument("--engine", choices=["simple", "advanced", "ga", "sa", "lns", "island"], default="advanced")
+    optimize_parser.add_argument("--output", default=DEFAULT_PLAN, help="куда сохранить план")
+    optimize_parser.add_argument("--window", type=int, help="advanced: окно заказов (по умолчанию настроенное или 100)")
+    optimize_parser.add_argument("--step", type=float, help="advanced: шаг коэффициента доступности (по умолчанию настроенный или 0.2)")
+    optimize_parser.add_argument("--earning-coefficient", type=float,
+                                 help="advanced: вес прибыли в оценке заказа (по умолчанию настроенный или 1.0)")
+    optimize_parser.add_argument("--no-tuned", action="store_true",
+                                 help="advanced, ga: не брать параметры из data/tuned_params.json")
+    optimize_parser.add_argument("--plot", action="store_true", help="ga: показать график приспособленности")
+    optimize_parser.add_argument("--iterations", type=int, default=300, help="lns: число итераций")
+    optimize_parser.add_argument("--initial-plan", help="lns: план, который улучшаем (по умолчанию план simple); "
+                                                        "island: план для тёплого старта")
+    optimize_parser.add_argument("--lns-processes", type=int, default=1, help="lns: сколько окрестностей решать параллельно")
+    optimize_parser.add_argument("--islands", type=int, default=4, help="island: число островов")
+    optimize_parser.add_argument("--epochs", type=int, default=20, help="island: наибольшее число эпох между миграциями")
+    optimize_parser.add_argument("--island-processes", type=int, help="island: число процессов (по умолчанию по числу островов)")
+    optimize_parser.add_argument("--screen-fraction", type=float,
+                                 help="sa, island: доля кандидатов, которые после суррогатной оценки строятся полностью "
+                                      "(по умолчанию 0.5, 1 - без отбора)")
+    optimize_parser.add_argument("--time-limit", type=float, help="advanced, ga, sa, lns, island: ограничение времени поиска в секундах")
+    optimize_parser.add_argument("--admission", action="store_true",
+                                 help="advanced, ga, sa, island: до планирования отобрать заказы, помещающиеся в мощность работников")
+    optimize_parser.add_argument("--decoder", choices=["serial", "parallel"],
+                                 help="ga, sa, island: построение плана по приоритетам - поиском окна у работников (serial, "
+                                      "по умолчанию) или раздачей готовых задач по очереди событий (parallel)")
+    optimize_parser.add_argument("--decompose", action="store_true",
+                                 help="оптимизировать независимые группы работников и типов работ параллельно")
+    optimize_parser.add_argument("--processes", type=int, help="--decompose: число процессов (по умолчанию по числу ядер)")
+    optimize_parser.add_argument("--compact", action="store_true", help="сдвинуть задачи готового плана как можно раньше")
+    optimize_parser.add_argument("--json", action="store_true", help="вывести результат проверки в JSON")
+    optimize_parser.set_defaults(handler=cmd_optimize)
+
+    compact_parser = subparsers.add_parser("compact", help="сдвинуть задачи плана как можно раньше")
+    add_problem_arguments(compact_parser)
+    compact_parser.add_argument("--plan", default=DEFAULT_PLAN, help="файл с планом работ")
+    compact_parser.add_argument("--output", default=DEFAULT_PLAN, help="куда сохранить сжатый план")
+    compact_parser.add_argument("--json", action="store_true", help="вывести результат проверки в JSON")
+    compact_parser.set_defaults(handler=cmd_compact)
+
+    repair_parser = subparsers.add_parser("repair", help="исправить недопустимый план, сдвигая и передавая задачи")
+    add_problem_arguments(repair_parser)
+    repair_parser.add_argument("--plan", default=DEFAULT_PLAN, help="файл с планом работ")
+    repair_parser.add_argument("--output", default=DEFAULT_PLAN, help="куда сохранить исправленный план")
+    repair_parser.add_argument("--json", action="store_true", help="вывести результат проверки в JSON")
+    repair_parser.set_defaults(handler=cmd_repair)
+
+    replan_parser = subparsers.add_parser("replan", help="перепланировать от существующего плана")
+    add_problem_arguments(replan_parser)
+    replan_parser.add_argument("--plan", default=DEFAULT_PLAN, help="прежний план работ")
+    replan_parser.add_argument("--output", default=DEFAULT_PLAN, help="куда сохранить новый план")
+    replan_parser.add_argument("--current-date", help="новая текущая дата (ГГГГ-ММ-ДД) вместо currentDate из исходных данных")
+    replan_parser.add_argument("--freeze-days", type=int, default=0, help="сколько дней от текущей даты план не меняется")
+    replan_parser.add_argument("--lock-tasks", help="идентификаторы закреплённых задач через запятую")
+    replan_parser.add_argument("--lock-orders", help="идентификаторы закреплённых заказов через запятую")
+    replan_parser.add_argument("--window", type=int, default=100, help="окно заказов")
+    replan_parser.add_argument("--step", type=float, default=0.2, help="шаг коэффициента доступности")
+    replan_parser.add_argument("--earning-coefficient", type=float, default=1.0, help="вес прибыли в оценке заказа")
+    replan_parser.add_argument("--time-limit", type=float, help="ограничение времени в секундах")
+    replan_parser.add_argument("--json", action="store_true", help="вывести результат проверки в JSON")
+    replan_parser.set_defaults(handler=cmd_replan)
+
+    export_parser = subparsers.add_parser("export", help="сохранить план и итоги по заказам по столбцам (CSV или NPZ)")
+    add_problem_arguments(export_parser)
+    export_parser.add_argument("--plan", default=DEFAULT_PLAN, help="файл с планом работ")
+    export_parser.add_argument("--output", required=True, help="файл .npz или .csv (итоги по заказам - в .orders.csv)")
+    export_parser.set_defaults(handler=cmd_export)
+
+    tune_parser = subparsers.add_parser("tune", help="подобрать параметры движка последовательным делением пополам")
+    add_problem_arguments(tune_parser)
+    tune_parser.add_argument("--engine", choices=["advanced", "ga"], default="advanced")
+    tune_parser.add_argument("--configs", type=int, default=16, help="число конфигураций в первом раунде")
+    tune_parser.add_argument("--eta", type=int, default=2, help="во сколько раз сокращается число конфигураций за раунд")
+    tune_parser.add_argument("--time-limit", type=float, help="ограничение времени одного запуска на всех заказах")
+    tune_parser.add_argument("--processes", type=int, help="число процессов (по умолчанию по числу ядер)")
+    tune_parser.add_argument("--output", default="data/tuned_params.json", help="куда сохранить параметры")
+    tune_parser.set_defaults(handler=cmd_tune)
+
+    sweep_parser = subparsers.add_parser("sweep", help="сравнить прибыль при разных исходных данных (что, если)")
+    add_problem_arguments(sweep_parser)
+    sweep_parser.add_argument("--scenarios", default="data/scenarios.json", help="файл со списком сценариев")
+    sweep_parser.add_argument("--engine", default="advanced", help="движок для всех сценариев")
+    sweep_parser.add_argument("--time-limit", type=float, help="ограничение времени одного сценария в секундах")
+    sweep_parser.add_argument("--processes", type=int, help="число процессов (по умолчанию по числу ядер)")
+    sweep_parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    sweep_parser.set_defaults(handler=cmd_sweep)
+
+    portfolio_parser = subparsers.add_parser("portfolio", help="запустить несколько движков параллельно и выбрать лучший план")
+    add_problem_arguments(portfolio_parser)
+    portfolio_parser.add_argument("--budget", type=float, default=120, help="общий бюджет времени в секундах")
+    portfolio_parser.add_argument("--output", default=DEFAULT_PLAN, help="куда сохранить лучший план")
+    portfolio_parser.add_argument("--verbose", action="store_true", help="показывать вывод движков")
+    portfolio_parser.add_argument("--json", action="store_true", help="вывести результат проверки в JSON")
+    portfolio_parser.set_defaults(handler=cmd_portfolio)
+
+    render_parser = subparsers.add_parser("render", help="показать или сохранить диаграмму Ганта")
+    add_problem_arguments(render_parser)
+    render_parser.add_argument("--plan", default=DEFAULT_PLAN, help="файл с планом работ")
+    render_parser.add_argument("--export", help="сохранить в .html или .json вместо запуска сервера")
+    render_parser.add_argument("--port", type=int, default=8050)
+    render_parser.set_defaults(handler=cmd_render)
+
+    serve_parser = subparsers.add_parser("serve", help="запустить локальный сервис проверки и оптимизации")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.set_defaults(handler=cmd_serve)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if not (args.metrics or args.profile or args.trace_memory):
+        return args.handler(args)
+
+    from instrumentation import metrics, profiled
+    metrics.enabled = bool(args.metrics)
+    with profiled(args.profile, args.trace_memory):
+        code = args.handler(args)
+    if args.metrics:
+        metrics.emit(args.metrics, command=args.command, argv=sys.argv[1:])
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
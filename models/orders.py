@@ -16,4 +16,6 @@ class Order(BaseModel):
     earning: float
     penaltyByDay: float
 
-Orders = RootModel[List[Order]]
+# именованные подклассы, а не псевдонимы RootModel[...], чтобы модели можно было передавать между процессами (pickle)
+class Orders(RootModel[List[Order]]):
+    pass
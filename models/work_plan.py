@@ -1,19 +1,47 @@
 from datetime import date
-from typing import List
+from typing import Iterable, List
 from pydantic import BaseModel, RootModel
 from .orders import Task, Order
 from .input_data import Worker
 
+
+def _trusted(cls, fields: dict):
+    """
+    Модель из уже проверенных внутренних данных без валидации. То же, что model_construct,
+    но без разбора псевдонимов и значений по умолчанию, поэтому быстрее и его, и обычного конструктора.
+    Данные извне (файлы, запросы сервиса) по-прежнему проходят обычную валидацию.
+    """
+    model = object.__new__(cls)
+    object.__setattr__(model, '__dict__', fields)
+    object.__setattr__(model, '__pydantic_fields_set__', set(fields))
+    if not cls.__pydantic_root_model__:
+        object.__setattr__(model, '__pydantic_extra__', None)
+        object.__setattr__(model, '__pydantic_private__', None)
+    return model
+
+
 class AssignedTask(BaseModel):
     taskId: str | None
     workerId: str
     start: date
     end: date
 
+    @classmethod
+    def trusted(cls, taskId: str | None, workerId: str, start: date, end: date) -> "AssignedTask":
+        return _trusted(cls, {"taskId": taskId, "workerId": workerId, "start": start, "end": end})
+
 class TaskDetails(BaseModel):
     assigned_task: AssignedTask
     task: Task
     order: Order
     worker: Worker
 
-WorkPlan = RootModel[List[AssignedTask]]
+    @classmethod
+    def trusted(cls, assigned_task: AssignedTask, task: Task, order: Order, worker: Worker) -> "TaskDetails":
+        return _trusted(cls, {"assigned_task": assigned_task, "task": task, "order": order, "worker": worker})
+
+# именованный подкласс, а не псевдоним RootModel[...], чтобы план можно было передавать между процессами (pickle)
+class WorkPlan(RootModel[List[AssignedTask]]):
+    @classmethod
+    def trusted(cls, tasks: Iterable[AssignedTask]) -> "WorkPlan":
+        return _trusted(cls, {"root": list(tasks)})
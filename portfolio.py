@@ -0,0 +1,167 @@
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+from pydantic import BaseModel, TypeAdapter
+from checker import CheckResult, check_compiled
+from engines import TIME_LIMITED_ENGINES, WARM_START_ENGINES, run_engine
+from models import InputData, Orders, WorkPlan
+from problem import CompiledProblem
+
+_work_plan_adapter = TypeAdapter(WorkPlan)
+
+
+class PortfolioEntry(BaseModel):
+    engine: str
+    params: Dict[str, Any] = {}
+
+    @property
+    def name(self) -> str:
+        params = ", ".join(f"{key}={value}" for key, value in self.params.items())
+        return f"{self.engine}({params})"
+
+
+DEFAULT_PORTFOLIO = [
+    PortfolioEntry(engine="simple"),
+    PortfolioEntry(engine="advanced", params={"orders_window": 20, "workers_step": 0.5}),
+    PortfolioEntry(engine="advanced", params={"orders_window": 100, "workers_step": 0.2}),
+    PortfolioEntry(engine="advanced", params={"orders_window": 50, "workers_step": 0.25, "earning_coefficient": 0.8}),
+    PortfolioEntry(engine="ga"),
+    PortfolioEntry(engine="sa"),
+    PortfolioEntry(engine="lns"),
+    PortfolioEntry(engine="island", params={"processes": 1}),
+]
+
+
+def _run_entry(results: mp.Queue, index: int, entry: PortfolioEntry, input_data: InputData, orders: Orders,
+               params: Dict[str, Any], verbose: bool):
+    # своя группа процессов, чтобы по истечении бюджета завершить и пулы процессов внутри движка
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        work_plan = run_engine(entry.engine, input_data, orders, **params)
+        results.put((index, work_plan.model_dump_json(), None))
+    except Exception as e:
+        results.put((index, None, repr(e)))
+
+
+def _kill(process: mp.Process):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        pass
+
+
+def run_portfolio(input_data: InputData, orders: Orders, time_budget: float,
+                  portfolio: List[PortfolioEntry] = DEFAULT_PORTFOLIO, warm_start_delay: float = 0.25,
+                  verbose: bool = False) -> Tuple[WorkPlan | None, CheckResult | None, List[Dict[str, Any]]]:
+    """
+    Запускает несколько движков параллельно, каждый в своём процессе, под общим ограничением времени,
+    и возвращает допустимый план с наибольшей прибылью по результатам check().
+
+    Движки без тёплого старта запускаются сразу. Движки из WARM_START_ENGINES ждут первого готового
+    плана (но не дольше warm_start_delay от бюджета) и стартуют от лучшего плана, найденного к этому моменту.
+    Движкам с поддержкой time_limit передаётся оставшееся время с запасом, а по истечении бюджета
+    незавершённые процессы принудительно останавливаются.
+
+    Args:
+        input_data: исходные данные
+        orders: заказы
+        time_budget: общий бюджет времени в секундах
+        portfolio: список движков с параметрами
+        warm_start_delay: доля бюджета, после которой движки с тёплым стартом запускаются в любом случае
+        verbose: не подавлять вывод движков
+
+    Returns:
+        (лучший план, результат его проверки, сводка по каждому движку)
+    """
+    problem = CompiledProblem(orders, input_data)
+    start_time = time.perf_counter()
+    deadline = start_time + time_budget
+    results = mp.Queue()
+    processes: Dict[int, mp.Process] = {}
+    summary = [{"engine": entry.name, "status": "waiting"} for entry in portfolio]
+    best: Tuple[float, WorkPlan, CheckResult] | None = None
+
+    def launch(index: int, initial_plan: WorkPlan | None):
+        entry = portfolio[index]
+        params = dict(entry.params)
+        if entry.engine in TIME_LIMITED_ENGINES:
+            # запас на построение плана после остановки поиска и передачу результата
+            params["time_limit"] = max((deadline - time.perf_counter()) * 0.85, 0.0)
+        if initial_plan is not None:
+            params["initial_plan"] = initial_plan
+        process = mp.Process(target=_run_entry, args=(results, index, entry, input_data, orders, params, verbose))
+        process.start()
+        processes[index] = process
+        summary[index]["status"] = "running"
+        summary[index]["warm_start"] = initial_plan is not None
+
+    warm_indexes = [i for i, entry in enumerate(portfolio) if entry.engine in WARM_START_ENGINES]
+    for i in range(len(portfolio)):
+        if i not in warm_indexes:
+            launch(i, None)
+
+    def handle(index: int, plan_json: str | None, error: str | None):
+        nonlocal best
+        summary[index]["time"] = time.perf_counter() - start_time
+        if error is not None:
+            summary[index].update(status="failed", error=error)
+            return
+
+        work_plan = _work_plan_adapter.validate_json(plan_json)
+        result = check_compiled(problem, work_plan)
+        summary[index].update(status="done", success=result.success, profit=result.total_earning)
+        profit = f"{result.total_earning:,.0f}".replace(',', ' ')
+        print(f"{portfolio[index].name}: прибыль {profit}, проверка {result.success}")
+        if result.success and (best is None or result.total_earning > best[0]):
+            best = (result.total_earning, work_plan, result)
+
+    # процессы движков в своих группах и Ctrl+C не получают, поэтому останавливаем их при любом выходе
+    try:
+        while time.perf_counter() < deadline:
+            if warm_indexes and (best is not None or time.perf_counter() - start_time > warm_start_delay * time_budget):
+                for i in warm_indexes:
+                    launch(i, best[1] if best is not None else None)
+                warm_indexes = []
+
+            if not warm_indexes and all(summary[i]["status"] != "running" for i in processes):
+                break
+
+            try:
+                message = results.get(timeout=min(0.2, max(deadline - time.perf_counter(), 0.01)))
+            except queue.Empty:
+                for i, process in processes.items():
+                    if summary[i]["status"] == "running" and not process.is_alive() and results.empty():
+                        summary[i]["status"] = "failed"
+                continue
+            handle(*message)
+
+        # планы, пришедшие к самому сроку, ещё в очереди: проверяем их, а не считаем движки не успевшими
+        while True:
+            try:
+                message = results.get_nowait()
+            except queue.Empty:
+                break
+            handle(*message)
+
+        for i in processes:
+            if summary[i]["status"] == "running":
+                summary[i]["status"] = "timeout"
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                _kill(process)
+            process.join(timeout=1)
+
+    if best is None:
+        return None, None, summary
+    return best[1], best[2], summary
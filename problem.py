@@ -0,0 +1,88 @@
+from datetime import date
+from typing import Dict, FrozenSet, List
+from models import InputData, Orders, Worker
+from models.orders import Order, Task
+
+
+class WorkerIndex:
+    """
+    Работники по типам работ: списки подходящих работников (в исходном порядке) и битовые маски,
+    где бит i означает i-го работника, а также группы работников с одинаковым набором навыков.
+    Строится заново, если список работников переупорядочен.
+    """
+    def __init__(self, workers: List[Worker]):
+        self.workers = list(workers)
+        self.position: Dict[str, int] = {worker.id: i for i, worker in enumerate(self.workers)}
+        self.eligible: Dict[str, List[Worker]] = {}
+        self.eligible_mask: Dict[str, int] = {}
+        # номер группы работников с одинаковыми навыками
+        self.skill_group: Dict[str, int] = {}
+
+        groups: Dict[FrozenSet[str], int] = {}
+        for i, worker in enumerate(self.workers):
+            for work_type_id in dict.fromkeys(worker.workTypeIds):
+                self.eligible.setdefault(work_type_id, []).append(worker)
+                self.eligible_mask[work_type_id] = self.eligible_mask.get(work_type_id, 0) | (1 << i)
+            self.skill_group[worker.id] = groups.setdefault(frozenset(worker.workTypeIds), len(groups))
+
+        self._by_dominance: Dict[str, List[Worker]] = {
+            work_type_id: sorted(workers, key=lambda w: (self.skill_group[w.id], -w.productivity, self.position[w.id]))
+            for work_type_id, workers in self.eligible.items()
+        }
+
+    def eligible_for(self, work_type_id: str) -> List[Worker]:
+        return self.eligible.get(work_type_id, [])
+
+    def can_do(self, worker: Worker, work_type_id: str) -> bool:
+        return bool(self.eligible_mask.get(work_type_id, 0) >> self.position[worker.id] & 1)
+
+    def by_dominance(self, work_type_id: str) -> List[Worker]:
+        """
+        Подходящие работники в порядке проверки на доминирование: группами навыков,
+        внутри группы по убыванию продуктивности (при равной - в исходном порядке).
+        Работник доминируем, если раньше него в его группе есть работник, доступный не позже.
+        """
+        return self._by_dominance.get(work_type_id, [])
+
+
+class CompiledOrders:
+    """
+    Индексы по заказам, не зависящие от исходных данных: их можно построить один раз
+    и переиспользовать для разных InputData (сценарии, пакетная проверка).
+    """
+    def __init__(self, orders: Orders):
+        self.orders = orders
+        self.task_by_id: Dict[str, Task] = {}
+        self.order_by_task_id: Dict[str, Order] = {}
+        self.order_by_id: Dict[str, Order] = {}
+        for order in orders.root:
+            self.order_by_id[order.id] = order
+            for task in order.tasks:
+                self.task_by_id[task.id] = task
+                self.order_by_task_id[task.id] = order
+
+
+class CompiledProblem:
+    """
+    Заказы и исходные данные вместе с индексами для быстрого поиска.
+    Строится один раз на задачу и используется для проверки любого числа планов.
+    """
+    def __init__(self, orders: Orders, input_data: InputData, compiled_orders: CompiledOrders | None = None):
+        self.orders = orders
+        self.input_data = input_data
+        self.compiled_orders = compiled_orders if compiled_orders is not None else CompiledOrders(orders)
+        self.worker_by_id: Dict[str, Worker] = {worker.id: worker for worker in input_data.workers}
+        self.worker_index = WorkerIndex(input_data.workers)
+        self.holidays: FrozenSet[date] = frozenset(input_data.holidays)
+
+    @property
+    def task_by_id(self) -> Dict[str, Task]:
+        return self.compiled_orders.task_by_id
+
+    @property
+    def order_by_task_id(self) -> Dict[str, Order]:
+        return self.compiled_orders.order_by_task_id
+
+    @property
+    def workers(self) -> List[Worker]:
+        return self.input_data.workers
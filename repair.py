@@ -0,0 +1,223 @@
+from datetime import date, timedelta
+import heapq
+from typing import Dict, List, Set, Tuple
+from pydantic import BaseModel
+from instrumentation import metrics
+from models import InputData, Orders, WorkPlan
+from models.work_plan import AssignedTask
+from problem import CompiledProblem
+from work_calendar import WorkCalendar
+
+
+class RepairResult(BaseModel):
+    shifted: List[str]
+    reassigned: List[str]
+    dropped: List[str]
+
+    def __str__(self):
+        def ids(items: List[str]) -> str:
+            return "нет" if len(items) == 0 else ", ".join(items)
+        return (
+            f"  Сдвинуто задач: {len(self.shifted)}\n"
+            f"  Передано другому работнику: {ids(self.reassigned)}\n"
+            f"  Снято с плана: {ids(self.dropped)}\n"
+        )
+
+
+def repair_plan(orders: Orders, work_plan: WorkPlan, input_data: InputData,
+                problem: CompiledProblem | None = None) -> Tuple[WorkPlan, RepairResult]:
+    """
+    Исправляет недопустимый план (пересечения у работника, нарушенные зависимости, работник без нужного типа работ),
+    оставляя его как можно ближе к исходному:
+        - задача, работник которой не умеет её тип работ, передаётся подходящему работнику,
+          у которого меньше всего задач пересекается с ней по времени (длительность - по его продуктивности);
+        - задача, зависимость которой отсутствует в плане, снимается вместе со всеми зависящими от неё;
+        - при повторе задачи остаётся последняя запись, как и при проверке;
+        - затем задачи обходятся в топологическом порядке графа "зависимости + очередь работника"
+          по исходной дате начала, и каждая сдвигается вперёд ровно настолько, чтобы начаться после своих
+          зависимостей и предыдущей задачи работника. Длительность в рабочих днях сохраняется.
+    Задачи никогда не сдвигаются раньше, чем были. Записи без задачи и задачи вне заказов
+    или у неизвестных работников проверка не учитывает, они остаются как есть.
+    Сложность O(T log T) плюс перебор работников для переназначаемых задач.
+    """
+    problem = problem if problem is not None else CompiledProblem(orders, input_data)
+    with metrics.phase("repair"):
+        return _Repair(problem, work_plan).run()
+
+
+class _Repair:
+    def __init__(self, problem: CompiledProblem, work_plan: WorkPlan):
+        self.problem = problem
+        self.result = RepairResult(shifted=[], reassigned=[], dropped=[])
+        self.kept: List[AssignedTask] = []
+
+        # задачи, которые учитывает проверка: при повторе - последняя запись
+        entries: Dict[str, AssignedTask] = {}
+        for assigned in work_plan.root:
+            if assigned.taskId in problem.task_by_id and assigned.workerId in problem.worker_by_id:
+                entries[assigned.taskId] = assigned
+            else:
+                self.kept.append(assigned)
+        self.entries = entries
+
+        starts = [t.start for t in work_plan.root]
+        first_day = min(starts + [problem.input_data.currentDate])
+        self.calendar = WorkCalendar(problem.holidays, first_day)
+
+    def run(self) -> Tuple[WorkPlan, RepairResult]:
+        self._drop_missing_dependencies()
+        self._reassign_incompatible()
+        placed = self._shift_forward()
+        plan = WorkPlan.trusted(sorted(self.kept + list(placed.values()), key=lambda x: x.start))
+        metrics.count("repair.shifted", len(self.result.shifted))
+        metrics.count("repair.reassigned", len(self.result.reassigned))
+        metrics.count("repair.dropped", len(self.result.dropped))
+        return plan, self.result
+
+    def _drop_missing_dependencies(self):
+        """Снимает задачи с отсутствующими зависимостями и, по цепочке, всех, кто от них зависит."""
+        dependants: Dict[str, List[str]] = {}
+        missing: List[str] = []
+        for task_id in self.entries:
+            task = self.problem.task_by_id[task_id]
+            for dep_id in task.dependsOn:
+                dependants.setdefault(dep_id, []).append(task_id)
+                if dep_id not in self.entries:
+                    missing.append(task_id)
+
+        dropped: Set[str] = set()
+        stack = missing
+        while stack:
+            task_id = stack.pop()
+            if task_id in dropped:
+                continue
+            dropped.add(task_id)
+            stack.extend(dependants.get(task_id, []))
+        for task_id in sorted(dropped, key=lambda x: self.entries[x].start):
+            self.entries.pop(task_id)
+            self.result.dropped.append(task_id)
+
+    def _reassign_incompatible(self):
+        by_worker: Dict[str, List[AssignedTask]] = {}
+        for assigned in self.entries.values():
+            by_worker.setdefault(assigned.workerId, []).append(assigned)
+
+        worker_index = self.problem.worker_index
+        for task_id, assigned in list(self.entries.items()):
+            task = self.problem.task_by_id[task_id]
+            worker = self.problem.worker_by_id[assigned.workerId]
+            if worker_index.can_do(worker, task.workTypeId):
+                continue
+            candidates = worker_index.eligible_for(task.workTypeId)
+            if len(candidates) == 0:
+                # ни один работник не умеет этот тип работ: задачу не выполнить, снимаем её и зависящие от неё
+                self.entries.pop(task_id)
+                self.result.dropped.append(task_id)
+                self._drop_dependants(task_id)
+                continue
+
+            def overlaps(candidate) -> int:
+                return sum(1 for other in by_worker.get(candidate.id, [])
+                           if not (other.end < assigned.start or other.start > assigned.end))
+
+            new_worker = min(candidates, key=lambda w: (overlaps(w), -w.productivity))
+            start = self.calendar.closest_workday(assigned.start)
+            duration = max(1, -(-task.baseDuration // new_worker.productivity))
+            reassigned = AssignedTask.trusted(taskId=task_id, workerId=new_worker.id, start=start,
+                                              end=self.calendar.task_end_date(start, int(duration)))
+            by_worker[assigned.workerId].remove(assigned)
+            by_worker.setdefault(new_worker.id, []).append(reassigned)
+            self.entries[task_id] = reassigned
+            self.result.reassigned.append(task_id)
+
+    def _drop_dependants(self, task_id: str):
+        stack = [task_id]
+        while stack:
+            current = stack.pop()
+            for other_id in list(self.entries):
+                if current in self.problem.task_by_id[other_id].dependsOn:
+                    self.entries.pop(other_id)
+                    self.result.dropped.append(other_id)
+                    stack.append(other_id)
+
+    def _shift_forward(self) -> Dict[str, AssignedTask]:
+        ids = list(self.entries)
+        index = {task_id: i for i, task_id in enumerate(ids)}
+        entries = [self.entries[task_id] for task_id in ids]
+
+        # рёбра: зависимость -> задача и предыдущая задача работника -> следующая (по исходному началу)
+        dependencies: List[List[int]] = [[] for _ in ids]
+        dependants: List[List[int]] = [[] for _ in ids]
+        for i, task_id in enumerate(ids):
+            for dep_id in self.problem.task_by_id[task_id].dependsOn:
+                dependencies[i].append(index[dep_id])
+                dependants[index[dep_id]].append(i)
+        worker_next: List[int | None] = [None] * len(ids)
+        has_worker_previous = [False] * len(ids)
+        by_worker: Dict[str, List[int]] = {}
+        for i in sorted(range(len(ids)), key=lambda i: (entries[i].start, entries[i].end)):
+            by_worker.setdefault(entries[i].workerId, []).append(i)
+        for sequence in by_worker.values():
+            for previous, following in zip(sequence, sequence[1:]):
+                worker_next[previous] = following
+                has_worker_previous[following] = True
+
+        waiting_dependencies = [len(deps) for deps in dependencies]
+        in_degree = [waiting_dependencies[i] + has_worker_previous[i] for i in range(len(ids))]
+        placed: Dict[str, AssignedTask] = {}
+        done = [False] * len(ids)
+        # день, с которого работник свободен: его задачи ставятся строго друг за другом
+        free_from: Dict[str, date] = {}
+        heap = [(entries[i].start, i) for i in range(len(ids)) if in_degree[i] == 0]
+        heapq.heapify(heap)
+        remaining = len(ids)
+
+        def release(j: int):
+            in_degree[j] -= 1
+            if in_degree[j] == 0 and not done[j]:
+                heapq.heappush(heap, (entries[j].start, j))
+
+        while remaining > 0:
+            if heap:
+                _, i = heapq.heappop(heap)
+            else:
+                # очередь работника противоречит зависимостям: задачу, зависимости которой уже стоят,
+                # ставим вне очереди - после всех уже поставленных задач её работника
+                ready = [j for j in range(len(ids)) if not done[j] and waiting_dependencies[j] == 0]
+                if len(ready) == 0:
+                    # цикл в самих зависимостях - такие задачи выполнить нельзя
+                    self.result.dropped.extend(ids[j] for j in range(len(ids)) if not done[j])
+                    break
+                i = min(ready, key=lambda j: entries[j].start)
+                metrics.count("repair.forced")
+            if done[i]:
+                continue
+            done[i] = True
+            remaining -= 1
+
+            worker_id = entries[i].workerId
+            placed[ids[i]] = self._place(entries[i], [placed[ids[dep]] for dep in dependencies[i]],
+                                         free_from.get(worker_id))
+            # задача, поставленная вне очереди, могла закончиться позже текущей
+            end = placed[ids[i]].end + timedelta(days=1)
+            free_from[worker_id] = max(free_from[worker_id], end) if worker_id in free_from else end
+            for following in dependants[i]:
+                waiting_dependencies[following] -= 1
+                release(following)
+            if worker_next[i] is not None:
+                release(worker_next[i])
+        return placed
+
+    def _place(self, entry: AssignedTask, dependencies: List[AssignedTask], free_from: date | None) -> AssignedTask:
+        min_date = entry.start
+        for dep in dependencies:
+            min_date = max(min_date, dep.end + timedelta(days=1))
+        if free_from is not None:
+            min_date = max(min_date, free_from)
+        if min_date <= entry.start:
+            return entry
+
+        start = self.calendar.closest_workday(min_date)
+        self.result.shifted.append(entry.taskId)
+        return AssignedTask.trusted(taskId=entry.taskId, workerId=entry.workerId, start=start,
+                                    end=self.calendar.task_end_date(start, self.calendar.task_length(entry.start, entry.end)))
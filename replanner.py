@@ -0,0 +1,119 @@
+from datetime import timedelta
+from typing import Iterable, List, Set
+from advanced_optimizer import AdvancedOptimizer
+from models import InputData, Orders, WorkPlan
+from models.work_plan import AssignedTask
+from problem import CompiledOrders
+
+
+def freeze_plan(previous_plan: WorkPlan, orders: Orders, input_data: InputData, freeze_days: int = 0,
+                locked_task_ids: Iterable[str] = (), locked_order_ids: Iterable[str] = ()) -> WorkPlan:
+    """
+    Выбирает из прежнего плана задачи, которые нельзя двигать при перепланировании:
+        - начатые: начало раньше currentDate + freeze_days (при freeze_days=0 - уже начатые к currentDate);
+        - явно закреплённые задачи и все задачи закреплённых заказов;
+        - задачи, от которых зависят зафиксированные (иначе зависимость могла бы переехать позже).
+
+    Задачи заказов, которых больше нет, и задачи выбывших работников отбрасываются, а задачи, зависящие
+    (в том числе по цепочке) от отброшенных или незафиксированных, не фиксируются и планируются заново.
+
+    Returns:
+        WorkPlan: зафиксированные задачи
+    """
+    compiled = CompiledOrders(orders)
+    worker_ids = {worker.id for worker in input_data.workers}
+    freeze_until = input_data.currentDate + timedelta(days=freeze_days)
+    locked_task_ids = set(locked_task_ids)
+    locked_order_ids = set(locked_order_ids)
+
+    assigned: dict[str, AssignedTask] = {}
+    dropped = 0
+    for assigned_task in previous_plan.root:
+        if assigned_task.taskId in compiled.task_by_id and assigned_task.workerId in worker_ids:
+            assigned[assigned_task.taskId] = assigned_task
+        else:
+            dropped += 1
+    if dropped > 0:
+        print(f"Отброшено задач удалённых заказов или работников: {dropped}")
+
+    frozen: Set[str] = set()
+    stack = [task_id for task_id, assigned_task in assigned.items()
+             if assigned_task.start < freeze_until
+             or task_id in locked_task_ids
+             or compiled.order_by_task_id[task_id].id in locked_order_ids]
+    # замыкание по зависимостям
+    while stack:
+        task_id = stack.pop()
+        if task_id in frozen:
+            continue
+        frozen.add(task_id)
+        stack.extend(dep_id for dep_id in compiled.task_by_id[task_id].dependsOn if dep_id in assigned)
+
+    # задача, зависимость которой не зафиксирована (отброшена или её не было в плане), зафиксирована быть не может:
+    # зависимость встанет не раньше currentDate, то есть после неё; то же по цепочке для зависящих от неё
+    dependants: dict[str, list[str]] = {}
+    for task_id in frozen:
+        for dep_id in compiled.task_by_id[task_id].dependsOn:
+            dependants.setdefault(dep_id, []).append(task_id)
+    stack = [task_id for task_id in frozen
+             if any(dep_id not in frozen for dep_id in compiled.task_by_id[task_id].dependsOn)]
+    released: Set[str] = set()
+    while stack:
+        task_id = stack.pop()
+        if task_id in released:
+            continue
+        released.add(task_id)
+        stack.extend(dependants.get(task_id, []))
+    if released:
+        print(f"Не зафиксировано задач с незафиксированными зависимостями: {len(released)}")
+    frozen -= released
+
+    return WorkPlan.trusted(sorted((assigned[task_id] for task_id in frozen), key=lambda x: x.start))
+
+
+def replan(input_data: InputData, orders: Orders, previous_plan: WorkPlan, freeze_days: int = 0,
+           locked_task_ids: Iterable[str] = (), locked_order_ids: Iterable[str] = (),
+           orders_window: int = 100, workers_step: float = 0.2, earning_coefficient: float = 1.0,
+           time_limit: float | None = None) -> WorkPlan:
+    """
+    Перепланирование от существующего плана: зафиксированные задачи (см. freeze_plan) остаются на месте,
+    а остальной хвост прежнего плана и новые заказы заново расставляются AdvancedOptimizer вокруг них.
+    Время работы зависит от числа незафиксированных заказов, а не от всего портфеля заказов:
+    чем больше freeze_days, тем меньше остаётся перепланировать.
+    Зафиксированные задачи всегда остаются в новом плане без изменений. Если остаток заказа с ними поставить
+    не удалось (невыгоден или не помещается), заказ остаётся недостроенным, и об этом выводится предупреждение.
+
+    Args:
+        input_data: исходные данные с новой currentDate
+        orders: все актуальные заказы, включая новые
+        previous_plan: прежний план работ
+        freeze_days: сколько дней от currentDate прежний план не меняется
+        locked_task_ids: задачи, которые нельзя двигать
+        locked_order_ids: заказы, которые нельзя двигать
+        orders_window, workers_step, earning_coefficient, time_limit: параметры AdvancedOptimizer.optimize
+    """
+    frozen_plan = freeze_plan(previous_plan, orders, input_data, freeze_days, locked_task_ids, locked_order_ids)
+    planned_task_ids = {t.taskId for t in previous_plan.root}
+    new_orders = sum(1 for order in orders.root if not any(task.id in planned_task_ids for task in order.tasks))
+    total_tasks = sum(len(order.tasks) for order in orders.root)
+    print(f"Зафиксировано задач: {len(frozen_plan.root)}, к перепланированию: {total_tasks - len(frozen_plan.root)}, "
+          f"заказов вне прежнего плана: {new_orders}")
+
+    optimizer = AdvancedOptimizer(input_data, orders, initial_plan=frozen_plan)
+    work_plan = optimizer.optimize(orders_window, workers_step, earning_coefficient, time_limit)
+    unfinished = unfinished_orders(work_plan, frozen_plan, orders)
+    if unfinished:
+        print(f"Предупреждение: не достроены заказы с зафиксированными задачами ({len(unfinished)}): {', '.join(unfinished)}")
+    return work_plan
+
+
+def unfinished_orders(work_plan: WorkPlan, frozen_plan: WorkPlan, orders: Orders) -> List[str]:
+    """
+    Заказы с зафиксированными задачами, которые в плане не завершены: остаток оказался невыгоден,
+    не поместился или не успел встать до time_limit. Выручки такие заказы не приносят,
+    но начатая работа из плана не снимается.
+    """
+    planned = {t.taskId for t in work_plan.root}
+    frozen = {t.taskId for t in frozen_plan.root}
+    return [order.id for order in orders.root
+            if any(task.id in frozen for task in order.tasks) and not all(task.id in planned for task in order.tasks)]
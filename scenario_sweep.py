@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import time
+from datetime import date
+from typing import Any, Dict, List, Tuple
+from pydantic import BaseModel
+from checker import check_compiled
+from engines import run_engine
+from models import InputData, Orders, Worker
+from problem import CompiledOrders, CompiledProblem
+
+BASELINE = "базовый"
+
+
+class Scenario(BaseModel):
+    """
+    Изменения исходных данных для вопроса "что, если": не заданные поля берутся из базовых данных.
+    Сначала удаляются и добавляются работники, затем меняется продуктивность.
+    """
+    name: str
+    companyDayCost: float | None = None
+    addWorkers: List[Worker] = []
+    removeWorkerIds: List[str] = []
+    # новая продуктивность отдельных работников
+    productivity: Dict[str, float] = {}
+    # множитель продуктивности всех работников
+    productivityFactor: float | None = None
+    extraHolidays: List[date] = []
+
+    def apply(self, input_data: InputData) -> InputData:
+        scenario = input_data.model_copy(deep=True)
+        if self.companyDayCost is not None:
+            scenario.companyDayCost = self.companyDayCost
+
+        worker_ids = {worker.id for worker in scenario.workers}
+        known = worker_ids | {worker.id for worker in self.addWorkers}
+        unknown = [worker_id for worker_id in [*self.removeWorkerIds, *self.productivity] if worker_id not in known]
+        if unknown:
+            raise ValueError(f"Сценарий {self.name}: неизвестные работники {', '.join(unknown)}")
+        duplicates = [worker.id for worker in self.addWorkers if worker.id in worker_ids]
+        if duplicates:
+            raise ValueError(f"Сценарий {self.name}: работники уже есть в исходных данных: {', '.join(duplicates)}")
+
+        removed = set(self.removeWorkerIds)
+        scenario.workers = [worker for worker in scenario.workers if worker.id not in removed]
+        scenario.workers += [worker.model_copy() for worker in self.addWorkers]
+        for worker in scenario.workers:
+            if worker.id in self.productivity:
+                worker.productivity = self.productivity[worker.id]
+            if self.productivityFactor is not None:
+                worker.productivity *= self.productivityFactor
+
+        scenario.holidays = sorted(set(scenario.holidays) | set(self.extraHolidays))
+        return scenario
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    success: bool
+    profit: float = 0.0
+    days: int = 0
+    orders_completed: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+# заказы и их скомпилированные индексы в процессе пула: разбираются и строятся один раз на процесс
+_orders: Orders | None = None
+_compiled_orders: CompiledOrders | None = None
+
+
+def _init_worker(orders: Orders):
+    global _orders, _compiled_orders
+    _orders = orders
+    _compiled_orders = CompiledOrders(orders)
+
+
+def _run_scenario(args: Tuple[Scenario, InputData, str, Dict[str, Any]]) -> ScenarioResult:
+    scenario, base_input, engine, params = args
+    started = time.perf_counter()
+    try:
+        input_data = scenario.apply(base_input)
+        checked = CompiledProblem(_orders, input_data.model_copy(deep=True), _compiled_orders)
+        # оптимизаторы меняют переданные модели, поэтому им достаются копии, а проверка идёт по общим заказам
+        with contextlib.redirect_stdout(io.StringIO()):
+            work_plan = run_engine(engine, input_data, _orders.model_copy(deep=True), **params)
+        result = check_compiled(checked, work_plan)
+    except Exception as e:
+        return ScenarioResult(name=scenario.name, success=False, seconds=time.perf_counter() - started, error=repr(e))
+    return ScenarioResult(name=scenario.name, success=result.success, profit=result.total_earning,
+                          days=result.total_days, orders_completed=result.orders_completed,
+                          seconds=time.perf_counter() - started,
+                          error=None if result.success else "; ".join(result.errors[:3]))
+
+
+def run_sweep(input_data: InputData, orders: Orders, scenarios: List[Scenario], engine: str = "advanced",
+              params: Dict[str, Any] | None = None, processes: int | None = None) -> List[ScenarioResult]:
+    """
+    Прогоняет один и тот же движок по базовым данным и по каждому сценарию параллельно в пуле процессов.
+    Заказы передаются в процесс один раз вместе с пулом, и индексы заказов (CompiledOrders) строятся там
+    один раз на все сценарии; всё, что зависит от работников и календаря, считается заново для каждого сценария.
+
+    Args:
+        scenarios: сценарии; базовый вариант без изменений добавляется первым, если его нет
+        engine: движок из engines.ENGINES
+        params: параметры движка, одинаковые для всех сценариев
+        processes: размер пула (по умолчанию по числу ядер)
+    Returns:
+        результаты в порядке сценариев, первым - базовый
+    """
+    params = params or {}
+    if all(scenario.name != BASELINE for scenario in scenarios):
+        scenarios = [Scenario(name=BASELINE)] + list(scenarios)
+    tasks = [(scenario, input_data, engine, params) for scenario in scenarios]
+    if processes == 1:
+        _init_worker(orders)
+        return [_run_scenario(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(orders,)) as executor:
+        return list(executor.map(_run_scenario, tasks))
+
+
+def format_table(results: List[ScenarioResult]) -> str:
+    """Таблица сравнения сценариев; разница прибыли - относительно первого (базового) сценария."""
+    def number(value: float) -> str:
+        return f"{value:,.0f}".replace(',', ' ')
+
+    baseline = results[0].profit if results and results[0].success else None
+    width = max([len(result.name) for result in results] + [len("Сценарий")])
+    lines = [f"{'Сценарий':<{width}}  {'Прибыль':>15}  {'Разница':>15}  {'Дней':>5}  {'Заказов':>7}  {'Время, с':>8}"]
+    for result in results:
+        if not result.success:
+            lines.append(f"{result.name:<{width}}  ошибка: {result.error}")
+            continue
+        delta = number(result.profit - baseline) if baseline is not None else "-"
+        lines.append(f"{result.name:<{width}}  {number(result.profit):>15}  {delta:>15}  {result.days:>5}  "
+                     f"{result.orders_completed:>7}  {result.seconds:>8.1f}")
+    return "\n".join(lines)
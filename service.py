@@ -0,0 +1,323 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import multiprocessing as mp
+import os
+from pathlib import Path
+import queue
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from pydantic import TypeAdapter, ValidationError
+from checker import check_compiled, only_calculate_earning
+from instrumentation import metrics
+from models import InputData, Orders, WorkPlan
+from problem import CompiledProblem
+from utils import load_model
+
+_work_plan_adapter = TypeAdapter(WorkPlan)
+
+
+class ProblemStore:
+    """
+    Скомпилированные задачи, которые держатся в памяти между запросами.
+    При каждом обращении сверяется время изменения файлов, и изменённая задача перезагружается.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, int], CompiledProblem]] = {}
+
+    def get(self, input_path: str, orders_path: str) -> CompiledProblem:
+        key = (str(Path(input_path).resolve()), str(Path(orders_path).resolve()))
+        mtimes = (os.stat(key[0]).st_mtime_ns, os.stat(key[1]).st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtimes:
+                metrics.count("cache_hits")
+                return entry[1]
+
+            problem = CompiledProblem(load_model(key[1], Orders), load_model(key[0], InputData))
+            self._entries[key] = (mtimes, problem)
+            if entry is not None:
+                print(f"Задача перезагружена: {key[0]}, {key[1]}")
+            return problem
+
+    def describe(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"input": key[0], "orders": key[1], "orders_count": len(problem.orders.root)}
+                    for key, (_, problem) in self._entries.items()]
+
+
+class _QueueWriter:
+    """Подменяет stdout в процессе оптимизации: каждая строка вывода уходит в очередь как событие прогресса."""
+    def __init__(self, events: mp.Queue):
+        self.events = events
+        self._buffer = ""
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.events.put(("progress", line))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _run_optimization(events: mp.Queue, engine: str, input_data: InputData, orders: Orders, params: Dict[str, Any]):
+    from engines import run_engine
+
+    # своя группа процессов, чтобы при отмене завершить и пулы процессов, которые создают оптимизаторы
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    sys.stdout = _QueueWriter(events)
+    try:
+        work_plan = run_engine(engine, input_data, orders, **params)
+        events.put(("result", work_plan.model_dump_json()))
+    except Exception as e:
+        events.put(("error", repr(e)))
+
+
+class Job:
+    """Задача оптимизации, выполняемая в отдельном процессе."""
+    def __init__(self, job_id: str, engine: str, problem: CompiledProblem, params: Dict[str, Any]):
+        self.id = job_id
+        self.engine = engine
+        self.problem = problem
+        self.params = params
+        self.status = "running"
+        self.events: List[str] = []
+        self.result: Dict[str, Any] | None = None
+        # время завершения по time.monotonic(), чтобы удалять давно завершённые задачи
+        self.finished_at: float | None = None
+        self.changed = threading.Condition()
+
+        self._events = mp.Queue()
+        # оптимизаторы меняют входные модели, а задача в хранилище общая, поэтому в процесс уходят копии
+        self.process = mp.Process(target=_run_optimization, args=(
+            self._events, engine,
+            problem.input_data.model_copy(deep=True), problem.orders.model_copy(deep=True), params,
+        ))
+        self.process.start()
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def _collect(self):
+        while self.status == "running":
+            try:
+                kind, payload = self._events.get(timeout=0.5)
+            except queue.Empty:
+                if not self.process.is_alive() and self._events.empty():
+                    self._finish("failed", error="процесс оптимизации завершился без результата")
+                continue
+
+            if kind == "progress":
+                self._add_event(payload)
+            elif kind == "result":
+                # без этого исключение в разборе или проверке плана остановит поток, и задача навсегда останется running
+                try:
+                    work_plan = _work_plan_adapter.validate_json(payload)
+                    result = check_compiled(self.problem, work_plan)
+                    self._finish("done", work_plan=json.loads(payload), check=result.model_dump())
+                except Exception as e:
+                    self._finish("failed", error=repr(e))
+            else:
+                self._finish("failed", error=payload)
+        self.process.join(timeout=1)
+
+    def _add_event(self, message: str):
+        with self.changed:
+            self.events.append(message)
+            self.changed.notify_all()
+
+    def _finish(self, status: str, **result):
+        with self.changed:
+            if self.status != "running":
+                return
+            self.status = status
+            self.result = result
+            self.finished_at = time.monotonic()
+            self.changed.notify_all()
+
+    def cancel(self):
+        if self.status == "running":
+            self._finish("cancelled")
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(self.process.pid, signal.SIGTERM)
+                else:
+                    self.process.terminate()
+            except ProcessLookupError:
+                # процесс ещё не успел создать свою группу: пулов у него пока нет, завершаем его самого
+                self.process.terminate()
+
+    def describe(self, with_result: bool = True) -> Dict[str, Any]:
+        data = {"job": self.id, "engine": self.engine, "status": self.status, "events": len(self.events)}
+        if with_result and self.result is not None:
+            data.update(self.result)
+        return data
+
+
+class Service:
+    def __init__(self, max_finished_jobs: int = 50, finished_job_ttl: float = 3600.0):
+        """
+        Args:
+            max_finished_jobs: сколько завершённых задач (с планами) хранить, более старые удаляются
+            finished_job_ttl: сколько секунд хранить завершённую задачу
+        """
+        self.problems = ProblemStore()
+        self.jobs: Dict[str, Job] = {}
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_job_ttl = finished_job_ttl
+        self._job_ids = itertools.count(1)
+        self._jobs_lock = threading.Lock()
+
+    def _evict_finished_jobs(self):
+        now = time.monotonic()
+        finished = sorted((job for job in self.jobs.values() if job.finished_at is not None),
+                          key=lambda job: job.finished_at)
+        expired = [job for job in finished if now - job.finished_at > self.finished_job_ttl]
+        expired += [job for job in finished[:max(len(finished) - self.max_finished_jobs, 0)] if job not in expired]
+        for job in expired:
+            del self.jobs[job.id]
+
+    def problem_from(self, request: Dict[str, Any]) -> CompiledProblem:
+        return self.problems.get(request.get("input", "data/input_data2.json"), request.get("orders", "data/orders2.json"))
+
+    @staticmethod
+    def plan_from(request: Dict[str, Any]) -> WorkPlan:
+        if "plan" in request:
+            return _work_plan_adapter.validate_python(request["plan"])
+        return load_model(request.get("plan_file", "data/work_plan.json"), WorkPlan)
+
+    def check(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return check_compiled(self.problem_from(request), self.plan_from(request)).model_dump()
+
+    def earning(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        problem = self.problem_from(request)
+        return {"total_earning": only_calculate_earning(problem.orders, self.plan_from(request), problem.input_data)}
+
+    def optimize(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        from engines import ENGINES
+
+        engine = request.get("engine", "advanced")
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный движок: {engine}")
+        job = Job(str(next(self._job_ids)), engine, self.problem_from(request), request.get("params", {}))
+        with self._jobs_lock:
+            self._evict_finished_jobs()
+            self.jobs[job.id] = job
+        return job.describe()
+
+
+def _make_handler(service: Service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, data: Any, status: int = 200):
+            body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _job(self) -> Job | None:
+            parts = self.path.strip("/").split("/")
+            return service.jobs.get(parts[1]) if len(parts) >= 2 else None
+
+        def do_POST(self):
+            handlers = {"/check": service.check, "/earning": service.earning, "/optimize": service.optimize}
+            handler = handlers.get(self.path)
+            if handler is None:
+                self._send_json({"error": f"Неизвестный метод: {self.path}"}, 404)
+                return
+            try:
+                self._send_json(handler(self._read_json()))
+            except (ValueError, ValidationError, OSError) as e:
+                self._send_json({"error": str(e)}, 400)
+
+        def do_GET(self):
+            if self.path == "/problems":
+                self._send_json(service.problems.describe())
+            elif self.path == "/jobs":
+                self._send_json([job.describe(with_result=False) for job in list(service.jobs.values())])
+            elif self.path.startswith("/jobs/") and self.path.endswith("/events"):
+                job = self._job()
+                if job is None:
+                    self._send_json({"error": "Задача не найдена"}, 404)
+                else:
+                    self._stream_events(job)
+            elif self.path.startswith("/jobs/"):
+                job = self._job()
+                if job is None:
+                    self._send_json({"error": "Задача не найдена"}, 404)
+                else:
+                    self._send_json(job.describe())
+            else:
+                self._send_json({"error": f"Неизвестный метод: {self.path}"}, 404)
+
+        def do_DELETE(self):
+            job = self._job() if self.path.startswith("/jobs/") else None
+            if job is None:
+                self._send_json({"error": "Задача не найдена"}, 404)
+                return
+            job.cancel()
+            self._send_json(job.describe(with_result=False))
+
+        def _stream_events(self, job: Job):
+            """Отдаёт события прогресса строками JSON по мере появления, пока задача не завершится."""
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.end_headers()
+            sent = 0
+            while True:
+                with job.changed:
+                    while sent == len(job.events) and job.status == "running":
+                        job.changed.wait()
+                    new_events = job.events[sent:]
+                    finished = job.status != "running"
+                try:
+                    for message in new_events:
+                        self.wfile.write((json.dumps({"progress": message}, ensure_ascii=False) + "\n").encode("utf-8"))
+                    sent += len(new_events)
+                    if finished:
+                        self.wfile.write((json.dumps({"status": job.status}) + "\n").encode("utf-8"))
+                        return
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765):
+    """
+    Запускает локальный HTTP-сервис проверки и оптимизации.
+
+    POST /check, /earning - {"input", "orders", "plan" | "plan_file"} -> результат проверки или прибыль
+    POST /optimize - {"input", "orders", "engine", "params"} -> описание задачи оптимизации
+    GET /jobs, /jobs/<id> - состояние задач; /jobs/<id>/events - поток событий прогресса (JSON Lines)
+    DELETE /jobs/<id> - отмена задачи
+    GET /problems - задачи, загруженные в память
+    """
+    service = Service()
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    print(f"Сервис запущен на http://{host}:{port}")
+    print("Для завершения работы нажмите Ctrl+C")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for job in list(service.jobs.values()):
+            job.cancel()
+        server.server_close()
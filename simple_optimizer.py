@@ -2,23 +2,41 @@ from datetime import date, timedelta
 from models import Orders, InputData, WorkPlan
 from models.orders import Order, Task
 from models.work_plan import AssignedTask
-from utils import calculate_order_duration
+from capacity import CapacityProfile
+from estimates import OrderEstimator
 from models.input_data import Worker
 from date_utils import closest_workday, minimum_allowed_date_by_dependencies, calculate_task_end_date
+from instrumentation import metrics
+from problem import WorkerIndex
 
 class SimpleOptimizer:
     def __init__(self, input_data: InputData, orders: Orders):
         self.input_data = input_data
         self.orders = orders
+        self.estimator = OrderEstimator(input_data, orders)
+        self.worker_index = WorkerIndex(input_data.workers)
+        # дата, с которой работник свободен: SimpleOptimizer ставит задачи только после последней задачи работника
+        self._free_from: dict[str, date] = {}
 
     def optimize(self) -> WorkPlan:
+        with metrics.phase("simple.optimize"):
+            return self._optimize()
+
+    def _optimize(self) -> WorkPlan:
+        self._free_from = {}
         # сортируем заказы по убыванию прибыли на день
         sorted_orders = self._sort_orders()
 
         # создадим пустой план словарём для быстрого поиска
         work_plan_dict = {}
+        capacity = CapacityProfile(self.input_data, self.estimator.calendar, self.estimator)
 
         for order in sorted_orders:
+            # не берём заказ, который уже не успеть закончить, пока штраф не съел выручку
+            if not capacity.admits(order):
+                metrics.count("capacity.rejected")
+                continue
+
             # создадим список для ещё не назначенных задач
             tasks = order.tasks.copy()
             total_tasks = len(tasks)
@@ -49,10 +67,13 @@ class SimpleOptimizer:
                 end_date = calculate_task_end_date(min_date, task.baseDuration, worker.productivity, self.input_data.holidays)
 
                 # назначаем задачу
-                work_plan_dict[task.id] = AssignedTask(taskId=task.id, workerId=worker.id, start=min_date, end=end_date)
+                work_plan_dict[task.id] = AssignedTask.trusted(taskId=task.id, workerId=worker.id, start=min_date, end=end_date)
+                self._free_from[worker.id] = max(self._free_from.get(worker.id, end_date), end_date + timedelta(days=1))
+                capacity.assign(worker, min_date, end_date)
+                metrics.count("placements")
                 attempts = 0
 
-        return WorkPlan(list(work_plan_dict.values()))
+        return WorkPlan.trusted(list(work_plan_dict.values()))
 
     def _sort_orders(self) -> list[Order]:
         # фильтруем заказы с положительной оценкой и сортируем по убыванию
@@ -73,6 +94,10 @@ class SimpleOptimizer:
         return total_productivity / task.baseDuration if task.baseDuration > 0 else float('inf')
 
     def _order_score(self, order: Order) -> float:
+        # заказ, для задачи которого нет работников, выполнить нельзя
+        if not self.estimator.is_feasible(order):
+            return float('-inf')
+
         # Вычисляем среднюю сложность задач заказа
         tasks_complexity = [self._task_complexity(task) for task in order.tasks]
         avg_complexity = sum(tasks_complexity) / len(tasks_complexity) if tasks_complexity else 0
@@ -82,7 +107,7 @@ class SimpleOptimizer:
 
         # Учитываем оба фактора: доход за день и сложность выполнения
         # normalized_complexity близка к 1 для простых задач и к 0.1 для сложных
-        duration = calculate_order_duration(order)
+        duration = self.estimator.duration_days(order)
         earning_per_day = order.earning / duration
         if earning_per_day <= self.input_data.companyDayCost:
             return float('-inf')
@@ -102,20 +127,18 @@ class SimpleOptimizer:
         """
         min_date = date.max
         selected_worker = None
-        # перебираем всех работников с тем же типом работ
-        for worker in self.input_data.workers:
-            if task.workTypeId in worker.workTypeIds:
-                worker_min_date = desired_start
-
-                # ищем все назначенные задачи для этого работника
-                for assigned_task in work_plan_dict.values():
-                    if assigned_task.workerId == worker.id:
-                        # минимальная дата, когда конкретно этот работник может взять новую задачу
-                        worker_min_date = max(worker_min_date, assigned_task.end + timedelta(days=1))
-
-                # выбираем минимальную дату из всех работников
-                if worker_min_date < min_date:
-                    min_date = worker_min_date
-                    selected_worker = worker
+        # перебираем только работников с нужным типом работ
+        for worker in self.worker_index.eligible_for(task.workTypeId):
+            # минимальная дата, когда конкретно этот работник может взять новую задачу
+            worker_min_date = max(desired_start, self._free_from.get(worker.id, desired_start))
+
+            # выбираем минимальную дату из всех работников
+            if worker_min_date < min_date:
+                min_date = worker_min_date
+                selected_worker = worker
+
+                # раньше желаемой даты не начнёт никто, остальные работники доминируемы
+                if min_date == desired_start:
+                    break
 
         return min_date, selected_worker 
\ No newline at end of file
@@ -0,0 +1,109 @@
+from typing import Callable, Dict, List, Sequence, Tuple, TypeVar
+import time
+import numpy as np
+from estimates import OrderEstimator
+from instrumentation import metrics
+from models import InputData
+from models.orders import Order
+
+T = TypeVar("T")
+
+
+class SurrogateScore:
+    """
+    Дешёвая оценка порядка заказов без построения плана. Заказы идут в порядке перестановки,
+    каждый тип работ выполняется всеми подходящими работниками сразу, поэтому заказ заканчивается
+    не раньше, чем выполнены работы его типов у всех заказов до него включительно, и не раньше
+    конца своего критического пути. По этому окончанию считаются штраф и прибыль заказа;
+    заказы, которые по оценке убыточны, в сумму не входят, из горизонта фирмы тоже.
+
+    Оценка грубая, но ранжирует кандидатов в том же направлении, что и полный декодер,
+    и стоит одной накопленной суммы по матрице заказы x типы работ.
+    """
+    def __init__(self, input_data: InputData, orders: List[Order], estimator: OrderEstimator | None = None):
+        self.input_data = input_data
+        self.orders = list(orders)
+        self.estimator = estimator if estimator is not None else OrderEstimator(input_data, self.orders)
+
+        capacity: Dict[str, float] = {}
+        for worker in input_data.workers:
+            for work_type_id in dict.fromkeys(worker.workTypeIds):
+                capacity[work_type_id] = capacity.get(work_type_id, 0.0) + worker.productivity
+        column = {work_type_id: k for k, work_type_id in enumerate(capacity)}
+
+        # объём работ заказа по типам работ в днях всех подходящих работников
+        self.load = np.zeros((len(self.orders), max(len(column), 1)))
+        for i, order in enumerate(self.orders):
+            for task in order.tasks:
+                if task.workTypeId in column:
+                    self.load[i, column[task.workTypeId]] += task.baseDuration / capacity[task.workTypeId]
+        self.critical_path = np.array([self.estimator.critical_path[self.estimator.index_by_order_id[order.id]]
+                                       for order in self.orders], dtype=np.int64)
+        self.earning = np.array([order.earning for order in self.orders], dtype=np.float64)
+        self.penalty = np.array([order.penaltyByDay for order in self.orders], dtype=np.float64)
+        self.deadline = np.array([order.deadline.toordinal() for order in self.orders], dtype=np.int64)
+        self.current_date = input_data.currentDate.toordinal()
+
+    def score(self, permutation: Sequence[int]) -> float:
+        permutation = np.asarray(permutation, dtype=np.int64)
+        load = self.load[permutation]
+        busy = np.cumsum(load, axis=0)
+        finish = np.where(load > 0, busy, 0.0).max(axis=1)
+        workdays = np.maximum(np.ceil(finish).astype(np.int64), self.critical_path[permutation])
+        end = self.estimator.calendar.chain_end_ordinals(self.input_data.currentDate, workdays)
+
+        delay = np.maximum(end - self.deadline[permutation], 0)
+        value = self.earning[permutation] - self.penalty[permutation] * delay
+        profitable = value > 0
+        if not profitable.any():
+            return 0.0
+        horizon = int(end[profitable].max()) - self.current_date + 1
+        return float(value[profitable].sum()) - self.input_data.companyDayCost * horizon
+
+
+class SurrogateScreen:
+    """
+    Первая ступень отбора: из кандидатов полному декодеру передаётся только лучшая по SurrogateScore часть.
+    Счётчики surrogate.screened и surrogate.decoded и фаза surrogate.score показывают,
+    сколько кандидатов отсеяно и сколько стоила оценка.
+    """
+    def __init__(self, surrogate: SurrogateScore, keep_fraction: float = 0.5):
+        self.surrogate = surrogate
+        self.keep_fraction = keep_fraction
+        self.screened = 0
+        self.decoded = 0
+        self.seconds = 0.0
+
+    def select(self, candidates: List[T], permutation: Callable[[T], Sequence[int]], keep: int | None = None) -> List[T]:
+        """Лучшие keep кандидатов (по умолчанию доля keep_fraction) в порядке убывания оценки."""
+        keep = keep if keep is not None else max(1, round(len(candidates) * self.keep_fraction))
+        started = time.perf_counter()
+        with metrics.phase("surrogate.score"):
+            scores = [self.surrogate.score(permutation(candidate)) for candidate in candidates]
+        self.seconds += time.perf_counter() - started
+        ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])[:keep]
+        self.screened += len(candidates)
+        self.decoded += len(ranked)
+        metrics.count("surrogate.screened", len(candidates))
+        metrics.count("surrogate.decoded", len(ranked))
+        return [candidates[i] for i in ranked]
+
+    def merge(self, stats: Tuple[int, int, float]):
+        """Добавляет счётчики отбора, сделанного в другом процессе."""
+        screened, decoded, seconds = stats
+        self.screened += screened
+        self.decoded += decoded
+        self.seconds += seconds
+        metrics.count("surrogate.screened", screened)
+        metrics.count("surrogate.decoded", decoded)
+
+    @property
+    def stats(self) -> Tuple[int, int, float]:
+        return self.screened, self.decoded, self.seconds
+
+    def summary(self) -> str:
+        if self.screened == 0:
+            return "Суррогатный отбор не применялся"
+        filtered = 1.0 - self.decoded / self.screened
+        return (f"Суррогатный отбор: отсеяно {self.screened - self.decoded} из {self.screened} кандидатов "
+                f"({filtered:.0%}), оценка заняла {self.seconds:.2f} с")
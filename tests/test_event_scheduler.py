@@ -0,0 +1,52 @@
+from datetime import date
+import random
+from checker import check
+from event_scheduler import ParallelScheduleBuilder
+from instance_generator import GeneratorConfig, generate_instance
+from models import InputData, Orders
+from models.input_data import Worker, WorkType
+from models.orders import Order, Task
+
+
+def _diamond():
+    """A -> (B длинная, C короткая) -> D: C раздаётся после B, но заканчивается раньше неё."""
+    input_data = InputData(
+        workTypes=[WorkType(id="WT", name="Тип работ")],
+        companyDayCost=1.0,
+        workers=[Worker(id=f"W{i}", name=f"Работник {i}", workTypeIds=["WT"], productivity=1.0) for i in range(3)],
+        holidays=[],
+        currentDate=date(2025, 1, 6),
+    )
+    orders = Orders([Order(
+        id="O1",
+        tasks=[
+            Task(id="A", workTypeId="WT", dependsOn=[], baseDuration=2),
+            Task(id="B", workTypeId="WT", dependsOn=["A"], baseDuration=8),
+            Task(id="C", workTypeId="WT", dependsOn=["A"], baseDuration=1),
+            Task(id="D", workTypeId="WT", dependsOn=["B", "C"], baseDuration=2),
+        ],
+        deadline=date(2025, 3, 1),
+        earning=1_000_000.0,
+        penaltyByDay=1.0,
+    )])
+    return input_data, orders
+
+
+def test_dependant_starts_after_latest_dependency():
+    input_data, orders = _diamond()
+    plan = ParallelScheduleBuilder(input_data, orders.root).build([1])
+
+    by_id = {t.taskId: t for t in plan.root}
+    assert set(by_id) == {"A", "B", "C", "D"}
+    assert by_id["D"].start > max(by_id["B"].end, by_id["C"].end)
+    assert check(orders, plan, input_data).success
+
+
+def test_generated_instance_plans_pass_check():
+    input_data, orders = generate_instance(GeneratorConfig(seed=3))
+    builder = ParallelScheduleBuilder(input_data, orders.root)
+    rnd = random.Random(0)
+    for _ in range(10):
+        plan = builder.build([rnd.randint(0, 1000) for _ in orders.root])
+        result = check(orders, plan, input_data)
+        assert result.success, result.errors[:3]
@@ -0,0 +1,25 @@
+from datetime import date
+from pathlib import Path
+from checker import check
+from models import InputData, Orders, WorkPlan
+from replanner import replan
+from utils import load_model
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+
+def test_replan_keeps_started_tasks():
+    input_data = load_model(DATA / "input_data2.json", InputData)
+    orders = load_model(DATA / "orders2.json", Orders)
+    previous_plan = load_model(DATA / "work_plan.json", WorkPlan)
+    input_data.currentDate = date(2025, 3, 3)
+    started = [t for t in previous_plan.root if t.start < input_data.currentDate]
+    assert len(started) > 0
+
+    # оптимизатор меняет переданные модели, поэтому проверяем по отдельной копии
+    work_plan = replan(input_data.model_copy(deep=True), orders.model_copy(deep=True), previous_plan,
+                       orders_window=20, workers_step=0.5)
+
+    by_id = {t.taskId: t for t in work_plan.root}
+    assert all(by_id.get(t.taskId) == t for t in started)
+    assert check(orders, work_plan, input_data).success
@@ -0,0 +1,148 @@
+import concurrent.futures
+import contextlib
+import io
+import itertools
+import json
+import math
+import random
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from checker import check
+from engines import TIME_LIMITED_ENGINES, run_engine
+from models import InputData, Orders
+
+TUNED_PARAMS_PATH = Path("data") / "tuned_params.json"
+
+# классы размера задачи по числу заказов: верхняя граница включительно
+SIZE_CLASSES: List[Tuple[int, str]] = [(100, "small"), (500, "medium")]
+LARGEST_SIZE_CLASS = "large"
+
+# перебираемые значения параметров; число процессов ГА не настраивается, оно зависит от машины
+SEARCH_SPACES: Dict[str, Dict[str, List[Any]]] = {
+    "advanced": {
+        "orders_window": [10, 20, 50, 100],
+        "workers_step": [0.1, 0.2, 0.25, 0.5],
+        "earning_coefficient": [0.6, 0.8, 1.0],
+    },
+    "ga": {
+        "population": [10, 20, 40],
+        "generations": [10, 15, 30],
+        "parents_mating": [4, 6, 10],
+        "mutation_probability": [0.1, 0.2, 0.3],
+    },
+}
+
+
+def size_class(orders: Orders) -> str:
+    for limit, name in SIZE_CLASSES:
+        if len(orders.root) <= limit:
+            return name
+    return LARGEST_SIZE_CLASS
+
+
+def load_tuned_params(engine: str, orders: Orders, path: str | Path = TUNED_PARAMS_PATH) -> Dict[str, Any]:
+    """Настроенные параметры движка для класса размера задачи; пустой словарь, если настройки не было."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    tuned = json.loads(path.read_text(encoding="utf-8"))
+    return dict(tuned.get(engine, {}).get(size_class(orders), {}).get("params", {}))
+
+
+def save_tuned_params(engine: str, orders: Orders, params: Dict[str, Any], profit: float,
+                      path: str | Path = TUNED_PARAMS_PATH):
+    path = Path(path)
+    tuned = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    tuned.setdefault(engine, {})[size_class(orders)] = {
+        "params": params,
+        "profit": profit,
+        "orders": len(orders.root),
+        "tuned_at": date.today().isoformat(),
+    }
+    path.write_text(json.dumps(tuned, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def _evaluate(engine: str, params: Dict[str, Any], input_data: InputData, orders: Orders,
+              time_limit: float | None) -> float:
+    """Один короткий запуск в процессе пула: прибыль плана или минус бесконечность, если план не прошёл проверку."""
+    params = dict(params)
+    if engine == "ga":
+        # параллельность уже на уровне пула конфигураций
+        params["processes"] = 1
+    if time_limit is not None and engine in TIME_LIMITED_ENGINES:
+        params["time_limit"] = time_limit
+    # оптимизаторы меняют переданные модели, а проверять план нужно по исходным
+    checked_input, checked_orders = input_data.model_copy(deep=True), orders.model_copy(deep=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        plan = run_engine(engine, input_data, orders, **params)
+    result = check(checked_orders, plan, checked_input)
+    return result.total_earning if result.success else float('-inf')
+
+
+def _score(future: concurrent.futures.Future, params: Dict[str, Any], verbose: bool) -> float:
+    """Результат _evaluate; конфигурация, запуск которой упал, оценивается как не прошедшая проверку."""
+    try:
+        return future.result()
+    except Exception as e:
+        if verbose:
+            print(f"Конфигурация {params} завершилась с ошибкой: {e!r}")
+        return float('-inf')
+
+
+def _subset(orders: Orders, fraction: float, min_orders: int, rng: random.Random) -> Orders:
+    size = min(len(orders.root), max(min_orders, math.ceil(len(orders.root) * fraction)))
+    if size == len(orders.root):
+        return orders
+    return Orders(rng.sample(orders.root, size))
+
+
+def tune(engine: str, input_data: InputData, orders: Orders, configs: int = 16, eta: int = 2,
+         time_limit: float | None = None, processes: int | None = None, min_orders: int = 20,
+         seed: int = 0, verbose: bool = True) -> Tuple[Dict[str, Any], float]:
+    """
+    Последовательное деление пополам (successive halving): случайные конфигурации из SEARCH_SPACES
+    сначала запускаются на малой случайной части заказов, в следующий раунд проходит лучшая 1/eta из них,
+    а часть заказов растёт в eta раз. Последний раунд - на всех заказах.
+    Все конфигурации раунда считаются параллельно в пуле процессов, на одной и той же части заказов.
+
+    Args:
+        engine: движок из SEARCH_SPACES
+        configs: сколько конфигураций в первом раунде
+        eta: во сколько раз сокращается число конфигураций и растёт часть заказов от раунда к раунду
+        time_limit: ограничение времени одного запуска на всех заказах; на части заказов - пропорционально меньше
+        processes: размер пула (по умолчанию по числу ядер)
+        min_orders: меньше стольких заказов часть не бывает
+    Returns:
+        лучшие параметры и прибыль с ними на всех заказах
+    """
+    if engine not in SEARCH_SPACES:
+        raise ValueError(f"Настройка не поддерживается для движка {engine}, доступны: {', '.join(SEARCH_SPACES)}")
+    rng = random.Random(seed)
+    space = SEARCH_SPACES[engine]
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    candidates = rng.sample(grid, min(configs, len(grid)))
+
+    # раунды, пока в последнем не останется не больше eta конфигураций
+    rounds, remaining = 1, len(candidates)
+    while remaining > eta:
+        remaining = math.ceil(remaining / eta)
+        rounds += 1
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        for round_index in range(rounds):
+            fraction = float(eta) ** (round_index - rounds + 1)
+            subset = _subset(orders, fraction, min_orders, rng)
+            limit = time_limit * fraction if time_limit is not None else None
+            futures = [executor.submit(_evaluate, engine, params, input_data, subset, limit) for params in candidates]
+            scores = [_score(future, params, verbose) for future, params in zip(futures, candidates)]
+
+            ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])
+            if verbose:
+                profit = f"{scores[ranked[0]]:,.0f}".replace(',', ' ')
+                print(f"Раунд {round_index + 1}/{rounds}: заказов {len(subset.root)}, конфигураций {len(candidates)}, "
+                      f"лучшая {candidates[ranked[0]]}, прибыль {profit}")
+            best_params, best_score = candidates[ranked[0]], scores[ranked[0]]
+            candidates = [candidates[i] for i in ranked[:max(1, math.ceil(len(candidates) / eta))]]
+
+    return best_params, best_score
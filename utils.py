@@ -1,32 +1,36 @@
 import json
 from datetime import date, timedelta
 from pathlib import Path
-from typing import List, Any, Dict, Optional
+from typing import List, Any, Dict, Optional, Type, TypeVar
 from math import ceil
+from pydantic import TypeAdapter
 from models import Orders, WorkPlan, InputData, TaskDetails, Worker
 from models.orders import Order, Task
 from models.work_plan import AssignedTask
+from instrumentation import metrics
+from problem import CompiledProblem
 
 
-def aggregate_work_plan(orders: Orders, work_plan: WorkPlan, input_data: InputData) -> (Dict[str, TaskDetails], int):
-    # 1. Создаём словари для быстрого поиска
-    task_dict = {}
-    for order in orders.root:
-        for task in order.tasks:
-            task_dict[task.id] = (task, order)
-
-    worker_dict = {worker.id: worker for worker in input_data.workers}
+def aggregate_work_plan(orders: Orders, work_plan: WorkPlan, input_data: InputData,
+                        problem: CompiledProblem | None = None) -> (Dict[str, TaskDetails], int):
+    # 1. Берём словари для быстрого поиска из скомпилированной задачи или строим их
+    if problem is None:
+        problem = CompiledProblem(orders, input_data)
+    task_by_id = problem.task_by_id
+    order_by_task_id = problem.order_by_task_id
+    worker_dict = problem.worker_by_id
 
     # 2. Перебираем все назначенные задачи, извлекая по пути работников и заказы
     result = {}
     min_date = date.max
     max_date = date.min
     for assigned_task in work_plan.root:
-        if assigned_task.taskId in task_dict:
-            task, order = task_dict[assigned_task.taskId]
+        if assigned_task.taskId in task_by_id:
+            task = task_by_id[assigned_task.taskId]
+            order = order_by_task_id[assigned_task.taskId]
             worker = worker_dict.get(assigned_task.workerId)
             if worker:
-                result[assigned_task.taskId] = TaskDetails(
+                result[assigned_task.taskId] = TaskDetails.trusted(
                     assigned_task=assigned_task,
                     task=task,
                     order=order,
@@ -42,7 +46,7 @@ def aggregate_work_plan(orders: Orders, work_plan: WorkPlan, input_data: InputDa
     return result, total_days
 
 
-def calculate_order_duration(order: Order, input_data: InputData, force_workers: Dict[str, Worker] | None = None) -> int:
+def calculate_order_duration(order: Order, input_data: InputData | None = None, force_workers: Dict[str, Worker] | None = None) -> int:
     """
     Вычисляет длительность заказа с учетом зависимостей между задачами.
     """
@@ -52,6 +56,7 @@ def calculate_order_duration(order: Order, input_data: InputData, force_workers:
     def get_max_path_duration(task_id: str) -> int:
         # Если длительность уже посчитана - возвращаем её
         if task_id in max_durations:
+            metrics.count("cache_hits")
             return max_durations[task_id]
             
         # Находим задачу по id
@@ -96,6 +101,24 @@ def load_json(file_name: str) -> Any:
             return json.load(file)
 
 
+T = TypeVar("T")
+
+
+def load_model(path: str | Path, model_type: Type[T]) -> T:
+    """
+       Загружает и валидирует модель из JSON-файла по произвольному пути
+    """
+    return TypeAdapter(model_type).validate_json(Path(path).read_bytes())
+
+
+def save_model(model: Any, path: str | Path):
+    """
+       Сохраняет модель в JSON-файл по произвольному пути
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(model.model_dump_json(indent=2))
+
+
 def calculate_order_delay(order: Order, work_plan_dict: Dict[str, AssignedTask]) -> Optional[int]:
     """
     Вычисляет количество дней просрочки заказа.
@@ -1,18 +1,26 @@
-from typing import Dict
+from datetime import date
+from typing import Collection, Dict, List
 from models import TaskDetails, InputData
 from math import ceil
 from date_utils import calculate_working_days
 
-def validate_task_overlap(task_details: TaskDetails, all_task_details: Dict[str, TaskDetails], errors: list):
+def validate_task_overlap(task_details: TaskDetails, all_task_details: Dict[str, TaskDetails], errors: list,
+                          tasks_by_worker: Dict[str, List[TaskDetails]] | None = None):
+    """
+    Проверяет пересечения задачи с другими задачами того же работника.
+    Если передан tasks_by_worker (задачи, сгруппированные по работнику в порядке плана),
+    перебираются только задачи этого работника, иначе - все задачи плана.
+    """
     # Получаем данные текущей задачи
     current_task = task_details.assigned_task
     current_worker_id = current_task.workerId
     current_start = current_task.start
     current_end = current_task.end
 
-    # Проходим по всем задачам в словаре
-    for task_id, details in all_task_details.items():
-        if task_id == current_task.taskId:
+    # Проходим по всем задачам работника или по всем задачам в словаре
+    candidates = all_task_details.values() if tasks_by_worker is None else tasks_by_worker.get(current_worker_id, [])
+    for details in candidates:
+        if details.assigned_task.taskId == current_task.taskId:
             continue  # Пропускаем текущую задачу
 
         # Проверяем, назначена ли задача на того же работника
@@ -31,13 +39,14 @@ def validate_task_overlap(task_details: TaskDetails, all_task_details: Dict[str,
                 )
                 errors.append(error_message)  # Добавляем ошибку в глобальный список
 
-def validate_task_duration(task_details: TaskDetails, input_data: InputData, warnings: list) -> int:
-    """Проверяет длительность задачи или фиксирует простой."""
+def validate_task_duration(task_details: TaskDetails, input_data: InputData, warnings: list,
+                           holidays: Collection[date] | None = None) -> int:
+    """Проверяет длительность задачи или фиксирует простой. holidays - праздники в виде множества для быстрого поиска."""
     start_date = task_details.assigned_task.start
     end_date = task_details.assigned_task.end
 
     # Вычисляем фактическую длительность в рабочих днях (с учетом праздников)
-    actual_duration = calculate_working_days(start_date, end_date, input_data.holidays)
+    actual_duration = calculate_working_days(start_date, end_date, input_data.holidays if holidays is None else holidays)
 
     if task_details.task is None:
         # Если задача отсутствует, фиксируем простой
@@ -0,0 +1,171 @@
+from datetime import date
+from typing import Iterable, Tuple
+import threading
+import numpy as np
+from date_utils import is_weekend
+
+
+class WorkCalendar:
+    """
+    Рабочие дни как отсортированный массив порядковых номеров дат (date.toordinal).
+    Позиция даты в массиве - это число рабочих дней до неё, поэтому даты окончания задач
+    считаются одним поиском вместо перебора дней, в том числе сразу для массивов дат.
+    Массив продлевается по мере необходимости; продление под блокировкой, потому что календарь
+    общий для потоков, в которых AdvancedOptimizer перебирает коэффициенты доступности.
+    """
+    def __init__(self, holidays: Iterable[date], start: date, horizon_days: int = 730):
+        self.holidays = frozenset(holidays)
+        self.start = start.toordinal()
+        self._horizon_end = self.start
+        self.workdays = np.empty(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._extend(horizon_days)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _extend(self, days: int):
+        ordinals = range(self._horizon_end, self._horizon_end + days)
+        added = [o for o in ordinals if not self._is_holiday(date.fromordinal(o))]
+        self.workdays = np.concatenate([self.workdays, np.array(added, dtype=np.int64)])
+        self._horizon_end += days
+
+    def _is_holiday(self, d: date) -> bool:
+        return is_weekend(d) or d in self.holidays
+
+    def _ensure(self, ordinal: int, workdays_after: int = 0):
+        if ordinal < self.start:
+            raise ValueError(f"Дата {date.fromordinal(ordinal)} раньше начала календаря {date.fromordinal(self.start)}")
+        # продлеваем календарь, пока после даты не наберётся нужное число рабочих дней
+        while ordinal >= self._horizon_end or \
+                np.searchsorted(self.workdays, ordinal, side="right") + workdays_after >= len(self.workdays):
+            with self._lock:
+                if ordinal >= self._horizon_end or \
+                        np.searchsorted(self.workdays, ordinal, side="right") + workdays_after >= len(self.workdays):
+                    self._extend(max(365, self._horizon_end - self.start))
+
+    def workday_index(self, d: date, side: str = "left") -> int:
+        """Число рабочих дней календаря раньше d (side="left") или не позже d (side="right")."""
+        ordinal = d.toordinal()
+        self._ensure(ordinal)
+        return int(np.searchsorted(self.workdays, ordinal, side=side))
+
+    def closest_workday(self, d: date) -> date:
+        """То же, что date_utils.closest_workday."""
+        ordinal = d.toordinal()
+        self._ensure(ordinal, 1)
+        return date.fromordinal(int(self.workdays[np.searchsorted(self.workdays, ordinal, side="left")]))
+
+    def closest_workday_ordinals(self, ordinals: np.ndarray) -> np.ndarray:
+        """Векторный вариант closest_workday для порядковых номеров дат."""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        if ordinals.size == 0:
+            return ordinals
+        self._ensure(int(ordinals.min()))
+        self._ensure(int(ordinals.max()), 1)
+        return self.workdays[np.searchsorted(self.workdays, ordinals, side="left")]
+
+    def task_end_date(self, start: date, duration: int) -> date:
+        """
+        То же, что date_utils.calculate_task_end_date для уже посчитанной длительности в рабочих днях:
+        день начала засчитывается всегда, остальные duration - 1 дней берутся из рабочих дней после него.
+        """
+        if duration <= 1:
+            return start
+        ordinal = start.toordinal()
+        self._ensure(ordinal, duration)
+        after = np.searchsorted(self.workdays, ordinal, side="right")
+        return date.fromordinal(int(self.workdays[after + duration - 2]))
+
+    def task_length(self, start: date, end: date) -> int:
+        """
+        Длительность задачи с start по end в рабочих днях так, как её считает calculate_task_end_date:
+        день начала засчитывается всегда, поэтому task_end_date(start, task_length(start, end)) == end для рабочего end.
+        """
+        if end <= start:
+            return 1
+        return 1 + self.working_days(date.fromordinal(start.toordinal() + 1), end)
+
+    def task_end_ordinals(self, start_ordinals: np.ndarray, durations: np.ndarray) -> np.ndarray:
+        """Векторный вариант task_end_date: порядковые номера дат начала и длительности в рабочих днях."""
+        start_ordinals = np.asarray(start_ordinals, dtype=np.int64)
+        durations = np.asarray(durations, dtype=np.int64)
+        if start_ordinals.size == 0:
+            return start_ordinals
+        self._ensure(int(start_ordinals.min()))
+        self._ensure(int(start_ordinals.max()), int(durations.max()))
+        after = np.searchsorted(self.workdays, start_ordinals, side="right")
+        ends = self.workdays[np.maximum(after + durations - 2, 0)]
+        return np.where(durations <= 1, start_ordinals, ends)
+
+    def earliest_starts(self, min_date: date, durations: np.ndarray, busy_counts: np.ndarray,
+                        busy_starts: np.ndarray, busy_ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Самые ранние начала задачи сразу у нескольких работников и соответствующие окончания (порядковые номера дат).
+
+        durations - длительность задачи у каждого работника в рабочих днях. Занятость работников передаётся
+        плоскими массивами: busy_counts[w] интервалов работника w подряд, по возрастанию начала,
+        даты начала и окончания в busy_starts и busy_ends (включительно).
+
+        Правило то же, что у поиска окна в AdvancedOptimizer: задача начинается в min_date, если заканчивается
+        раньше первой задачи работника, иначе в первый рабочий день после той задачи, за которой до следующей
+        хватает места, а если такой нет - после последней.
+        """
+        durations = np.asarray(durations, dtype=np.int64)
+        busy_counts = np.asarray(busy_counts, dtype=np.int64)
+        busy_starts = np.asarray(busy_starts, dtype=np.int64)
+        busy_ends = np.asarray(busy_ends, dtype=np.int64)
+        n = len(durations)
+        min_ordinal = min_date.toordinal()
+
+        # кандидат "в min_date"
+        starts = np.full(n, min_ordinal, dtype=np.int64)
+        ends = self.task_end_ordinals(starts, durations)
+        if busy_starts.size == 0:
+            return starts, ends
+        first = np.minimum(np.cumsum(busy_counts) - busy_counts, busy_starts.size - 1)
+        fits_first = (busy_counts == 0) | (busy_starts[first] > ends)
+
+        # кандидаты "после каждой задачи работника"; после последней место есть всегда
+        owner = np.repeat(np.arange(n), busy_counts)
+        after = self.closest_workday_ordinals(np.maximum(min_ordinal, busy_ends + 1))
+        after_ends = self.task_end_ordinals(after, durations[owner])
+        is_last = np.append(owner[1:] != owner[:-1], True)
+        next_start = np.append(busy_starts[1:], 0)
+        fits = is_last | (after_ends < next_start)
+
+        # первый подходящий кандидат у каждого работника: интервалы идут по работникам и по времени
+        candidates = np.flatnonzero(fits)
+        workers, position = np.unique(owner[candidates], return_index=True)
+        chosen = candidates[position]
+        use_after = np.zeros(n, dtype=bool)
+        use_after[workers] = ~fits_first[workers]
+        starts[workers] = np.where(use_after[workers], after[chosen], starts[workers])
+        ends[workers] = np.where(use_after[workers], after_ends[chosen], ends[workers])
+        return starts, ends
+
+    def chain_end_ordinals(self, start: date, workdays: np.ndarray) -> np.ndarray:
+        """
+        Даты окончания цепочек задач общей длиной workdays рабочих дней, начатых в первый рабочий день с start:
+        каждая следующая задача цепочки начинается на следующий рабочий день после окончания предыдущей.
+        """
+        workdays = np.maximum(np.asarray(workdays, dtype=np.int64), 1)
+        ordinal = start.toordinal()
+        self._ensure(ordinal, int(workdays.max()) if workdays.size else 0)
+        first = np.searchsorted(self.workdays, ordinal, side="left")
+        return self.workdays[first + workdays - 1]
+
+    def working_days(self, start: date, end: date) -> int:
+        """То же, что date_utils.calculate_working_days: рабочие дни между датами включительно."""
+        if end < start:
+            return 0
+        self._ensure(start.toordinal())
+        self._ensure(end.toordinal())
+        return int(np.searchsorted(self.workdays, end.toordinal(), side="right")
+                   - np.searchsorted(self.workdays, start.toordinal(), side="left"))